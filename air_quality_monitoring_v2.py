@@ -1,68 +1,913 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
 import json
-import datetime
-import matplotlib.pyplot as plt
+import logging
+import bisect
+import heapq
+import functools
+import socket
+import codecs
+import mmap
 from datetime import datetime as dt, timedelta
+from urllib.parse import quote, unquote
 import collections
+import os
+import re
 import time
+import queue
+import random
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait
 import numpy as np
-from urllib.parse import quote
-from sklearn.linear_model import LinearRegression
-import mplcursors  # Import mplcursors for hover functionality
-import folium
-import pandas as pd
-from scipy.interpolate import griddata
-from matplotlib.colors import Normalize
-import matplotlib.colors as mcolors
 
+# The fetch/aggregate core only needs requests and NumPy. Plotting, mapping and
+# ML dependencies (matplotlib, mplcursors, folium, scipy, pandas) are imported
+# inside the functions that use them, so importing this module stays cheap.
 
-# IoT API function to fetch air quality at sample rate (5min or 1 min)
-def get_air_quality_data(sensor_id, token, timeDeltaArgKey, timeDeltaArgValue, timezone_offset_hours=-6):
-    # Get the current UTC time
-    current_time = dt.utcnow() + timedelta(hours=timezone_offset_hours)  # Adjust for local time zone
-    
-    # Define the time window for the last minute
-    dtEnd = current_time.strftime('%Y-%m-%d %H:%M:%S')  # Current local time   
-    dtStart = (current_time - timedelta(**{timeDeltaArgKey: timeDeltaArgValue})).strftime('%Y-%m-%d %H:%M:%S')  # One minute, 1h,8h,12h,24,1day,7day,earlier
-  
-    # URL encode the start and end times
-    dtEnd_encoded = dtEnd.replace(' ', '%20')
-    dtStart_encoded = dtStart.replace(' ', '%20')
-    
-    # Construct the API URL with HTTPS
-    api_url = (f'https://smability.sidtecmx.com/SmabilityAPI/GetData?token={token}'
-               f'&idSensor={sensor_id}&dtStart={dtStart_encoded}&dtEnd={dtEnd_encoded}')
-    
-    print(f"API URL: {api_url}")  # Debug: Print the URL being used
-    
-    # Create a session with custom headers (Approach 1)
-    session = requests.Session()
-    session.headers.update({
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-        'Accept': 'application/json, text/plain, */*',
-        'Accept-Language': 'en-US,en;q=0.9',
-        'Accept-Encoding': 'gzip, deflate, br',
-        'Connection': 'keep-alive',
-        'Cache-Control': 'no-cache'
-    })
-    
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (1e3, 1e4, 1e5, 1e6, 1e7, 1e8)
+
+
+class Histogram:
+    """Fixed-bucket histogram with a running sum and count."""
+
+    __slots__ = ('bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    """
+    Process-wide counters and histograms for requests and processing stages.
+
+    Disabled by default: every recording call checks one attribute and returns,
+    so instrumentation costs close to nothing until enable_instrumentation() is
+    called. Per-request records can also be pushed to hooks (callables).
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.hooks = []
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+
+    def inc(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted((label, str(value)) for label, value in labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, buckets=LATENCY_BUCKETS, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted((label, str(value)) for label, value in labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def emit(self, record):
+        # Hand a per-request record to every hook, a failing hook must not break fetching
+        for hook in self.hooks:
+            try:
+                hook(record)
+            except Exception:
+                logger.exception("Metrics hook failed")
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def snapshot(self):
+        """Return {'counters': {...}, 'histograms': {...}} keyed by (name, labels)."""
+        with self._lock:
+            return {
+                'counters': dict(self._counters),
+                'histograms': {key: {'buckets': dict(zip(h.bounds + (float('inf'),), h.counts)),
+                                     'sum': h.sum, 'count': h.count}
+                               for key, h in self._histograms.items()}
+            }
+
+    def render_prometheus(self):
+        """Return all metrics in the Prometheus text exposition format."""
+        def label_text(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ''
+            return '{' + ','.join(f'{key}="{value}"' for key, value in pairs) + '}'
+
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items(), key=lambda item: item[0])
+            declared = set()
+            for (name, labels), value in counters:
+                if name not in declared:
+                    lines.append(f"# TYPE {name} counter")
+                    declared.add(name)
+                lines.append(f"{name}{label_text(labels)} {value}")
+            for (name, labels), histogram in histograms:
+                if name not in declared:
+                    lines.append(f"# TYPE {name} histogram")
+                    declared.add(name)
+                cumulative = 0
+                for bound, count in zip(histogram.bounds + (float('inf'),), histogram.counts):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f"{name}_bucket{label_text(labels, [('le', le)])} {cumulative}")
+                lines.append(f"{name}_sum{label_text(labels)} {histogram.sum}")
+                lines.append(f"{name}_count{label_text(labels)} {histogram.count}")
+        return '\n'.join(lines) + '\n'
+
+
+METRICS = Metrics()
+
+
+def enable_instrumentation(enabled=True, hook=None):
+    """
+    Turn request and stage instrumentation on or off.
+
+    Parameters:
+        enabled (bool): Whether metrics are recorded.
+        hook (callable): Optional function receiving one dict per GetData request
+            (sensor_id, status, seconds, ttfb_seconds, transfer_seconds, parse_seconds,
+            bytes, rows, error).
+    """
+    METRICS.enabled = enabled
+    if hook is not None:
+        METRICS.hooks.append(hook)
+
+
+class timed:
+    """
+    Record the duration of a processing stage in smability_stage_seconds.
+
+    Use as a context manager (`with timed('aggregate'):`) or as a function
+    decorator (`@timed('plot')`).
+    """
+
+    __slots__ = ('stage', 'start')
+
+    def __init__(self, stage):
+        self.stage = stage
+        self.start = None
+
+    def __enter__(self):
+        if METRICS.enabled:
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.start is not None:
+            METRICS.observe('smability_stage_seconds', time.perf_counter() - self.start, stage=self.stage)
+        return False
+
+    def __call__(self, function):
+        stage = self.stage
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not METRICS.enabled:
+                return function(*args, **kwargs)
+            with timed(stage):
+                return function(*args, **kwargs)
+        return wrapper
+
+
+class _TimedConnectionMixin:
+    # Splits connection setup into DNS, TCP connect and TLS handshake when instrumentation is on
+
+    def _new_conn(self):
+        if not METRICS.enabled:
+            return super()._new_conn()
+        host = self._dns_host
+        start = time.perf_counter()
+        try:
+            addresses = [info[4][0] for info in socket.getaddrinfo(host, self.port, 0, socket.SOCK_STREAM)]
+        except OSError:
+            addresses = [host]  # Let urllib3 raise its usual resolution error
+        resolved = time.perf_counter()
+        METRICS.observe('smability_dns_seconds', resolved - start)
+
+        # Connect to the addresses already resolved, in order, like create_connection does
+        error = None
+        try:
+            for address in dict.fromkeys(addresses):
+                self._dns_host = address
+                try:
+                    sock = super()._new_conn()
+                    break
+                except Exception as e:
+                    error = e
+            else:
+                raise error
+        finally:
+            self._dns_host = host
+        self._tcp_done = time.perf_counter()
+        METRICS.observe('smability_connect_seconds', self._tcp_done - resolved)
+        METRICS.inc('smability_connections_total')
+        return sock
+
+    def connect(self):
+        self._tcp_done = None
+        super().connect()
+        if METRICS.enabled and self._tcp_done is not None and isinstance(self, HTTPSConnection):
+            METRICS.observe('smability_tls_seconds', time.perf_counter() - self._tcp_done)
+
+
+class _TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class _TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class _InstrumentedAdapter(HTTPAdapter):
+    # HTTPAdapter whose pools use the timed connection classes
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {'http': _TimedHTTPConnectionPool,
+                                                   'https': _TimedHTTPSConnectionPool}
+
+
+TRANSIENT_STATUS_CODES = frozenset([429, 500, 502, 503, 504])
+
+
+def _is_transient(error):
+    # Errors worth retrying: dropped connections, timeouts, throttling and 5xx answers
+    if isinstance(error, requests.exceptions.HTTPError):
+        response = error.response
+        return response is not None and response.status_code in TRANSIENT_STATUS_CODES
+    if isinstance(error, requests.exceptions.SSLError):
+        return False
+    return isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                              requests.exceptions.ChunkedEncodingError))
+
+
+def _retry_after(error):
+    # Seconds requested by a Retry-After header, if any
+    response = getattr(error, 'response', None)
+    if response is None:
+        return None
     try:
-        print("Using Approach 1: HTTPS with SSL verification")
-        
-        response = session.get(
-            url=api_url, 
-            timeout=30,
-            verify=True  # SSL verification enabled
+        return float(response.headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return None
+
+
+class RequestBudgetExceeded(RuntimeError):
+    """Raised instead of sending a request once the scheduler's RequestBudget is used up."""
+
+
+class RequestBudget:
+    """
+    Thread-safe cap on the number of requests, shared by everything using it.
+
+    Every attempt takes one unit, retries included, so `used` is the number
+    of requests actually sent.
+
+    Parameters:
+        limit (int): Requests allowed.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.used = 0
+        self._lock = threading.Lock()
+
+    def take(self):
+        """Take one request from the budget; False when none is left."""
+        with self._lock:
+            if self.used >= self.limit:
+                return False
+            self.used += 1
+            return True
+
+    @property
+    def remaining(self):
+        return max(0, self.limit - self.used)
+
+
+class RequestScheduler:
+    """
+    Rate-limited, adaptively concurrent executor for GetData calls.
+
+    Every call waits for a token from a token bucket (rate limit) and for a
+    free slot under the current concurrency limit. Transient failures are
+    retried with full-jitter exponential backoff (honoring Retry-After). The
+    concurrency limit follows AIMD: it is halved when a request fails
+    transiently or is slower than the latency target, and grows back by about
+    one slot per window of healthy requests.
+
+    Parameters:
+        rate (float): Requests per second allowed on average (None for no rate limit).
+        burst (int): Token bucket size, the number of requests allowed back to back.
+        max_concurrency (int): Upper bound of the adaptive concurrency limit.
+        min_concurrency (int): Lower bound of the adaptive concurrency limit.
+        max_retries (int): Retries per call for transient errors.
+        base_delay (float): Backoff base in seconds (delay ~ U(0, base_delay * 2**attempt)).
+        max_delay (float): Cap of a single backoff delay in seconds.
+        latency_target (float): Request latency in seconds above which concurrency is reduced.
+        decrease_interval (float): Minimum seconds between two concurrency reductions.
+        budget (RequestBudget): Cap on the requests sent, retries included (None: unlimited).
+    """
+
+    def __init__(self, rate=20.0, burst=40, max_concurrency=16, min_concurrency=1, max_retries=3,
+                 base_delay=0.5, max_delay=30.0, latency_target=5.0, decrease_interval=1.0, budget=None):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_concurrency = max(1, min(min_concurrency, self.max_concurrency))
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.latency_target = latency_target
+        self.decrease_interval = decrease_interval
+        self.budget = budget
+
+        self.limit = float(self.max_concurrency)
+        self.in_flight = 0
+        self.error_rate = 0.0  # EWMA of transient failures
+        self.latency = None  # EWMA of request latency
+        self.retries = 0
+        self.requests = 0  # Attempts sent, retries included
+
+        self._tokens = float(self.burst)
+        self._refilled_at = time.monotonic()
+        self._decreased_at = 0.0
+        self._bucket_lock = threading.Lock()
+        self._slots = threading.Condition()
+
+    def _take_token(self):
+        if self.rate is None:
+            return
+        while True:
+            with self._bucket_lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+                self._refilled_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait_seconds = (1 - self._tokens) / self.rate
+            time.sleep(wait_seconds)
+
+    def _acquire_slot(self):
+        with self._slots:
+            while self.in_flight >= int(self.limit):
+                self._slots.wait()
+            self.in_flight += 1
+
+    def _begin_attempt(self):
+        if self.budget is not None and not self.budget.take():
+            raise RequestBudgetExceeded(f"Request budget of {self.budget.limit} exhausted")
+        self._take_token()
+        self._acquire_slot()
+        with self._slots:
+            self.requests += 1
+
+    def _release_slot(self, latency, failed):
+        with self._slots:
+            self.in_flight -= 1
+            self.error_rate = 0.9 * self.error_rate + 0.1 * (1.0 if failed else 0.0)
+            if latency is not None:
+                self.latency = latency if self.latency is None else 0.9 * self.latency + 0.1 * latency
+
+            now = time.monotonic()
+            if failed or (latency is not None and latency > self.latency_target):
+                # Multiplicative decrease, at most once per interval so a burst of errors counts once
+                if now - self._decreased_at >= self.decrease_interval:
+                    self.limit = max(self.min_concurrency, self.limit / 2)
+                    self._decreased_at = now
+                    METRICS.inc('smability_concurrency_decreases_total')
+            else:
+                # Additive increase: about +1 slot per `limit` healthy requests
+                self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+            self._slots.notify_all()
+
+    def backoff(self, attempt, error=None):
+        """Delay in seconds before retry number `attempt` (0-based)."""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        retry_after = _retry_after(error)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_delay))
+        return delay
+
+    def call(self, function, *args, **kwargs):
+        """
+        Run `function(*args, **kwargs)` under the rate limit and concurrency cap, retrying transient errors.
+
+        Returns:
+            Whatever `function` returns.
+
+        Raises:
+            RequestBudgetExceeded: If the budget runs out before an attempt.
+            The last error once retries are exhausted, or any non-transient error immediately.
+        """
+        attempt = 0
+        while True:
+            self._begin_attempt()
+            start = time.monotonic()
+            try:
+                result = function(*args, **kwargs)
+            except Exception as e:
+                transient = _is_transient(e)
+                self._release_slot(time.monotonic() - start, transient)
+                if not transient or attempt >= self.max_retries:
+                    raise
+                METRICS.inc('smability_retries_total', error=type(e).__name__)
+                self.retries += 1
+                time.sleep(self.backoff(attempt, e))
+                attempt += 1
+                continue
+            self._release_slot(time.monotonic() - start, False)
+            return result
+
+    def stream(self, function, *args, **kwargs):
+        """
+        Iterate `function(*args, **kwargs)`, e.g. a streamed response body, under the rate limit and concurrency cap.
+
+        The concurrency slot is held until the items are exhausted or the
+        generator is closed, so body transfers count against the cap and the
+        latency seen by the adaptive limit covers the whole transfer. A
+        transient error part way through re-runs the whole call; the items
+        already yielded are skipped, so `function` must produce the same items
+        in the same order on every attempt.
+
+        Yields:
+            The items of the last attempt, each exactly once.
+
+        Raises:
+            RequestBudgetExceeded: If the budget runs out before an attempt.
+            The last error once retries are exhausted, or any non-transient error immediately.
+        """
+        attempt = 0
+        delivered = 0
+        while True:
+            self._begin_attempt()
+            start = time.monotonic()
+            released = False
+            items = None
+            try:
+                items = function(*args, **kwargs)
+                skip = delivered
+                for item in items:
+                    if skip:
+                        skip -= 1
+                        continue
+                    delivered += 1
+                    yield item
+            except Exception as e:
+                transient = _is_transient(e)
+                self._release_slot(time.monotonic() - start, transient)
+                released = True
+                if not transient or attempt >= self.max_retries:
+                    raise
+                METRICS.inc('smability_retries_total', error=type(e).__name__)
+                self.retries += 1
+                time.sleep(self.backoff(attempt, e))
+                attempt += 1
+                continue
+            finally:
+                if items is not None and hasattr(items, 'close'):
+                    items.close()
+                if not released:
+                    self._release_slot(time.monotonic() - start, False)
+            return
+
+    def stats(self):
+        """Return the current limit, in-flight count, error rate and latency EWMAs, request and retry counts."""
+        with self._slots:
+            return {'limit': self.limit, 'in_flight': self.in_flight, 'error_rate': self.error_rate,
+                    'latency': self.latency, 'requests': self.requests, 'retries': self.retries}
+
+
+def _redact_token(url):
+    return re.sub(r'token=[^&]*', 'token=***', url)
+
+
+API_BASE_URL = 'https://smability.sidtecmx.com/SmabilityAPI'
+
+API_TIME_FORMAT = '%Y-%m-%d %H:%M:%S'  # dtStart/dtEnd query parameters
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'application/json, text/plain, */*',
+    'Accept-Language': 'en-US,en;q=0.9',
+    'Accept-Encoding': 'gzip, deflate, br',
+    'Connection': 'keep-alive',
+    'Cache-Control': 'no-cache'
+}
+
+
+def _iter_json_array(chunks):
+    """
+    Incrementally decode the items of a top-level JSON array from text chunks.
+
+    Only the item currently being decoded is kept in memory, so a large GetData
+    body is never materialized as one string or one list.
+
+    Parameters:
+        chunks (iterable): str pieces of the JSON document, in order.
+
+    Yields:
+        Each decoded array item.
+
+    Raises:
+        ValueError: If the document is not a well-formed JSON array.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    pos = 0
+    # What may come next: 'open' the '[', 'first' an item or ']', 'item' an item (after a ','),
+    # 'separator' a ',' or ']', 'closed' only whitespace
+    state = 'open'
+    chunks = iter(chunks)
+    finished = False
+
+    while True:
+        while pos < len(buffer) and buffer[pos] in ' \t\r\n':
+            pos += 1
+        if pos < len(buffer):
+            char = buffer[pos]
+            if state == 'open':
+                if char != '[':
+                    raise ValueError("Expected a JSON array from GetData")
+                state = 'first'
+                pos += 1
+                continue
+            if state == 'closed':
+                raise ValueError("Unexpected data after the JSON array from GetData")
+            if char == ']' and state != 'item':
+                state = 'closed'
+                pos += 1
+                continue
+            if state == 'separator':
+                if char != ',':
+                    raise ValueError(f"Expected ',' or ']' between GetData items at {char!r}")
+                state = 'item'
+                pos += 1
+                continue
+            if char in ',]':
+                raise ValueError("Missing item in the GetData array")
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if finished:
+                    raise
+                item, end = None, None
+            # A number is only complete once the following delimiter has arrived
+            if end is not None and (finished or (end < len(buffer) and buffer[end] in ' \t\r\n,]')):
+                yield item
+                state = 'separator'
+                pos = end
+                continue
+        elif finished:
+            if state == 'closed':
+                return
+            raise ValueError("Truncated JSON array from GetData")
+
+        # Need more input: drop the consumed prefix and read the next chunk
+        buffer = buffer[pos:]
+        pos = 0
+        chunk = next(chunks, None)
+        if chunk is None:
+            finished = True
+        else:
+            buffer += chunk
+
+
+class SmabilityClient:
+    """
+    Long-lived HTTP client for the Smability API.
+
+    Owns a single requests.Session with a tuned connection pool so keep-alive
+    connections to the API host are reused across calls instead of paying a
+    new TCP/TLS handshake for every request.
+
+    Parameters:
+        token (str): API token for authentication.
+        base_url (str): Base URL of the Smability API.
+        timeout (float or tuple): Requests timeout, (connect, read) or a single value.
+        pool_maxsize (int): Maximum number of pooled connections kept per host.
+        max_retries (int): Retries for connection errors and 429/5xx responses.
+        backoff_factor (float): Backoff base between retries (seconds).
+        verify (bool): Whether SSL certificates are verified.
+        scheduler (RequestScheduler): Rate limit, concurrency cap and retry policy every
+            GetData call goes through (default: one built from max_retries, backoff_factor
+            and pool_maxsize).
+    """
+
+    def __init__(self, token='', base_url=API_BASE_URL, timeout=(5, 30), pool_maxsize=32,
+                 max_retries=3, backoff_factor=0.5, verify=True, scheduler=None):
+        self.token = token
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.verify = verify
+        self.scheduler = scheduler or RequestScheduler(max_concurrency=pool_maxsize, max_retries=max_retries,
+                                                       base_delay=backoff_factor)
+
+        # Retries are the scheduler's job, the adapter fails fast
+        adapter = _InstrumentedAdapter(pool_connections=4, pool_maxsize=pool_maxsize,
+                                       max_retries=Retry(total=0, read=False, raise_on_status=False))
+
+        self.session = requests.Session()
+        self.session.headers.update(DEFAULT_HEADERS)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def build_url(self, sensor_id, start_time, end_time, token=None):
+        """
+        Build a GetData URL for a sensor and a [start_time, end_time] window.
+
+        Parameters:
+            sensor_id (str or int): ID of the sensor.
+            start_time (datetime): Window start (local time).
+            end_time (datetime): Window end (local time).
+            token (str): Overrides the client token when given.
+
+        Returns:
+            str: The GetData URL.
+        """
+        # URL encode the start and end times
+        dtStart_encoded = start_time.strftime(API_TIME_FORMAT).replace(' ', '%20')
+        dtEnd_encoded = end_time.strftime(API_TIME_FORMAT).replace(' ', '%20')
+        token = self.token if token is None else token
+        return (f'{self.base_url}/GetData?token={token}'
+                f'&idSensor={sensor_id}&dtStart={dtStart_encoded}&dtEnd={dtEnd_encoded}')
+
+    def get(self, sensor_id, start_time, end_time, token=None):
+        """
+        Issue a GetData request through the scheduler and the pooled session.
+
+        Returns:
+            requests.Response: The raw response, whatever its status; connection and
+                timeout errors are retried and then propagate.
+        """
+        return self.scheduler.call(self._get_once, sensor_id, start_time, end_time, token)
+
+    def _get_once(self, sensor_id, start_time, end_time, token=None, stream=False):
+        return self.session.get(
+            url=self.build_url(sensor_id, start_time, end_time, token),
+            timeout=self.timeout,
+            verify=self.verify,
+            stream=stream
         )
-        
-        print(f"Status code: {response.status_code}")
-        
-        if response.status_code == 200:
-            # Return the parsed JSON data if the request is successful
-            return response.json()
+
+    def get_data(self, sensor_id, start_time, end_time, token=None):
+        """
+        Fetch and decode GetData readings for a window.
+
+        Returns:
+            list: The parsed JSON payload.
+
+        Raises:
+            requests.exceptions.HTTPError: If the API answers with a non-200 status.
+        """
+        return self.scheduler.call(self._get_data_once, sensor_id, start_time, end_time, token)
+
+    def _get_data_once(self, sensor_id, start_time, end_time, token=None):
+        if METRICS.enabled:
+            return self._get_data_instrumented(sensor_id, start_time, end_time, token)
+        response = self._get_once(sensor_id, start_time, end_time, token)
+        if response.status_code != 200:
+            raise requests.exceptions.HTTPError(
+                f"Unable to fetch data (status code {response.status_code})", response=response)
+        return response.json()
+
+    def _get_data_instrumented(self, sensor_id, start_time, end_time, token=None):
+        # Same as get_data, timing headers, body transfer and JSON parsing separately
+        record = {'sensor_id': str(sensor_id), 'status': None, 'seconds': None, 'ttfb_seconds': None,
+                  'transfer_seconds': None, 'parse_seconds': None, 'bytes': 0, 'rows': 0, 'error': None}
+        start = time.perf_counter()
+        try:
+            # Streamed, so the session returns at the headers and the body is read (and timed) here
+            response = self._get_once(sensor_id, start_time, end_time, token, stream=True)
+            headers_at = time.perf_counter()
+            with response:
+                body = response.content
+            transferred_at = time.perf_counter()
+            record.update(status=response.status_code, ttfb_seconds=headers_at - start,
+                          transfer_seconds=transferred_at - headers_at, bytes=len(body))
+            if response.status_code != 200:
+                raise requests.exceptions.HTTPError(
+                    f"Unable to fetch data (status code {response.status_code})", response=response)
+            data = response.json()
+            record['parse_seconds'] = time.perf_counter() - transferred_at
+            record['rows'] = len(data) if isinstance(data, list) else 0
+            return data
+        except Exception as e:
+            record['error'] = type(e).__name__
+            raise
+        finally:
+            record['seconds'] = time.perf_counter() - start
+            _record_request(record)
+
+    def iter_data(self, sensor_id, start_time, end_time, token=None, chunk_size=65536):
+        """
+        Stream GetData readings for a window, decoding records as the body arrives.
+
+        The whole transfer runs under the scheduler: the request holds its
+        concurrency slot until the body is consumed or the generator is closed,
+        and a transient error mid-body retries the window without yielding any
+        record twice.
+
+        Yields:
+            dict: One GetData record at a time.
+
+        Raises:
+            requests.exceptions.HTTPError: If the API answers with a non-200 status.
+            ValueError: If the body is not a JSON array.
+        """
+        yield from self.scheduler.stream(self._iter_data_once, sensor_id, start_time, end_time, token, chunk_size)
+
+    def _iter_data_once(self, sensor_id, start_time, end_time, token=None, chunk_size=65536):
+        record = {'sensor_id': str(sensor_id), 'status': None, 'seconds': None, 'ttfb_seconds': None,
+                  'transfer_seconds': None, 'parse_seconds': None, 'bytes': 0, 'rows': 0, 'error': None}
+        start = time.perf_counter()
+        try:
+            with self._open_stream(sensor_id, start_time, end_time, token) as response:
+                record.update(status=response.status_code, ttfb_seconds=time.perf_counter() - start)
+                decoder = codecs.getincrementaldecoder(response.encoding or 'utf-8')(errors='replace')
+
+                def text_chunks():
+                    for chunk in response.iter_content(chunk_size=chunk_size):
+                        record['bytes'] += len(chunk)
+                        yield decoder.decode(chunk)
+
+                # Transfer and parsing are interleaved here, so only the total is timed
+                for item in _iter_json_array(text_chunks()):
+                    record['rows'] += 1
+                    yield item
+        except Exception as e:
+            record['error'] = type(e).__name__
+            raise
+        finally:
+            record['seconds'] = time.perf_counter() - start
+            if METRICS.enabled:
+                _record_request(record)
+
+    def _open_stream(self, sensor_id, start_time, end_time, token=None):
+        response = self._get_once(sensor_id, start_time, end_time, token, stream=True)
+        if response.status_code != 200:
+            response.close()
+            raise requests.exceptions.HTTPError(
+                f"Unable to fetch data (status code {response.status_code})", response=response)
+        return response
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _record_request(record):
+    # Fold one GetData request record into the metrics and hand it to the hooks
+    METRICS.inc('smability_requests_total', status=record['status'] or 'none')
+    if record['error']:
+        METRICS.inc('smability_request_errors_total', type=record['error'])
+    METRICS.observe('smability_request_seconds', record['seconds'])
+    for name in ('ttfb', 'transfer', 'parse'):
+        if record[f'{name}_seconds'] is not None:
+            METRICS.observe(f'smability_{name}_seconds', record[f'{name}_seconds'])
+    METRICS.inc('smability_response_bytes_total', record['bytes'])
+    METRICS.observe('smability_response_bytes', record['bytes'], buckets=SIZE_BUCKETS)
+    METRICS.inc('smability_rows_total', record['rows'])
+    METRICS.emit(record)
+
+
+_default_client = None
+
+
+def get_default_client():
+    """Return the process-wide SmabilityClient, creating it on first use."""
+    global _default_client
+    if _default_client is None:
+        _default_client = SmabilityClient()
+    return _default_client
+
+
+def local_now(timezone_offset_hours):
+    """Return the current time in the API's local time zone (UTC plus `timezone_offset_hours`)."""
+    return dt.utcnow() + timedelta(hours=timezone_offset_hours)
+
+
+def parse_time(text):
+    """
+    Parse a local time given as 'YYYY-MM-DD HH:MM:SS', 'YYYY-MM-DDTHH:MM:SS' or 'YYYY-MM-DD'.
+
+    Raises:
+        ValueError: If the text matches none of the formats.
+    """
+    for fmt in (API_TIME_FORMAT, API_TIMESTAMP_FORMAT, '%Y-%m-%d'):
+        try:
+            return dt.strptime(text, fmt)
+        except ValueError:
+            pass
+    raise ValueError(f"Invalid time '{text}', expected YYYY-MM-DD[ HH:MM:SS]")
+
+
+def parse_time_argument(text):
+    """parse_time for argparse `type=`: reports the parse error instead of a generic "invalid value"."""
+    import argparse
+    try:
+        return parse_time(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def read_sensor_ids(values):
+    """
+    Expand sensor ID arguments: comma separated IDs, or @file with one ID per line (# comments allowed).
+
+    Returns:
+        list: The sensor IDs, in the order given.
+    """
+    sensor_ids = []
+    for value in values:
+        if value.startswith('@'):
+            with open(value[1:]) as handle:
+                sensor_ids.extend(line.split('#')[0].strip() for line in handle if line.split('#')[0].strip())
         else:
-            return f"Error: Unable to fetch data (status code {response.status_code})"
-            
+            sensor_ids.extend(part for part in value.split(',') if part)
+    return sensor_ids
+
+
+def _merge_payloads(payloads):
+    # Concatenate the GetData payloads of consecutive sub-windows, records untouched. Sub-windows share
+    # their boundary instant, so a chunk's leading records already returned by the previous one are dropped
+    merged = []
+    for payload in payloads:
+        if not isinstance(payload, list):
+            raise ValueError("Expected a JSON array from GetData")
+        last = merged[-1].get('TimeStamp') if merged and isinstance(merged[-1], dict) else None
+        skip = 0
+        if isinstance(last, str):
+            while (skip < len(payload) and isinstance(payload[skip], dict)
+                   and isinstance(payload[skip].get('TimeStamp'), str) and payload[skip]['TimeStamp'] <= last):
+                skip += 1
+        merged.extend(payload[skip:])
+    return merged
+
+
+# IoT API function to fetch air quality at sample rate (5min or 1 min)
+def get_air_quality_data(sensor_id, token, timeDeltaArgKey, timeDeltaArgValue, timezone_offset_hours=-6,
+                         client=None, chunk=timedelta(days=1)):
+    client = client or get_default_client()
+    current_time = local_now(timezone_offset_hours)
+
+    # Define the time window, one minute, 1h,8h,12h,24,1day,7day,earlier
+    end_time = current_time
+    start_time = current_time - timedelta(**{timeDeltaArgKey: timeDeltaArgValue})
+
+    logger.debug("GetData %s", _redact_token(client.build_url(sensor_id, start_time, end_time, token)))
+
+    try:
+        # Long ranges are split into sub-windows fetched in parallel, merged back into one payload
+        if chunk is not None and end_time - start_time > chunk:
+            windows = split_window(start_time, end_time, chunk)
+            with ThreadPoolExecutor(max_workers=min(8, len(windows))) as executor:
+                payloads = list(executor.map(lambda window: client.get_data(sensor_id, *window, token), windows))
+            return _merge_payloads(payloads)
+        # Return the parsed JSON data if the request is successful
+        return client.get_data(sensor_id, start_time, end_time, token)
+
+    except requests.exceptions.HTTPError as e:
+        return f"Error: {str(e)}"
     except requests.exceptions.SSLError as e:
         return f"SSL Error: {str(e)}"
     except requests.exceptions.ConnectionError as e:
@@ -73,174 +918,2346 @@ def get_air_quality_data(sensor_id, token, timeDeltaArgKey, timeDeltaArgValue, t
         return f"Unexpected Error: {str(e)}"
 
 
-def get_hourly_air_quality(sensor_id, token, hours, timezone_offset_hours=-6):
+def fetch_error(e):
+    """Map a fetch exception to the {"error", "details"} dict used across the module."""
+    if isinstance(e, requests.exceptions.HTTPError):
+        return {"error": str(e)}
+    if isinstance(e, requests.exceptions.SSLError):
+        return {"error": "SSL Error", "details": str(e)}
+    if isinstance(e, requests.exceptions.ConnectionError):
+        return {"error": "Connection Error", "details": str(e)}
+    if isinstance(e, requests.exceptions.Timeout):
+        return {"error": "Timeout Error", "details": str(e)}
+    if isinstance(e, ValueError):
+        return {"error": "Invalid JSON format from API", "details": str(e)}
+    if isinstance(e, RequestBudgetExceeded):
+        return {"error": "Request Budget Exceeded", "details": str(e)}
+    return {"error": "Unexpected Error", "details": str(e)}
+
+
+def get_air_quality_data_batch(sensor_ids, token, timeDeltaArgKey, timeDeltaArgValue, timezone_offset_hours=-6,
+                               max_workers=16, timeout=None, client=None):
+    """
+    Fetch raw readings for many sensors concurrently over the same time window.
+
+    Requests run on a bounded thread pool sharing the client's connection pool,
+    so one slow or failing sensor does not hold up the rest of the sweep.
+
+    Parameters:
+        sensor_ids (iterable): IDs of the sensors to fetch.
+        token (str): API token for authentication.
+        timeDeltaArgKey (str): timedelta keyword for the window length ("minutes", "hours", "days").
+        timeDeltaArgValue (int): Window length in timeDeltaArgKey units.
+        timezone_offset_hours (int): Offset for local time zone (default -6).
+        max_workers (int): Maximum number of requests in flight.
+        timeout (float): Overall deadline in seconds for the sweep; sensors still
+            pending when it expires are reported as timeouts (default: no deadline).
+        client (SmabilityClient): Client to fetch through (default: shared client).
+
+    Returns:
+        dict: sensor_id -> list of readings, or an {"error", "details"} dict for that sensor.
+    """
+    client = client or get_default_client()
+    sensor_ids = list(dict.fromkeys(sensor_ids))  # Drop duplicates, keep order
+
+    # Every sensor is queried over the same window
+    end_time = local_now(timezone_offset_hours)
+    start_time = end_time - timedelta(**{timeDeltaArgKey: timeDeltaArgValue})
+
+    results = {}
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(sensor_ids) or 1)))
+    try:
+        futures = {executor.submit(client.get_data, sensor_id, start_time, end_time, token): sensor_id
+                   for sensor_id in sensor_ids}
+        done, pending = wait(futures, timeout=timeout)
+
+        for future in done:
+            try:
+                results[futures[future]] = future.result()
+            except Exception as e:
+                results[futures[future]] = fetch_error(e)
+
+        for future in pending:
+            future.cancel()
+            results[futures[future]] = {"error": "Timeout Error",
+                                        "details": f"No response within the {timeout}s sweep deadline"}
+    finally:
+        # Do not block on stragglers past the deadline
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return {sensor_id: results[sensor_id] for sensor_id in sensor_ids}
+
+
+API_TIMESTAMP_FORMAT = '%Y-%m-%dT%H:%M:%S'
+
+
+class ReadingSeries:
+    """
+    Compact columnar series of readings for one sensor, parsed once.
+
+    Holds a sorted datetime64[s] timestamp array and a float32 value array
+    (12 bytes per reading instead of a dict of two strings). Slicing by time
+    returns views over the same buffers, no data is copied.
+
+    Parameters:
+        timestamps (array-like): Reading times, convertible to datetime64[s], ascending.
+        values (array-like): Reading values, convertible to float32.
+        sensor_id (str): ID of the sensor.
+        metadata (dict): Free-form sensor metadata (pollutant, units, station, ...).
+    """
+
+    __slots__ = ('timestamps', 'values', 'sensor_id', 'metadata')
+
+    def __init__(self, timestamps, values, sensor_id=None, metadata=None):
+        self.timestamps = np.asarray(timestamps, dtype='datetime64[s]')
+        self.values = np.asarray(values, dtype=np.float32)
+        if self.timestamps.shape != self.values.shape or self.timestamps.ndim != 1:
+            raise ValueError("timestamps and values must be 1-D arrays of the same length")
+        self.sensor_id = sensor_id
+        self.metadata = metadata if metadata is not None else {}
+
+    @classmethod
+    def from_records(cls, air_quality_data, sensor_id=None, metadata=None):
+        """Build a series from GetData records ({'TimeStamp', 'Data'} dicts), sorting by time if needed."""
+        timestamps, values = _parse_readings(air_quality_data)
+        if len(timestamps) > 1 and np.any(timestamps[1:] < timestamps[:-1]):
+            order = np.argsort(timestamps, kind='stable')
+            timestamps, values = timestamps[order], values[order]
+        return cls(timestamps, values, sensor_id, metadata)
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def __repr__(self):
+        span = f"{self.timestamps[0]} .. {self.timestamps[-1]}" if len(self) else "empty"
+        return f"ReadingSeries(sensor_id={self.sensor_id!r}, n={len(self)}, {span})"
+
+    @property
+    def nbytes(self):
+        return self.timestamps.nbytes + self.values.nbytes
+
+    def slice(self, start_time=None, end_time=None):
+        """
+        Return the readings in [start_time, end_time) as a view of this series.
+
+        Parameters:
+            start_time (datetime or datetime64): Inclusive start, default: first reading.
+            end_time (datetime or datetime64): Exclusive end, default: after the last reading.
+        """
+        lo = 0 if start_time is None else np.searchsorted(self.timestamps, np.datetime64(start_time, 's'), 'left')
+        hi = len(self) if end_time is None else np.searchsorted(self.timestamps, np.datetime64(end_time, 's'), 'left')
+        return ReadingSeries(self.timestamps[lo:hi], self.values[lo:hi], self.sensor_id, self.metadata)
+
+    def to_records(self):
+        """Return the readings as GetData-style records (values as strings, like the API)."""
+        labels = np.datetime_as_string(self.timestamps, unit='s')
+        return [{'TimeStamp': label, 'Data': value}
+                for label, value in zip(labels.tolist(), self.values.astype(str).tolist())]
+
+
+def _as_series(air_quality_data, sensor_id=None):
+    # Accept either a ReadingSeries or GetData records
+    if isinstance(air_quality_data, ReadingSeries):
+        return air_quality_data
+    return ReadingSeries.from_records(air_quality_data, sensor_id)
+
+
+def split_window(start_time, end_time, chunk):
+    """Split [start_time, end_time] into consecutive [start, end] sub-windows of at most `chunk`."""
+    windows = []
+    cursor = start_time
+    while cursor < end_time:
+        windows.append((cursor, min(cursor + chunk, end_time)))
+        cursor += chunk
+    return windows
+
+
+def _fetch_series_chunk(client, sensor_id, start_time, end_time, token):
+    # Stream one sub-window straight into flat lists, no per-record dicts are kept
+    timestamps = []
+    values = []
+    for entry in client.iter_data(sensor_id, start_time, end_time, token):
+        try:
+            value = float(entry['Data'])
+            timestamp = entry['TimeStamp']
+        except (ValueError, KeyError, TypeError):
+            continue
+        timestamps.append(timestamp)
+        values.append(value)
+    return np.array(timestamps, dtype='datetime64[s]'), np.array(values, dtype=np.float32)
+
+
+def get_air_quality_series(sensor_id, token, start_time, end_time, chunk=timedelta(days=1), max_workers=8,
+                           client=None):
+    """
+    Fetch a long window of readings as one ordered, de-duplicated ReadingSeries.
+
+    The range is split into sub-windows of at most `chunk` that are fetched in
+    parallel; each response body is decoded as a stream, so neither one huge
+    GetData call nor one huge JSON document is ever needed.
+
+    Parameters:
+        sensor_id (str): ID of the sensor.
+        token (str): API token for authentication.
+        start_time (datetime): Window start (local time).
+        end_time (datetime): Window end (local time).
+        chunk (timedelta): Maximum length of one GetData request.
+        max_workers (int): Maximum number of sub-windows fetched at once.
+        client (SmabilityClient): Client to fetch through (default: shared client).
+
+    Returns:
+        ReadingSeries: The readings of the whole window.
+
+    Raises:
+        requests.exceptions.RequestException, ValueError: If any sub-window fails.
+    """
+    client = client or get_default_client()
+    windows = split_window(start_time, end_time, chunk)
+
+    if len(windows) <= 1:
+        parts = [_fetch_series_chunk(client, sensor_id, start_time, end_time, token)]
+    else:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(windows)))) as executor:
+            parts = list(executor.map(lambda window: _fetch_series_chunk(client, sensor_id, *window, token),
+                                      windows))
+
+    timestamps = np.concatenate([part[0] for part in parts]) if parts else np.array([], dtype='datetime64[s]')
+    values = np.concatenate([part[1] for part in parts]) if parts else np.array([], dtype=np.float32)
+
+    # Sub-windows share their boundary instants: sort and keep one reading per timestamp
+    order = np.argsort(timestamps, kind='stable')
+    timestamps, first = np.unique(timestamps[order], return_index=True)
+    values = values[order][first]
+    return ReadingSeries(timestamps, values, str(sensor_id))
+
+
+class ReadingCache:
+    """
+    Persistent SQLite store of sensor readings with per-sensor fetch coverage.
+
+    Readings are keyed by (sensor, TimeStamp) so re-fetched samples simply
+    overwrite themselves. The store also remembers which time ranges have
+    already been fetched, so callers only ask GetData for what is missing.
+
+    Parameters:
+        path (str): SQLite database file (":memory:" for a throwaway cache).
+        settle_minutes (int): Trailing minutes of a fetched range that are not
+            considered final when no readings arrived for them yet.
+    """
+
+    def __init__(self, path='smability_cache.sqlite3', settle_minutes=15):
+        self.path = path
+        self.settle = timedelta(minutes=settle_minutes)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS readings ('
+                'sensor_id TEXT NOT NULL, ts TEXT NOT NULL, value REAL, '
+                'PRIMARY KEY (sensor_id, ts)) WITHOUT ROWID')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS coverage ('
+                'sensor_id TEXT NOT NULL, start TEXT NOT NULL, end TEXT NOT NULL)')
+
+    def latest_timestamp(self, sensor_id):
+        """Return the newest stored reading time for a sensor, or None."""
+        with self._lock:
+            row = self._conn.execute('SELECT MAX(ts) FROM readings WHERE sensor_id = ?',
+                                     (str(sensor_id),)).fetchone()
+        return dt.strptime(row[0], API_TIMESTAMP_FORMAT) if row and row[0] else None
+
+    def _coverage(self, sensor_id):
+        rows = self._conn.execute('SELECT start, end FROM coverage WHERE sensor_id = ? ORDER BY start',
+                                  (str(sensor_id),)).fetchall()
+        return [(dt.strptime(a, API_TIMESTAMP_FORMAT), dt.strptime(b, API_TIMESTAMP_FORMAT)) for a, b in rows]
+
+    def missing_ranges(self, sensor_id, start_time, end_time):
+        """
+        Return the sub-ranges of [start_time, end_time] not fetched yet.
+
+        Returns:
+            list: (start, end) datetime tuples in ascending order.
+        """
+        with self._lock:
+            covered = self._coverage(sensor_id)
+
+        missing = []
+        cursor = start_time
+        for a, b in covered:
+            if b < cursor:
+                continue
+            if a > end_time:
+                break
+            if a > cursor:
+                missing.append((cursor, a))
+            cursor = max(cursor, b)
+        if cursor < end_time:
+            missing.append((cursor, end_time))
+        return missing
+
+    def store(self, sensor_id, readings, start_time, end_time, complete=False):
+        """
+        Save readings fetched for [start_time, end_time] and mark the range as covered.
+
+        Readings that fail to parse are skipped. Unless the range is known to be
+        complete (it ends well in the past), the trailing settle window is only
+        marked covered up to the newest reading actually received.
+        """
+        sensor_id = str(sensor_id)
+        rows = []
+        for entry in readings:
+            try:
+                rows.append((sensor_id, entry['TimeStamp'], float(entry['Data'])))
+            except (ValueError, KeyError, TypeError):
+                continue
+
+        covered_end = end_time if complete else end_time - self.settle
+        if rows and not complete:
+            newest = dt.strptime(max(r[1] for r in rows), API_TIMESTAMP_FORMAT)
+            covered_end = max(covered_end, min(newest, end_time))
+
+        with self._lock, self._conn:
+            self._conn.executemany('INSERT OR REPLACE INTO readings (sensor_id, ts, value) VALUES (?, ?, ?)', rows)
+            if covered_end > start_time:
+                self._add_coverage(sensor_id, start_time, covered_end)
+
+    def _add_coverage(self, sensor_id, start_time, end_time):
+        # Merge the new range into the existing ones and rewrite them
+        ranges = sorted(self._coverage(sensor_id) + [(start_time, end_time)])
+        merged = [ranges[0]]
+        for a, b in ranges[1:]:
+            if a <= merged[-1][1] + timedelta(seconds=1):
+                merged[-1] = (merged[-1][0], max(merged[-1][1], b))
+            else:
+                merged.append((a, b))
+        self._conn.execute('DELETE FROM coverage WHERE sensor_id = ?', (sensor_id,))
+        self._conn.executemany('INSERT INTO coverage (sensor_id, start, end) VALUES (?, ?, ?)',
+                               [(sensor_id, a.strftime(API_TIMESTAMP_FORMAT), b.strftime(API_TIMESTAMP_FORMAT))
+                                for a, b in merged])
+
+    def query(self, sensor_id, start_time, end_time):
+        """
+        Return stored readings for [start_time, end_time] in GetData format.
+
+        Returns:
+            list: [{'TimeStamp': str, 'Data': float}, ...] sorted by time.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT ts, value FROM readings WHERE sensor_id = ? AND ts >= ? AND ts <= ? ORDER BY ts',
+                (str(sensor_id), start_time.strftime(API_TIMESTAMP_FORMAT),
+                 end_time.strftime(API_TIMESTAMP_FORMAT))).fetchall()
+        return [{'TimeStamp': ts, 'Data': value} for ts, value in rows]
+
+    def query_series(self, sensor_id, start_time, end_time):
+        """Return stored readings for [start_time, end_time] as a ReadingSeries."""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT ts, value FROM readings WHERE sensor_id = ? AND ts >= ? AND ts <= ? ORDER BY ts',
+                (str(sensor_id), start_time.strftime(API_TIMESTAMP_FORMAT),
+                 end_time.strftime(API_TIMESTAMP_FORMAT))).fetchall()
+        timestamps = np.array([row[0] for row in rows], dtype='datetime64[s]')
+        values = np.array([row[1] for row in rows], dtype=np.float32)
+        return ReadingSeries(timestamps, values, str(sensor_id))
+
+    def close(self):
+        self._conn.close()
+
+
+_default_cache = None
+
+
+def get_default_cache():
+    """Return the process-wide ReadingCache (smability_cache.sqlite3 in the working directory), opened on first use."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ReadingCache()
+    return _default_cache
+
+
+def get_cached_air_quality_data(sensor_id, token, timeDeltaArgKey, timeDeltaArgValue, timezone_offset_hours=-6,
+                                cache=None, client=None):
+    """
+    Fetch air quality readings through a local ReadingCache.
+
+    Only the parts of the window the cache has not seen yet (normally just the
+    samples newer than the last stored one) are requested from GetData; the
+    window itself is answered from the local store.
+
+    Parameters:
+        sensor_id (str): ID of the sensor.
+        token (str): API token for authentication.
+        timeDeltaArgKey (str): timedelta keyword for the window length ("minutes", "hours", "days").
+        timeDeltaArgValue (int): Window length in timeDeltaArgKey units.
+        timezone_offset_hours (int): Offset for local time zone (default -6).
+        cache (ReadingCache): Local store (default: the shared get_default_cache() store).
+        client (SmabilityClient): Client to fetch through (default: shared client).
+
+    Returns:
+        list: Readings in GetData format, or an {"error", "details"} dict if a delta fetch failed.
+    """
+    client = client or get_default_client()
+    cache = cache if cache is not None else get_default_cache()
+
+    end_time = local_now(timezone_offset_hours).replace(microsecond=0)
+    start_time = end_time - timedelta(**{timeDeltaArgKey: timeDeltaArgValue})
+
+    for missing_start, missing_end in cache.missing_ranges(sensor_id, start_time, end_time):
+        try:
+            readings = client.get_data(sensor_id, missing_start, missing_end, token)
+        except Exception as e:
+            return fetch_error(e)
+        if isinstance(readings, list):
+            # Gaps between covered ranges are history; only the live edge can still change
+            cache.store(sensor_id, readings, missing_start, missing_end, complete=missing_end < end_time)
+
+    return cache.query(sensor_id, start_time, end_time)
+
+
+# One archive record: epoch seconds (little-endian int64, read as datetime64[s]) and a float32 value
+ARCHIVE_RECORD = np.dtype([('t', '<M8[s]'), ('v', '<f4')])
+
+# Every ARCHIVE_INDEX_STRIDE-th record's timestamp goes into the sparse index
+ARCHIVE_INDEX_STRIDE = 4096
+
+
+class ReadingArchive:
+    """
+    Append-only binary archive with one memory-mapped file per sensor.
+
+    <directory>/<sensor_id>.rec holds packed 12-byte records (int64 epoch
+    seconds, float32 value) in time order; <sensor_id>.idx holds the
+    timestamp of every ARCHIVE_INDEX_STRIDE-th record. A range read is a
+    binary search in the small index, a second one inside a single block of
+    the mapped file, and a NumPy view over the mapping: the returned
+    ReadingSeries shares memory with the page cache, nothing is parsed or
+    copied.
+
+    Parameters:
+        directory (str): Directory holding the archive files (created if needed).
+    """
+
+    def __init__(self, directory='smability_archive'):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._maps = {}  # sensor_id -> (mapped size, records array, sparse index array)
+
+    def _path(self, sensor_id, extension):
+        return os.path.join(self.directory, quote(str(sensor_id), safe='') + extension)
+
+    def sensors(self):
+        """Return the IDs of the archived sensors."""
+        return sorted(unquote(name[:-4]) for name in os.listdir(self.directory) if name.endswith('.rec'))
+
+    def _records(self, sensor_id):
+        # Records and sparse index of a sensor, remapped when the file has grown
+        path = self._path(sensor_id, '.rec')
+        try:
+            size = os.path.getsize(path)
+        except FileNotFoundError:
+            return np.empty(0, ARCHIVE_RECORD), np.empty(0, 'datetime64[s]')
+        size -= size % ARCHIVE_RECORD.itemsize  # Ignore a torn trailing record
+        with self._lock:
+            cached = self._maps.get(sensor_id)
+            if cached is not None and cached[0] == size:
+                return cached[1], cached[2]
+            if size == 0:
+                records = np.empty(0, ARCHIVE_RECORD)
+            else:
+                with open(path, 'rb') as handle:
+                    mapping = mmap.mmap(handle.fileno(), size, access=mmap.ACCESS_READ)
+                # Views keep the mapping alive; older mappings go away with their last view
+                records = np.frombuffer(mapping, ARCHIVE_RECORD)
+            index = self._load_index(sensor_id, records)
+            self._maps[sensor_id] = (size, records, index)
+            return records, index
+
+    def _load_index(self, sensor_id, records):
+        # Sparse index from disk, rebuilt from the records if it is missing or stale
+        expected = -(-len(records) // ARCHIVE_INDEX_STRIDE)
+        try:
+            index = np.fromfile(self._path(sensor_id, '.idx'), dtype='<M8[s]')
+        except FileNotFoundError:
+            index = np.empty(0, 'datetime64[s]')
+        if len(index) < expected:
+            index = records['t'][::ARCHIVE_INDEX_STRIDE].copy()
+        return index[:expected]
+
+    def last_timestamp(self, sensor_id):
+        """Return the newest archived time of a sensor as datetime64[s], or None."""
+        records, _ = self._records(sensor_id)
+        return records['t'][-1] if len(records) else None
+
+    def count(self, sensor_id):
+        return len(self._records(sensor_id)[0])
+
+    def append(self, sensor_id, air_quality_data):
+        """
+        Append readings newer than the last archived one.
+
+        Older or duplicate timestamps are skipped, so the file stays sorted and
+        re-appending an overlapping fetch is harmless.
+
+        Parameters:
+            sensor_id (str): ID of the sensor.
+            air_quality_data (list or ReadingSeries): Readings to archive.
+
+        Returns:
+            int: Number of records written.
+        """
+        sensor_id = str(sensor_id)
+        series = _as_series(air_quality_data, sensor_id)
+        timestamps, values = series.timestamps, series.values
+        keep = ~np.isnan(values) & ~np.isnat(timestamps)
+        timestamps, values = timestamps[keep], values[keep]
+        if len(timestamps) > 1 and np.any(timestamps[1:] <= timestamps[:-1]):
+            timestamps, first = np.unique(timestamps, return_index=True)
+            values = values[first]
+        last = self.last_timestamp(sensor_id)
+        if last is not None:
+            newer = timestamps > last
+            timestamps, values = timestamps[newer], values[newer]
+        if not len(timestamps):
+            return 0
+
+        batch = np.empty(len(timestamps), ARCHIVE_RECORD)
+        batch['t'] = timestamps
+        batch['v'] = values
+        path = self._path(sensor_id, '.rec')
+        with self._lock:
+            with open(path, 'ab') as handle:
+                size = handle.tell()
+                torn = size % ARCHIVE_RECORD.itemsize
+                if torn:
+                    handle.truncate(size - torn)  # Drop a torn record left by a crash
+                    size -= torn
+                handle.write(batch.tobytes())
+            # Index entries for the records landing on a stride boundary
+            first_position = size // ARCHIVE_RECORD.itemsize
+            index_path = self._path(sensor_id, '.idx')
+            indexed = os.path.getsize(index_path) // 8 if os.path.exists(index_path) else 0
+            if indexed != -(-first_position // ARCHIVE_INDEX_STRIDE):
+                # Missing or stale index (e.g. deleted or torn): rewrite it from the data file
+                stamps = np.fromfile(path, ARCHIVE_RECORD)['t'][::ARCHIVE_INDEX_STRIDE]
+                stamps.tofile(index_path)
+            else:
+                offsets = np.arange((-first_position) % ARCHIVE_INDEX_STRIDE, len(batch), ARCHIVE_INDEX_STRIDE)
+                if len(offsets):
+                    with open(index_path, 'ab') as handle:
+                        handle.write(batch['t'][offsets].tobytes())
+        return len(batch)
+
+    def read(self, sensor_id, start_time=None, end_time=None):
+        """
+        Return the readings in [start_time, end_time) as a zero-copy ReadingSeries.
+
+        The series' arrays are views into the memory-mapped file; they stay
+        valid after later appends (which map the file anew).
+        """
+        records, index = self._records(str(sensor_id))
+        lo = 0 if start_time is None else self._position(records, index, np.datetime64(start_time, 's'))
+        hi = len(records) if end_time is None else self._position(records, index, np.datetime64(end_time, 's'))
+        window = records[lo:hi]
+        return ReadingSeries(window['t'], window['v'], str(sensor_id), {'source': 'archive'})
+
+    def _position(self, records, index, timestamp):
+        # First record at or after `timestamp`: sparse index first, then one block of the file
+        block = max(0, int(np.searchsorted(index, timestamp, side='left')) - 1)
+        lo = block * ARCHIVE_INDEX_STRIDE
+        hi = min(len(records), lo + 2 * ARCHIVE_INDEX_STRIDE)
+        return lo + int(np.searchsorted(records['t'][lo:hi], timestamp, side='left'))
+
+
+def update_archive(archive, sensor_id, token, start_time, end_time, client=None, max_workers=8):
+    """
+    Fetch what the archive is missing up to `end_time` and append it.
+
+    Only readings after the newest archived one are requested (from
+    `start_time` for a sensor not archived yet).
+
+    Returns:
+        int: Records appended, or an {"error", "details"} dict if the fetch failed.
+    """
+    last = archive.last_timestamp(sensor_id)
+    if last is not None:
+        start_time = max(start_time, last.astype(dt) + timedelta(seconds=1))
+    if start_time >= end_time:
+        return 0
+    try:
+        series = get_air_quality_series(sensor_id, token, start_time, end_time, max_workers=max_workers,
+                                        client=client)
+    except Exception as e:
+        return fetch_error(e)
+    return archive.append(sensor_id, series)
+
+
+BUCKET_UNITS = {'s': 1, 'min': 60, 'h': 3600, 'd': 86400}
+
+
+def _bucket_seconds(bucket):
+    # Accept timedelta or strings like '5min', '15min', '1h', '8h', '1d'
+    if isinstance(bucket, timedelta):
+        seconds = int(bucket.total_seconds())
+    else:
+        number = bucket.rstrip('abcdefghijklmnopqrstuvwxyz')
+        unit = bucket[len(number):]
+        if unit not in BUCKET_UNITS:
+            raise ValueError(f"Unknown bucket size: {bucket!r}")
+        seconds = int(number or 1) * BUCKET_UNITS[unit]
+    if seconds <= 0:
+        raise ValueError(f"Bucket size must be positive: {bucket!r}")
+    return seconds
+
+
+def _parse_readings(air_quality_data):
+    # Bulk-parse GetData records into datetime64[s] and float64 arrays
+    if isinstance(air_quality_data, ReadingSeries):
+        return air_quality_data.timestamps, air_quality_data.values.astype(np.float64)
+    timestamps = np.array([entry['TimeStamp'] for entry in air_quality_data], dtype='datetime64[s]')
+    values = np.array([entry['Data'] for entry in air_quality_data]).astype(np.float64)
+    return timestamps, values
+
+
+@timed('aggregate')
+def aggregate_readings(air_quality_data, bucket='1h', stats=('mean',), start_time=None, end_time=None):
+    """
+    Aggregate readings into fixed-size time buckets with vectorized statistics.
+
+    Buckets are aligned to bucket boundaries counted from midnight. When a window
+    is given, every bucket in [start_time, end_time) is returned and empty buckets
+    are filled with NaN (count 0), so callers get a gap-free time axis.
+
+    Parameters:
+        air_quality_data (list or ReadingSeries): Readings in GetData format ({'TimeStamp', 'Data'} dicts)
+            or an already parsed series.
+        bucket (str or timedelta): Bucket size, e.g. '5min', '15min', '1h', '8h', '1d'.
+        stats (iterable): Statistics per bucket: 'mean', 'min', 'max', 'count', 'sum',
+            'median' or percentiles written as 'p<q>' (e.g. 'p95').
+        start_time (datetime): First bucket (floored to the bucket size); default: first reading.
+        end_time (datetime): End of the window, exclusive; default: after the last reading.
+
+    Returns:
+        dict: 'time' (datetime64[s] bucket starts) plus one array per requested statistic.
+    """
+    step = _bucket_seconds(bucket)
+    timestamps, values = _parse_readings(air_quality_data)
+    seconds = timestamps.view(np.int64)  # No copy, also for strided archive views
+
+    if start_time is not None:
+        origin = int(np.datetime64(start_time, 's').astype(np.int64))
+    elif len(seconds):
+        origin = int(seconds.min())
+    else:
+        origin = 0
+    origin -= origin % step
+
+    if end_time is not None:
+        end = int(np.datetime64(end_time, 's').astype(np.int64))
+        n_buckets = max(0, -(-(end - origin) // step))
+    else:
+        # A start_time after every reading leaves no bucket
+        n_buckets = max(0, int((seconds.max() - origin) // step + 1)) if len(seconds) else 0
+
+    # Bucket index per reading, dropping readings outside the window and NaN values
+    idx = (seconds - origin) // step
+    keep = (idx >= 0) & (idx < n_buckets) & ~np.isnan(values)
+    if end_time is not None:
+        keep &= seconds < end  # The last bucket may reach past the window end
+    idx, values = idx[keep], values[keep]
+
+    counts = np.bincount(idx, minlength=n_buckets)
+    nonempty = counts > 0
+    result = {'time': (origin + step * np.arange(n_buckets)).astype('datetime64[s]')}
+
+    # Sort by bucket then value so min/max/percentiles are simple offsets into each bucket
+    order = np.lexsort((values, idx))
+    sorted_values = values[order]
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1])) if n_buckets else counts
+
+    for stat in stats:
+        out = np.full(n_buckets, np.nan)
+        if stat == 'count':
+            result[stat] = counts
+            continue
+        elif stat == 'sum':
+            out = np.bincount(idx, weights=values, minlength=n_buckets).astype(np.float64)
+        elif stat == 'mean':
+            sums = np.bincount(idx, weights=values, minlength=n_buckets)
+            np.divide(sums, counts, out=out, where=nonempty)
+        elif stat == 'min':
+            out[nonempty] = sorted_values[starts[nonempty]]
+        elif stat == 'max':
+            out[nonempty] = sorted_values[starts[nonempty] + counts[nonempty] - 1]
+        elif stat == 'median' or (stat.startswith('p') and stat[1:].replace('.', '', 1).isdigit()):
+            q = 50.0 if stat == 'median' else float(stat[1:])
+            if not 0 <= q <= 100:
+                raise ValueError(f"Percentile out of range: {stat!r}")
+            # Linear interpolation between the closest ranks, as np.percentile does
+            position = starts[nonempty] + (counts[nonempty] - 1) * (q / 100.0)
+            lower = np.floor(position).astype(np.int64)
+            upper = np.ceil(position).astype(np.int64)
+            fraction = position - lower
+            out[nonempty] = sorted_values[lower] * (1 - fraction) + sorted_values[upper] * fraction
+        else:
+            raise ValueError(f"Unknown statistic: {stat!r}")
+        result[stat] = out
+
+    return result
+
+
+# Data-quality flags, one bit per reason a reading is dropped
+QUALITY_INVALID = 1  # Unparseable timestamp or value
+QUALITY_DUPLICATE = 2  # Repeated timestamp, the first reading is kept
+QUALITY_OUT_OF_RANGE = 4  # Outside [min_value, max_value]
+QUALITY_OUTLIER = 8  # Spike against the rolling median/MAD
+QUALITY_STUCK = 16  # Part of a run of identical values
+
+MAD_TO_SIGMA = 1.4826  # MAD of a normal distribution times this is its standard deviation
+
+
+def _parse_readings_lenient(air_quality_data):
+    # Like _parse_readings, but bad entries become NaT/NaN instead of failing the whole batch
+    try:
+        return _parse_readings(air_quality_data)
+    except (ValueError, KeyError, TypeError):
+        pass
+    timestamps = np.full(len(air_quality_data), np.datetime64('NaT'), dtype='datetime64[s]')
+    values = np.full(len(air_quality_data), np.nan)
+    for i, entry in enumerate(air_quality_data):
+        try:
+            timestamps[i] = np.datetime64(entry['TimeStamp'], 's')
+            values[i] = float(entry['Data'])
+        except (ValueError, KeyError, TypeError):
+            timestamps[i] = np.datetime64('NaT')
+    return timestamps, values
+
+
+def _rolling_windows(values, window, centered):
+    # (..., n, window) view of the windows around (or ending at) every sample, edges mirrored
+    values = np.asarray(values, dtype=np.float64)
+    pad = (window // 2, window // 2) if centered else (window - 1, 0)
+    mode = 'reflect' if values.shape[-1] > max(pad) else 'edge'
+    padded = np.pad(values, [(0, 0)] * (values.ndim - 1) + [pad], mode=mode)
+    return np.lib.stride_tricks.sliding_window_view(padded, window, axis=-1)
+
+
+def rolling_median_mad(values, window=15, centered=True):
+    """
+    Rolling median and median absolute deviation along the last axis.
+
+    Parameters:
+        values (array-like): 1-D series or 2-D (sensors x samples) matrix; NaN is ignored.
+        window (int): Window length in samples (made odd).
+        centered (bool): Center the window on each sample; False uses only past samples (for streaming).
+
+    Returns:
+        tuple: (median, mad) arrays shaped like `values`.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if values.shape[-1] == 0:
+        return values.copy(), values.copy()
+    window = max(1, int(window)) | 1
+    windows = _rolling_windows(values, window, centered)
+    if np.isnan(values).any():
+        median = np.nanmedian(windows, axis=-1)
+        mad = np.nanmedian(np.abs(windows - median[..., None]), axis=-1)
+    else:
+        # Odd window: the median is the middle order statistic, a partition is enough
+        middle = window // 2
+        median = np.partition(windows, middle, axis=-1)[..., middle]
+        mad = np.partition(np.abs(windows - median[..., None]), middle, axis=-1)[..., middle]
+    return median, mad
+
+
+def flag_outliers(values, window=15, threshold=5.0, min_scale=1.0, centered=True):
+    """
+    Flag spikes whose robust z-score against the rolling median/MAD exceeds `threshold`.
+
+    Parameters:
+        values (array-like): 1-D series or 2-D (sensors x samples) matrix.
+        window (int): Rolling window length in samples.
+        threshold (float): Robust z-score above which a sample is an outlier.
+        min_scale (float): Lower bound of the robust standard deviation, in data units, so flat
+            stretches (MAD 0) do not turn every small step into an outlier.
+        centered (bool): Center the window on each sample; False uses only past samples.
+
+    Returns:
+        numpy.ndarray: Boolean mask shaped like `values` (NaN is never flagged).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    median, mad = rolling_median_mad(values, window, centered)
+    scale = np.maximum(MAD_TO_SIGMA * mad, min_scale)
+    with np.errstate(invalid='ignore'):
+        return np.abs(values - median) > threshold * scale
+
+
+def flag_stuck(values, min_run=12, tolerance=0.0):
+    """
+    Flag runs of at least `min_run` consecutive samples that do not change by more than `tolerance`.
+
+    Parameters:
+        values (array-like): 1-D series or 2-D (sensors x samples) matrix.
+        min_run (int): Shortest run of constant readings considered a stuck sensor.
+        tolerance (float): Largest step between consecutive samples still counted as constant.
+
+    Returns:
+        numpy.ndarray: Boolean mask shaped like `values`.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if values.shape[-1] == 0:
+        return np.zeros(values.shape, dtype=bool)
+    flat = values.reshape(-1, values.shape[-1])
+    # A new run starts at every change and at the first sample of each row
+    with np.errstate(invalid='ignore'):
+        changed = ~(np.abs(np.diff(flat, axis=-1)) <= tolerance)
+    starts = np.concatenate([np.ones((flat.shape[0], 1), dtype=bool), changed], axis=-1).ravel()
+    run_ids = np.cumsum(starts) - 1
+    run_lengths = np.bincount(run_ids)
+    stuck = (run_lengths[run_ids] >= min_run) & ~np.isnan(flat.ravel())
+    return stuck.reshape(values.shape)
+
+
+def detect_gaps(timestamps, cadence=None, start_time=None, end_time=None, tolerance=1.5):
+    """
+    Find missing intervals against the sensor's expected reporting cadence.
+
+    Parameters:
+        timestamps (array-like): Sorted reading times (datetime64).
+        cadence (int or timedelta): Expected seconds between readings (default: median spacing,
+            e.g. 60 or 300 for 1- or 5-minute sensors).
+        start_time (datetime): Window start; a late first reading counts as a leading gap.
+        end_time (datetime): Window end (exclusive); an early last reading counts as a trailing gap.
+        tolerance (float): Spacing, in cadences, above which readings are missing.
+
+    Returns:
+        dict: 'cadence_seconds', 'gaps' (list of (start, end) datetime64 pairs bounding each gap),
+            'missing' (estimated number of missing readings), 'expected' and 'completeness' (0..1).
+    """
+    seconds = np.asarray(timestamps, dtype='datetime64[s]').astype(np.int64)
+    if isinstance(cadence, timedelta):
+        cadence = cadence.total_seconds()
+    if cadence is None:
+        steps = np.diff(seconds)
+        steps = steps[steps > 0]
+        cadence = float(np.median(steps)) if len(steps) else 60.0
+    cadence = max(1, int(round(cadence)))
+
+    bounds = seconds
+    if start_time is not None:
+        bounds = np.concatenate(([int(np.datetime64(start_time, 's').astype(np.int64)) - cadence], bounds))
+    if end_time is not None:
+        # The window end is exclusive: the last expected reading is one cadence before it
+        bounds = np.concatenate((bounds, [int(np.datetime64(end_time, 's').astype(np.int64))]))
+
+    steps = np.diff(bounds)
+    gap_at = np.flatnonzero(steps > tolerance * cadence)
+    missing_per_gap = np.round(steps[gap_at] / cadence).astype(np.int64) - 1
+    missing = int(missing_per_gap.sum())
+    expected = len(seconds) + missing
+    return {
+        'cadence_seconds': cadence,
+        'gaps': [(np.datetime64(int(bounds[i]), 's'), np.datetime64(int(bounds[i + 1]), 's')) for i in gap_at],
+        'missing': missing,
+        'expected': expected,
+        'completeness': len(seconds) / expected if expected else 1.0,
+    }
+
+
+def quality_flags(timestamps, values, min_value=0.0, max_value=None, outlier_window=15, outlier_threshold=5.0,
+                  min_scale=1.0, stuck_run=12, stuck_tolerance=0.0):
+    """
+    Flag bad readings of one time-sorted series.
+
+    Outliers and stuck runs are searched among the readings that passed the
+    earlier checks, so a corrupt row cannot mask or fake a spike.
+
+    Parameters:
+        timestamps (array-like): Reading times (datetime64, NaT for unparseable), ascending.
+        values (array-like): Reading values (NaN for unparseable).
+        min_value (float): Smallest plausible value (default 0, concentrations cannot be negative).
+        max_value (float): Largest plausible value (default: no upper bound).
+        outlier_window (int): Rolling median/MAD window in samples (None disables the check).
+        outlier_threshold (float): Robust z-score above which a reading is an outlier.
+        min_scale (float): Lower bound of the robust standard deviation (see flag_outliers).
+        stuck_run (int): Shortest run of identical readings flagged as stuck (None disables the check).
+            Runs at min_value are not stuck: a concentration clipped to the floor (night-time O3) stays
+            there legitimately.
+        stuck_tolerance (float): Largest step still counted as identical.
+
+    Returns:
+        numpy.ndarray: uint8 bit mask per reading, 0 for good readings (see QUALITY_* constants).
+    """
+    timestamps = np.asarray(timestamps, dtype='datetime64[s]')
+    values = np.asarray(values, dtype=np.float64)
+    flags = np.zeros(len(values), dtype=np.uint8)
+
+    flags[np.isnat(timestamps) | np.isnan(values)] |= QUALITY_INVALID
+    duplicate = np.zeros(len(values), dtype=bool)
+    duplicate[1:] = timestamps[1:] == timestamps[:-1]
+    flags[duplicate & (flags == 0)] |= QUALITY_DUPLICATE
+    with np.errstate(invalid='ignore'):
+        out_of_range = np.zeros(len(values), dtype=bool)
+        if min_value is not None:
+            out_of_range |= values < min_value
+        if max_value is not None:
+            out_of_range |= values > max_value
+    flags[out_of_range] |= QUALITY_OUT_OF_RANGE
+
+    good = np.flatnonzero(flags == 0)
+    if outlier_window and len(good):
+        flags[good[flag_outliers(values[good], outlier_window, outlier_threshold, min_scale)]] |= QUALITY_OUTLIER
+    if stuck_run and len(good):
+        stuck = flag_stuck(values[good], stuck_run, stuck_tolerance)
+        if min_value is not None:
+            stuck &= values[good] > min_value
+        flags[good[stuck]] |= QUALITY_STUCK
+    return flags
+
+
+@timed('quality')
+def clean_readings(air_quality_data, sensor_id=None, cadence=None, start_time=None, end_time=None, **flag_options):
+    """
+    Drop bad readings and report what was dropped and what is missing.
+
+    Unparseable entries, duplicate timestamps, out-of-range values, rolling
+    median/MAD outliers and stuck-at-constant runs are removed row by row; the
+    rest of the window is kept.
+
+    Parameters:
+        air_quality_data (list or ReadingSeries): Readings in GetData format or an already parsed series.
+        sensor_id (str): ID of the sensor, stored on the returned series.
+        cadence (int or timedelta): Expected seconds between readings (default: inferred).
+        start_time (datetime): Window start, for leading-gap detection.
+        end_time (datetime): Window end (exclusive), for trailing-gap detection.
+        **flag_options: Thresholds passed to quality_flags.
+
+    Returns:
+        tuple: (ReadingSeries of the good readings, report dict with 'total', 'kept', one count per
+            reason ('invalid', 'duplicate', 'out_of_range', 'outlier', 'stuck') and the
+            detect_gaps fields of the cleaned series).
+    """
+    if isinstance(air_quality_data, ReadingSeries):
+        sensor_id = air_quality_data.sensor_id if sensor_id is None else sensor_id
+    elif not isinstance(air_quality_data, list):
+        air_quality_data = []
+    timestamps, values = _parse_readings_lenient(air_quality_data)
+    # NaT sorts last, so unparseable rows end up after the good ones
+    order = np.argsort(timestamps, kind='stable')
+    timestamps, values = timestamps[order], values[order]
+
+    flags = quality_flags(timestamps, values, **flag_options)
+    good = flags == 0
+    series = ReadingSeries(timestamps[good], values[good], sensor_id)
+
+    report = {'total': len(flags), 'kept': int(good.sum())}
+    for name, bit in (('invalid', QUALITY_INVALID), ('duplicate', QUALITY_DUPLICATE),
+                      ('out_of_range', QUALITY_OUT_OF_RANGE), ('outlier', QUALITY_OUTLIER),
+                      ('stuck', QUALITY_STUCK)):
+        report[name] = int(np.count_nonzero(flags & bit))
+    report.update(detect_gaps(series.timestamps, cadence, start_time, end_time))
+    return series, report
+
+
+def get_hourly_air_quality(sensor_id, token, hours, timezone_offset_hours=-6, client=None, rollups=None,
+                           clean=False):
+    """
+    Fetch air quality data and compute hourly averages.
+
+    Unparseable rows are dropped instead of failing the window. With `clean`,
+    clean_readings also removes implausible, spiking and stuck readings before
+    averaging.
+
+    Parameters:
+        sensor_id (int): ID of the sensor.
+        token (str): API token for authentication.
+        hours (int): Number of past complete hours to average.
+        timezone_offset_hours (int): Offset for local time zone (default -6).
+        client (SmabilityClient): Client to fetch through (default: shared client).
+        rollups (RollupStore): When given, hours come from precomputed rollups and only readings
+            newer than their watermark are downloaded.
+        clean (bool): Drop the readings clean_readings flags before averaging (default: only unparseable ones).
+
+    Returns:
+        dict: A dictionary with hour intervals and their respective average values.
+    """
+    client = client or get_default_client()
+    current_time = local_now(timezone_offset_hours)
+    end_time = current_time.replace(minute=0, second=0, microsecond=0)  # Round to the start of the current hour
+    start_time = end_time - timedelta(hours=hours)  # Start time for the interval
+
+    if rollups is not None:
+        hourly = get_rollup_air_quality(sensor_id, token, start_time, end_time, '1h', rollups,
+                                        timezone_offset_hours=timezone_offset_hours, client=client)
+        if 'error' in hourly:
+            return hourly
+        return _hourly_averages(hourly)
+
+    logger.debug("Hourly GetData %s", _redact_token(client.build_url(sensor_id, start_time, end_time, token)))
+
+    try:
+        data = client.get_data(sensor_id, start_time, end_time, token)
+    except Exception as e:
+        return fetch_error(e)
+
+    # Ensure data is a list and contains expected fields
+    if not data or not isinstance(data, list):
+        return {"error": "No data available for the specified time range"}
+
+    if clean:
+        # Drop unparseable, implausible, spiking and flatlined rows; only a window with nothing parseable fails
+        series, report = clean_readings(data, sensor_id, start_time=start_time, end_time=end_time)
+        if report['invalid'] == report['total']:
+            return {"error": "Invalid data format", "details": "No entry has a valid TimeStamp and Data"}
+        logger.debug("Sensor %s quality: kept %d of %d readings, %d missing", sensor_id, report['kept'],
+                     report['total'], report['missing'])
+        data = series
+
+    # Aggregate into hourly buckets over [start_time, end_time), empty hours come back as NaN
+    try:
+        hourly = aggregate_readings(data, bucket='1h', stats=('mean',), start_time=start_time, end_time=end_time)
+    except (ValueError, KeyError, TypeError):
+        # Some rows do not parse: average the others
+        timestamps, values = _parse_readings_lenient(data)
+        valid = (~np.isnat(timestamps) & ~np.isnan(values)).tolist()
+        if not any(valid):
+            return {"error": "Invalid data format", "details": "No entry has a valid TimeStamp and Data"}
+        data = [entry for entry, ok in zip(data, valid) if ok]
+        hourly = aggregate_readings(data, bucket='1h', stats=('mean',), start_time=start_time, end_time=end_time)
+    return _hourly_averages(hourly)
+
+
+def _hourly_averages(hourly):
+    # Newest hour first, missing hours filled with None
+    labels = np.char.replace(np.datetime_as_string(hourly['time'][::-1], unit='s'), 'T', ' ')
+    averages = np.round(hourly['mean'][::-1], 2)
+    return {label: (None if np.isnan(value) else value)
+            for label, value in zip(labels.tolist(), averages.tolist())}
+
+
+# Stored rollup resolutions, finest first: name -> numpy datetime unit of the bucket
+ROLLUP_RESOLUTIONS = {'1h': 'h', '1d': 'D', '1mo': 'M'}
+
+ROLLUP_STATS = ('count', 'sum', 'min', 'max', 'sumsq')
+
+
+def _rollup_buckets(timestamps, values, resolution):
+    # Mergeable statistics of sorted readings per bucket: (bucket starts, {stat: array})
+    keys = timestamps.astype(f'datetime64[{ROLLUP_RESOLUTIONS[resolution]}]')
+    if not len(keys):
+        return keys.astype('datetime64[s]'), {stat: np.array([]) for stat in ROLLUP_STATS}
+    starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+    values = values.astype(np.float64)
+    stats = {
+        'count': np.diff(np.append(starts, len(values))).astype(np.float64),
+        'sum': np.add.reduceat(values, starts),
+        'min': np.minimum.reduceat(values, starts),
+        'max': np.maximum.reduceat(values, starts),
+        'sumsq': np.add.reduceat(values * values, starts),
+    }
+    return keys[starts].astype('datetime64[s]'), stats
+
+
+def _merge_rollups(keys, stats, target):
+    # Combine rows of mergeable statistics that map to the same target index
+    n = int(target.max()) + 1 if len(target) else 0
+    merged = {
+        'count': np.bincount(target, weights=stats['count'], minlength=n),
+        'sum': np.bincount(target, weights=stats['sum'], minlength=n),
+        'sumsq': np.bincount(target, weights=stats['sumsq'], minlength=n),
+        'min': np.full(n, np.inf),
+        'max': np.full(n, -np.inf),
+    }
+    np.minimum.at(merged['min'], target, stats['min'])
+    np.maximum.at(merged['max'], target, stats['max'])
+    return merged
+
+
+class RollupStore:
+    """
+    Persistent multi-resolution aggregates (hourly, daily, monthly) per sensor.
+
+    Each bucket keeps mergeable statistics (count, sum, min, max, sum of
+    squares), so new readings are folded in with a SQLite UPSERT instead of
+    re-reading raw samples, and any coarser or multi-bucket view (8-hour
+    rolling means, weekly totals, ...) is derived by merging rows. Long-range
+    queries read the coarsest resolution that still gives the requested
+    detail, so their cost depends on the number of buckets returned, not on
+    the length of the range.
+
+    Sums are not idempotent, so every sensor has a watermark: the contiguous
+    time range already ingested. Readings inside it are ignored.
+
+    Parameters:
+        path (str): SQLite database file (":memory:" for a throwaway store); may be shared with a ReadingCache.
+    """
+
+    def __init__(self, path='smability_cache.sqlite3'):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS rollups ('
+                'sensor_id TEXT NOT NULL, resolution TEXT NOT NULL, bucket TEXT NOT NULL, '
+                'count INTEGER NOT NULL, sum REAL NOT NULL, min REAL NOT NULL, max REAL NOT NULL, '
+                'sumsq REAL NOT NULL, PRIMARY KEY (sensor_id, resolution, bucket)) WITHOUT ROWID')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS rollup_watermarks ('
+                'sensor_id TEXT PRIMARY KEY, first TEXT NOT NULL, last TEXT NOT NULL)')
+
+    def watermark(self, sensor_id):
+        """Return the (first, last) datetimes already ingested for a sensor, or None."""
+        with self._lock:
+            row = self._conn.execute('SELECT first, last FROM rollup_watermarks WHERE sensor_id = ?',
+                                     (str(sensor_id),)).fetchone()
+        return (dt.strptime(row[0], API_TIMESTAMP_FORMAT), dt.strptime(row[1], API_TIMESTAMP_FORMAT)) if row else None
+
+    def ingest(self, sensor_id, air_quality_data, start_time, end_time):
+        """
+        Fold the readings of [start_time, end_time] into every resolution.
+
+        The range must touch or overlap the sensor's watermark so the ingested
+        history stays contiguous; readings already inside the watermark are
+        skipped, so overlapping fetches are never counted twice.
+
+        Parameters:
+            sensor_id (str): ID of the sensor.
+            air_quality_data (list or ReadingSeries): Readings fetched for the range (ideally cleaned).
+            start_time (datetime): Start of the fetched range.
+            end_time (datetime): End of the fetched range (inclusive).
+
+        Returns:
+            int: Number of readings added.
+
+        Raises:
+            ValueError: If the range leaves a gap next to the existing watermark.
+        """
+        sensor_id = str(sensor_id)
+        series = _as_series(air_quality_data, sensor_id)
+        mark = self.watermark(sensor_id)
+        timestamps, values = series.timestamps, series.values
+        keep = (timestamps >= np.datetime64(start_time, 's')) & (timestamps <= np.datetime64(end_time, 's'))
+        keep &= ~np.isnan(values)
+        if mark is not None:
+            first, last = mark
+            if start_time > last + timedelta(seconds=1) or end_time < first - timedelta(seconds=1):
+                raise ValueError(f"Range {start_time} .. {end_time} is not adjacent to the ingested "
+                                 f"range {first} .. {last} of sensor {sensor_id}")
+            keep &= (timestamps < np.datetime64(first, 's')) | (timestamps > np.datetime64(last, 's'))
+            start_time, end_time = min(start_time, first), max(end_time, last)
+        timestamps, values = timestamps[keep], values[keep]
+
+        rows = []
+        for resolution in ROLLUP_RESOLUTIONS:
+            keys, stats = _rollup_buckets(timestamps, values, resolution)
+            labels = np.datetime_as_string(keys, unit='s').tolist()
+            rows.extend(zip([sensor_id] * len(labels), [resolution] * len(labels), labels,
+                            stats['count'].astype(np.int64).tolist(), stats['sum'].tolist(), stats['min'].tolist(),
+                            stats['max'].tolist(), stats['sumsq'].tolist()))
+
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'INSERT INTO rollups (sensor_id, resolution, bucket, count, sum, min, max, sumsq) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT (sensor_id, resolution, bucket) DO UPDATE SET '
+                'count = count + excluded.count, sum = sum + excluded.sum, min = MIN(min, excluded.min), '
+                'max = MAX(max, excluded.max), sumsq = sumsq + excluded.sumsq', rows)
+            self._conn.execute(
+                'INSERT OR REPLACE INTO rollup_watermarks (sensor_id, first, last) VALUES (?, ?, ?)',
+                (sensor_id, start_time.strftime(API_TIMESTAMP_FORMAT), end_time.strftime(API_TIMESTAMP_FORMAT)))
+        return len(timestamps)
+
+    def _load(self, sensor_id, resolution, start_time, end_time):
+        # Stored rows of one resolution whose bucket starts in [floor(start_time), end_time)
+        unit = ROLLUP_RESOLUTIONS[resolution]
+        first = np.datetime64(start_time, 's').astype(f'datetime64[{unit}]').astype('datetime64[s]')
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT bucket, count, sum, min, max, sumsq FROM rollups '
+                'WHERE sensor_id = ? AND resolution = ? AND bucket >= ? AND bucket < ? ORDER BY bucket',
+                (str(sensor_id), resolution, np.datetime_as_string(first, unit='s'),
+                 end_time.strftime(API_TIMESTAMP_FORMAT))).fetchall()
+        keys = np.array([row[0] for row in rows], dtype='datetime64[s]')
+        columns = np.array([row[1:] for row in rows], dtype=np.float64).reshape(-1, len(ROLLUP_STATS))
+        return keys, dict(zip(ROLLUP_STATS, columns.T))
+
+    def _pick_resolution(self, start_time, end_time, bucket, max_buckets):
+        # Coarsest stored resolution that can build the requested buckets
+        if bucket in ('1mo', 'month'):
+            return '1mo', None
+        if bucket is not None:
+            step = _bucket_seconds(bucket)
+            for resolution, seconds in (('1d', 86400), ('1h', 3600)):
+                if step % seconds == 0:
+                    return resolution, step
+            raise ValueError(f"Bucket {bucket!r} is finer than the hourly rollup")
+        # No bucket given: the finest resolution that stays within max_buckets
+        span = np.datetime64(end_time, 's') - np.datetime64(start_time, 's')
+        for resolution, seconds in (('1h', 3600), ('1d', 86400)):
+            if span / np.timedelta64(seconds, 's') <= max_buckets:
+                return resolution, seconds
+        return '1mo', None
+
+    def query(self, sensor_id, start_time, end_time, bucket=None, max_buckets=500, tail=None):
+        """
+        Aggregate [start_time, end_time) from the rollups.
+
+        Buckets are aligned like aggregate_readings (fixed sizes counted from
+        midnight, months on calendar months) and the time axis is gap-free:
+        buckets without readings have count 0 and NaN statistics.
+
+        Parameters:
+            sensor_id (str): ID of the sensor.
+            start_time (datetime): Window start (floored to the bucket).
+            end_time (datetime): Window end, exclusive.
+            bucket (str): Bucket size built from the rollups: a multiple of '1h' or '1d', or '1mo';
+                default: the finest stored resolution giving at most `max_buckets` buckets.
+            max_buckets (int): Bucket budget used when `bucket` is not given.
+            tail (ReadingSeries): Recent readings not ingested yet (e.g. still settling),
+                merged in memory without being stored.
+
+        Returns:
+            dict: 'time' (datetime64[s] bucket starts), 'count', 'sum', 'min', 'max', 'sumsq',
+                'mean', 'std' arrays and 'resolution' (the stored resolution read).
+        """
+        resolution, step = self._pick_resolution(start_time, end_time, bucket, max_buckets)
+        if step is None:
+            # Calendar months
+            first = np.datetime64(start_time, 'M')
+            last = np.datetime64(end_time - timedelta(seconds=1), 'M')
+            time_axis = np.arange(first, last + 1).astype('datetime64[s]')
+        else:
+            origin = int(np.datetime64(start_time, 's').astype(np.int64))
+            origin -= origin % step
+            end = int(np.datetime64(end_time, 's').astype(np.int64))
+            n_buckets = max(0, -(-(end - origin) // step))
+            time_axis = (origin + step * np.arange(n_buckets)).astype('datetime64[s]')
+
+        # Load from the first bucket's start, so it holds the same readings whatever resolution is read
+        load_from = time_axis[0].astype(dt) if len(time_axis) else start_time
+        keys, stats = self._load(sensor_id, resolution, load_from, end_time)
+        if tail is not None and len(tail):
+            tail_keys, tail_stats = _rollup_buckets(tail.timestamps, tail.values, resolution)
+            keys = np.concatenate((keys, tail_keys))
+            stats = {stat: np.concatenate((stats[stat], tail_stats[stat])) for stat in ROLLUP_STATS}
+
+        if step is None:
+            target = (keys.astype('datetime64[M]') - first).astype(np.int64)
+        else:
+            target = (keys.astype(np.int64) - origin) // step
+
+        inside = (target >= 0) & (target < len(time_axis))
+        merged = _merge_rollups(keys[inside], {stat: values[inside] for stat, values in stats.items()},
+                                target[inside])
+        result = {'time': time_axis}
+        counts = np.zeros(len(time_axis))
+        counts[:len(merged['count'])] = merged['count']
+        nonempty = counts > 0
+        result['count'] = counts.astype(np.int64)
+        for stat in ('sum', 'min', 'max', 'sumsq'):
+            out = np.full(len(time_axis), np.nan)
+            out[:len(merged[stat])] = merged[stat]
+            out[~nonempty] = np.nan
+            result[stat] = out
+        result['mean'] = np.full(len(time_axis), np.nan)
+        np.divide(result['sum'], counts, out=result['mean'], where=nonempty)
+        variance = np.full(len(time_axis), np.nan)
+        np.divide(result['sumsq'], counts, out=variance, where=nonempty)
+        result['std'] = np.sqrt(np.clip(variance - result['mean'] ** 2, 0, None))
+        result['resolution'] = resolution
+        return result
+
+    def rolling_mean(self, sensor_id, start_time, end_time, hours=8, min_hours=6, tail=None):
+        """
+        Rolling multi-hour average of hourly means, e.g. the 8-hour ozone average.
+
+        Parameters:
+            sensor_id (str): ID of the sensor.
+            start_time (datetime): First hour reported.
+            end_time (datetime): End of the window, exclusive.
+            hours (int): Window length in hours.
+            min_hours (int): Hours with data required for a value (default 6 of 8, the 75% rule).
+            tail (ReadingSeries): Recent readings not ingested yet, see query().
+
+        Returns:
+            dict: 'time' (the last hour of each window) and 'mean' (NaN where too few hours have data).
+        """
+        hourly = self.query(sensor_id, start_time - timedelta(hours=hours - 1), end_time, bucket='1h', tail=tail)
+        means = hourly['mean']
+        valid = ~np.isnan(means)
+        sums = np.concatenate(([0.0], np.cumsum(np.where(valid, means, 0.0))))
+        counts = np.concatenate(([0], np.cumsum(valid)))
+        window_sums = sums[hours:] - sums[:-hours]
+        window_counts = counts[hours:] - counts[:-hours]
+        mean = np.full(len(window_sums), np.nan)
+        np.divide(window_sums, window_counts, out=mean, where=window_counts >= min_hours)
+        return {'time': hourly['time'][hours - 1:], 'mean': mean}
+
+    def close(self):
+        self._conn.close()
+
+
+def _update_rollups(rollups, sensor_id, token, start_time, end_time, settled_until, client):
+    # Ingest what the rollups miss for [start_time, end_time] and return the unsettled tail
+    mark = rollups.watermark(sensor_id)
+    if mark is None:
+        ranges = [(start_time, end_time)]
+    else:
+        first, last = mark
+        ranges = []
+        if start_time < first:
+            ranges.append((start_time, first - timedelta(seconds=1)))
+        if end_time > last:
+            ranges.append((last + timedelta(seconds=1), end_time))
+
+    tail = None
+    for range_start, range_end in ranges:
+        series, _ = clean_readings(get_air_quality_series(sensor_id, token, range_start, range_end, client=client),
+                                   sensor_id)
+        settled_end = min(range_end, settled_until)
+        if settled_end >= range_start:
+            rollups.ingest(sensor_id, series, range_start, settled_end)
+        if range_end > settled_until:
+            tail = series.slice(settled_until + timedelta(seconds=1), None)
+    return tail
+
+
+def get_rollup_air_quality(sensor_id, token, start_time, end_time, bucket=None, rollups=None, max_buckets=500,
+                           timezone_offset_hours=-6, settle_minutes=15, client=None):
+    """
+    Aggregate a long window from precomputed rollups, ingesting only what they miss.
+
+    Readings newer than the rollup watermark are fetched (cleaned by
+    clean_readings) and folded in first; readings younger than
+    `settle_minutes` are merged into the answer but not stored, since late
+    samples may still arrive for them.
+
+    Parameters:
+        sensor_id (str): ID of the sensor.
+        token (str): API token for authentication.
+        start_time (datetime): Window start (local time).
+        end_time (datetime): Window end, exclusive (local time).
+        bucket (str): Bucket size (multiple of '1h' or '1d', or '1mo'); default: chosen from max_buckets.
+        rollups (RollupStore): Rollup store (default: smability_cache.sqlite3 in the working directory).
+        max_buckets (int): Bucket budget used when `bucket` is not given.
+        timezone_offset_hours (int): Offset for local time zone (default -6).
+        settle_minutes (int): Age after which readings are considered final.
+        client (SmabilityClient): Client to fetch through (default: shared client).
+
+    Returns:
+        dict: RollupStore.query() result, or an {"error", "details"} dict if a fetch failed.
+    """
+    client = client or get_default_client()
+    rollups = rollups or RollupStore()
+    settled_until = local_now(timezone_offset_hours).replace(microsecond=0) - timedelta(minutes=settle_minutes)
+    try:
+        tail = _update_rollups(rollups, sensor_id, token, start_time, end_time - timedelta(seconds=1),
+                               settled_until, client)
+    except Exception as e:
+        return fetch_error(e)
+    return rollups.query(sensor_id, start_time, end_time, bucket, max_buckets, tail)
+
+
+# Pollutant code -> (short name, long name, units the sensors report in)
+POLLUTANTS = {
+    'o3': ('O3', 'Ozone', 'ppb'),
+    'pm25': ('PM2.5', 'PM2.5', 'µg/m³'),
+    'pm10': ('PM10', 'PM10', 'µg/m³'),
+    'no2': ('NO2', 'NO2', 'ppb'),
+    'co': ('CO', 'CO', 'ppm'),
+    'so2': ('SO2', 'SO2', 'ppb'),
+}
+
+# US EPA AQI breakpoints (2024 PM2.5 revision) in the units above:
+# name -> (pollutant, averaging hours, decimals kept, ((C_lo, C_hi, I_lo, I_hi), ...))
+AQI_TABLES = {
+    'o3_8h': ('o3', 8, 0, ((0, 54, 0, 50), (55, 70, 51, 100), (71, 85, 101, 150), (86, 105, 151, 200),
+                           (106, 200, 201, 300))),
+    # 1-hour ozone only defines the upper categories; the station index takes the higher of the two
+    'o3_1h': ('o3', 1, 0, ((125, 164, 101, 150), (165, 204, 151, 200), (205, 404, 201, 300), (405, 604, 301, 500))),
+    'pm25_24h': ('pm25', 24, 1, ((0.0, 9.0, 0, 50), (9.1, 35.4, 51, 100), (35.5, 55.4, 101, 150),
+                                 (55.5, 125.4, 151, 200), (125.5, 225.4, 201, 300), (225.5, 325.4, 301, 500))),
+    'pm10_24h': ('pm10', 24, 0, ((0, 54, 0, 50), (55, 154, 51, 100), (155, 254, 101, 150), (255, 354, 151, 200),
+                                 (355, 424, 201, 300), (425, 604, 301, 500))),
+    'no2_1h': ('no2', 1, 0, ((0, 53, 0, 50), (54, 100, 51, 100), (101, 360, 101, 150), (361, 649, 151, 200),
+                             (650, 1249, 201, 300), (1250, 2049, 301, 500))),
+    'co_8h': ('co', 8, 1, ((0.0, 4.4, 0, 50), (4.5, 9.4, 51, 100), (9.5, 12.4, 101, 150), (12.5, 15.4, 151, 200),
+                           (15.5, 30.4, 201, 300), (30.5, 50.4, 301, 500))),
+    'so2_1h': ('so2', 1, 0, ((0, 35, 0, 50), (36, 75, 51, 100), (76, 185, 101, 150), (186, 304, 151, 200),
+                             (305, 604, 201, 300), (605, 1004, 301, 500))),
+}
+
+AQI_CATEGORIES = ((50, 'Good'), (100, 'Moderate'), (150, 'Unhealthy for Sensitive Groups'), (200, 'Unhealthy'),
+                  (300, 'Very Unhealthy'), (500, 'Hazardous'))
+
+
+def aqi_subindex(concentrations, breakpoints, decimals=0):
+    """
+    Evaluate a piecewise-linear breakpoint table for a whole array at once.
+
+    Concentrations are truncated to `decimals` first, as the EPA procedure
+    requires. Values below the first breakpoint give NaN (no index from this
+    table), values above the last one are capped at its top index.
+
+    Parameters:
+        concentrations (array-like): Averaged concentrations of any shape (NaN for missing).
+        breakpoints (sequence): (C_lo, C_hi, I_lo, I_hi) rows in ascending order.
+        decimals (int): Decimals kept before the lookup.
+
+    Returns:
+        numpy.ndarray: Integer-valued sub-indices as floats, NaN where undefined.
+    """
+    table = np.asarray(breakpoints, dtype=np.float64)
+    c_lo, c_hi, i_lo, i_hi = table.T
+    scale = 10.0 ** decimals
+    # Round away float32 storage noise first (8.4 is stored as 8.3999996) so it cannot cross a truncation step
+    concentrations = np.floor(np.round(np.asarray(concentrations, dtype=np.float64) * scale, 3)) / scale
+
+    with np.errstate(invalid='ignore'):
+        band = np.minimum(np.searchsorted(c_hi, concentrations, side='left'), len(table) - 1)
+        clipped = np.minimum(concentrations, c_hi[-1])
+        index = (i_hi[band] - i_lo[band]) / (c_hi[band] - c_lo[band]) * (clipped - c_lo[band]) + i_lo[band]
+        index = np.floor(index + 0.5)  # Round half up, as published AQI values are
+        index[~(concentrations >= c_lo[0])] = np.nan
+    return index
+
+
+def aqi_category(index):
+    """Map AQI values (array-like) to category names; None where the index is NaN."""
+    index = np.asarray(index, dtype=np.float64)
+    bounds = np.array([bound for bound, _ in AQI_CATEGORIES], dtype=np.float64)
+    names = np.array([name for _, name in AQI_CATEGORIES] + [AQI_CATEGORIES[-1][1]], dtype=object)
+    categories = names[np.searchsorted(bounds, np.nan_to_num(index, nan=0.0), side='left')]
+    categories[np.isnan(index)] = None
+    return categories
+
+
+def _rolling_hourly_mean(hourly, hours, min_hours):
+    # Trailing `hours`-hour mean of hourly means along the last axis, NaN below min_hours of data
+    if hours <= 1:
+        return hourly
+    valid = ~np.isnan(hourly)
+    pad = [(0, 0)] * (hourly.ndim - 1) + [(1, 0)]
+    sums = np.pad(np.cumsum(np.where(valid, hourly, 0.0), axis=-1), pad)
+    counts = np.pad(np.cumsum(valid, axis=-1), pad)
+    window_sums = sums[..., hours:] - sums[..., :-hours]
+    window_counts = counts[..., hours:] - counts[..., :-hours]
+    mean = np.full(hourly.shape, np.nan)
+    np.divide(window_sums, window_counts, out=mean[..., hours - 1:], where=window_counts >= min_hours)
+    return mean
+
+
+class AQIEngine:
+    """
+    Batched multi-pollutant air-quality index for a network of stations.
+
+    Sensors are mapped to (station, pollutant). Readings are averaged into
+    hourly means, each table's averaging period is applied as a trailing
+    rolling mean (requiring 75% of the hours), and every breakpoint table is
+    evaluated over the whole stations x hours matrix at once. The station
+    index is the highest sub-index and the dominant pollutant is the one
+    that sets it.
+
+    Parameters:
+        sensor_map (dict): {sensor_id: (station_id, pollutant)}; sensors missing here fall back
+            to the 'station' and 'pollutant' entries of their ReadingSeries metadata.
+        tables (dict): Breakpoint tables in the AQI_TABLES layout (e.g. a local IMECA variant).
+        min_coverage (float): Fraction of an averaging period that must have data.
+    """
+
+    def __init__(self, sensor_map=None, tables=AQI_TABLES, min_coverage=0.75):
+        self.sensor_map = {str(sensor_id): (str(station), pollutant)
+                           for sensor_id, (station, pollutant) in (sensor_map or {}).items()}
+        self.tables = tables
+        self.min_coverage = min_coverage
+        self.lookback_hours = max(hours for _, hours, _, _ in tables.values()) - 1
+
+    def _assignments(self, series_by_sensor):
+        # (sensor_id, station, pollutant) for every sensor with a known, supported pollutant
+        pollutants = {pollutant for pollutant, _, _, _ in self.tables.values()}
+        assignments = []
+        for sensor_id, air_quality_data in series_by_sensor.items():
+            mapping = self.sensor_map.get(sensor_id)
+            if mapping is None and isinstance(air_quality_data, ReadingSeries):
+                metadata = air_quality_data.metadata
+                if 'pollutant' in metadata:
+                    mapping = (str(metadata.get('station', sensor_id)), metadata['pollutant'])
+            if mapping is not None and mapping[1] in pollutants:
+                assignments.append((sensor_id, mapping[0], mapping[1]))
+        return assignments
+
+    def hourly_concentrations(self, series_by_sensor, start_time, end_time):
+        """
+        Hourly mean concentration per pollutant and station, including the averaging lookback.
+
+        Several sensors of the same pollutant at one station are averaged.
+
+        Returns:
+            tuple: (datetime64 hour starts, station ids, {pollutant: stations x hours array}).
+        """
+        series_by_sensor = {str(sensor_id): value for sensor_id, value in series_by_sensor.items()}
+        assignments = self._assignments(series_by_sensor)
+        stations = sorted({station for _, station, _ in assignments})
+        row = {station: i for i, station in enumerate(stations)}
+        first_hour = start_time.replace(minute=0, second=0, microsecond=0) - timedelta(hours=self.lookback_hours)
+
+        sums, counts, times = {}, {}, None
+        for sensor_id, station, pollutant in assignments:
+            air_quality_data = series_by_sensor[sensor_id]
+            if isinstance(air_quality_data, (dict, str)):
+                air_quality_data = []  # Failed fetch
+            hourly = aggregate_readings(air_quality_data, '1h', ('mean',), first_hour, end_time)
+            times = hourly['time']
+            if pollutant not in sums:
+                sums[pollutant] = np.zeros((len(stations), len(times)))
+                counts[pollutant] = np.zeros((len(stations), len(times)))
+            present = ~np.isnan(hourly['mean'])
+            sums[pollutant][row[station], present] += hourly['mean'][present]
+            counts[pollutant][row[station]] += present
+
+        if times is None:
+            times = aggregate_readings([], '1h', ('mean',), first_hour, end_time)['time']
+        concentrations = {}
+        for pollutant in sums:
+            mean = np.full(sums[pollutant].shape, np.nan)
+            np.divide(sums[pollutant], counts[pollutant], out=mean, where=counts[pollutant] > 0)
+            concentrations[pollutant] = mean
+        return times, stations, concentrations
+
+    @timed('aqi')
+    def compute(self, series_by_sensor, start_time, end_time):
+        """
+        Index every station for every hour of [start_time, end_time).
+
+        The latest hour may be partial; its value is the running estimate from
+        the readings received so far, so polling every few minutes refines it.
+
+        Parameters:
+            series_by_sensor (dict): {sensor_id: ReadingSeries or GetData records}.
+            start_time (datetime): First hour reported.
+            end_time (datetime): End of the window, exclusive.
+
+        Returns:
+            dict: 'time' (hour starts), 'stations' (ids), 'pollutants' (codes with data),
+                'concentration' ({table name: stations x hours averaged concentrations}),
+                'subindex' ({pollutant: stations x hours}), 'aqi' (stations x hours, NaN where no
+                pollutant has an index) and 'dominant' (stations x hours pollutant codes, None where
+                there is no index).
+        """
+        times, stations, concentrations = self.hourly_concentrations(series_by_sensor, start_time, end_time)
+        keep = times >= np.datetime64(start_time.replace(minute=0, second=0, microsecond=0), 's')
+
+        averaged, subindex = {}, {}
+        for name, (pollutant, hours, decimals, breakpoints) in self.tables.items():
+            if pollutant not in concentrations:
+                continue
+            minimum = max(1, int(np.ceil(hours * self.min_coverage)))
+            average = _rolling_hourly_mean(concentrations[pollutant], hours, minimum)[:, keep]
+            averaged[name] = average
+            index = aqi_subindex(average, breakpoints, decimals)
+            subindex[pollutant] = index if pollutant not in subindex else np.fmax(subindex[pollutant], index)
+
+        pollutants = sorted(subindex)
+        shape = (len(stations), int(keep.sum()))
+        if pollutants:
+            stacked = np.stack([subindex[pollutant] for pollutant in pollutants])
+            has_index = ~np.isnan(stacked).all(axis=0)
+            aqi = np.full(shape, np.nan)
+            aqi[has_index] = np.nanmax(stacked[:, has_index], axis=0)
+            dominant = np.array(pollutants, dtype=object)[np.argmax(np.nan_to_num(stacked, nan=-1.0), axis=0)]
+            dominant[~has_index] = None
+        else:
+            aqi = np.full(shape, np.nan)
+            dominant = np.full(shape, None, dtype=object)
+
+        return {'time': times[keep], 'stations': stations, 'pollutants': pollutants, 'concentration': averaged,
+                'subindex': subindex, 'aqi': aqi, 'dominant': dominant}
+
+    def latest(self, series_by_sensor, end_time):
+        """
+        Current index per station, for polling loops.
+
+        Returns:
+            dict: {station_id: {'aqi', 'category', 'dominant', 'subindex': {pollutant: value}}}
+                from the newest hour of [end_time - 1h, end_time).
+        """
+        result = self.compute(series_by_sensor, end_time - timedelta(hours=1), end_time)
+        if not len(result['time']):
+            return {}
+        current = {}
+        categories = aqi_category(result['aqi'][:, -1])
+        for i, station in enumerate(result['stations']):
+            aqi = result['aqi'][i, -1]
+            current[station] = {
+                'aqi': None if np.isnan(aqi) else int(aqi),
+                'category': categories[i],
+                'dominant': result['dominant'][i, -1],
+                'subindex': {pollutant: (None if np.isnan(index[i, -1]) else int(index[i, -1]))
+                             for pollutant, index in result['subindex'].items()},
+            }
+        return current
+
+
+# Plot air quality data
+@timed('plot')
+def plot_air_quality_data(air_quality_data, output_path=None, max_points=None, pollutant=None):
+    """
+    Plot raw air quality readings.
+
+    Parameters:
+        air_quality_data (list or ReadingSeries): Readings to plot.
+        output_path (str): When given, render headless to this file (PNG/SVG/PDF by
+            extension) instead of opening a window.
+        max_points (int): Downsample to at most this many points (LTTB) before plotting.
+        pollutant (str): Pollutant code from POLLUTANTS for the labels (default: the series
+            metadata 'pollutant', else 'o3').
+    """
+    # Validate input data
+    if not isinstance(air_quality_data, (list, ReadingSeries)):
+        print(f"Error: Expected list or ReadingSeries, got {type(air_quality_data)}")
+        return
+    
+    if len(air_quality_data) == 0:
+        print("Error: No data to plot")
+        return
+    
+    # Check if first item has expected structure
+    if isinstance(air_quality_data, list) and (
+            not isinstance(air_quality_data[0], dict) or 'Data' not in air_quality_data[0]):
+        print("Error: Invalid data structure")
+        print("Expected dict with 'Data' key, got:", air_quality_data[0])
+        return
+    
+    try:
+        series = _as_series(air_quality_data)
+        name, _, units = POLLUTANTS[pollutant or series.metadata.get('pollutant', 'o3')]
+        if max_points:
+            series = downsample_series(series, max_points)
+
+        if output_path:
+            return render_chart(series, output_path, title=f'{name} Levels Over Time',
+                                ylabel=f'{name} Concentration ({units})')
+
+        import matplotlib.pyplot as plt
+
+        plt.figure(figsize=(12, 6))
+        plt.plot(series.timestamps, series.values, label=name)
+        plt.grid()
+        plt.xlabel('Time')
+        plt.ylabel(f'{name} Concentration ({units})')
+        plt.title(f'{name} Levels Over Time')
+        plt.legend()
+        plt.tight_layout()
+        plt.show()
+        
+    except Exception as e:
+        print(f"Error plotting data: {e}")
+        print("Sample data structure:", air_quality_data[0] if isinstance(air_quality_data, list) else air_quality_data)
+
+
+class RingBuffer:
+    """
+    Fixed-capacity buffer of the most recent readings of one sensor.
+
+    Appends are O(1) and overwrite the oldest reading once full; memory use
+    stays constant however long the monitor runs.
+
+    Parameters:
+        capacity (int): Number of readings kept.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.timestamps = np.zeros(capacity, dtype='datetime64[s]')
+        self.values = np.zeros(capacity, dtype=np.float32)
+        self._head = 0  # Next write position
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def append(self, timestamp, value):
+        self.timestamps[self._head] = timestamp
+        self.values[self._head] = value
+        self._head = (self._head + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+
+    def tail(self, n):
+        """Return the values of the last `n` readings, oldest first."""
+        n = min(n, self._size)
+        return self.values[(self._head - n + np.arange(n)) % self.capacity]
+
+    def to_series(self, sensor_id=None):
+        """Return the buffered readings, oldest first, as a ReadingSeries."""
+        start = (self._head - self._size) % self.capacity
+        order = (start + np.arange(self._size)) % self.capacity
+        return ReadingSeries(self.timestamps[order], self.values[order], sensor_id)
+
+
+class RollingWindow:
+    """
+    Time-based rolling window with O(1) amortized mean, max and min.
+
+    Keeps a running sum for the mean and monotonic deques for the extremes,
+    so each new sample costs constant amortized time regardless of window size.
+
+    Parameters:
+        window (timedelta): Length of the window, e.g. 8 hours for the O3 moving average.
+    """
+
+    def __init__(self, window):
+        self.window = np.timedelta64(int(window.total_seconds()), 's')
+        self._samples = collections.deque()
+        self._maxima = collections.deque()
+        self._minima = collections.deque()
+        self._sum = 0.0
+
+    def __len__(self):
+        return len(self._samples)
+
+    def push(self, timestamp, value):
+        timestamp = np.datetime64(timestamp, 's')
+        value = float(value)
+        self._samples.append((timestamp, value))
+        self._sum += value
+        while self._maxima and self._maxima[-1][1] <= value:
+            self._maxima.pop()
+        self._maxima.append((timestamp, value))
+        while self._minima and self._minima[-1][1] >= value:
+            self._minima.pop()
+        self._minima.append((timestamp, value))
+        self._evict(timestamp - self.window)
+
+    def _evict(self, cutoff):
+        # Drop samples at or before the cutoff
+        while self._samples and self._samples[0][0] <= cutoff:
+            self._sum -= self._samples.popleft()[1]
+        while self._maxima and self._maxima[0][0] <= cutoff:
+            self._maxima.popleft()
+        while self._minima and self._minima[0][0] <= cutoff:
+            self._minima.popleft()
+        if not self._samples:
+            self._sum = 0.0  # Reset accumulated rounding error
+
+    @property
+    def mean(self):
+        return self._sum / len(self._samples) if self._samples else None
+
+    @property
+    def max(self):
+        return self._maxima[0][1] if self._maxima else None
+
+    @property
+    def min(self):
+        return self._minima[0][1] if self._minima else None
+
+
+class RealTimeMonitor:
+    """
+    Incremental poller for a set of sensors.
+
+    Each poll only asks GetData for samples newer than the last one seen per
+    sensor. New samples go into a per-sensor RingBuffer and update the rolling
+    8-hour average and 1-hour maximum incrementally. Unparseable, negative and
+    spiking samples are dropped before they reach the statistics.
+
+    Parameters:
+        sensor_ids (str or iterable): Sensor ID or IDs to monitor.
+        token (str): API token for authentication.
+        buffer_size (int): Readings kept per sensor (default: 24h at 1-minute rate).
+        lookback (timedelta): History fetched on the first poll to warm up the statistics.
+        timezone_offset_hours (int): Offset for local time zone (default -6).
+        max_workers (int): Maximum number of sensors polled at once.
+        client (SmabilityClient): Client to fetch through (default: shared client).
+        forecast_horizon (int): When set, each update carries a 'forecast' of this many samples
+            from a per-sensor OnlineTrendForecaster.
+        forgetting (float): Forgetting factor of the online forecasters.
+        outlier_window (int): Past samples the rolling median/MAD spike check looks at
+            (None keeps spikes).
+        outlier_threshold (float): Robust z-score above which a new sample is dropped as a spike.
+        min_value (float): New samples below this are dropped (None disables the check).
+        alerts (AlertEngine): When given, every poll's updates are evaluated against its rules,
+            including no-data rules at the poll time.
+    """
+
+    def __init__(self, sensor_ids, token, buffer_size=1440, lookback=timedelta(hours=8), timezone_offset_hours=-6,
+                 max_workers=16, client=None, forecast_horizon=None, forgetting=0.98, outlier_window=15,
+                 outlier_threshold=5.0, min_value=0.0, alerts=None):
+        if isinstance(sensor_ids, (str, int)):
+            sensor_ids = [sensor_ids]
+        self.sensor_ids = [str(sensor_id) for sensor_id in dict.fromkeys(sensor_ids)]
+        self.token = token
+        self.lookback = lookback
+        self.timezone_offset_hours = timezone_offset_hours
+        self.client = client or get_default_client()
+        self.max_workers = max_workers
+        self.buffers = {sensor_id: RingBuffer(buffer_size) for sensor_id in self.sensor_ids}
+        self.avg_8h = {sensor_id: RollingWindow(timedelta(hours=8)) for sensor_id in self.sensor_ids}
+        self.max_1h = {sensor_id: RollingWindow(timedelta(hours=1)) for sensor_id in self.sensor_ids}
+        self.last_seen = {sensor_id: None for sensor_id in self.sensor_ids}
+        self.forecast_horizon = forecast_horizon
+        self.forecasters = {sensor_id: OnlineTrendForecaster(forgetting) for sensor_id in self.sensor_ids}
+        self.outlier_window = outlier_window
+        self.outlier_threshold = outlier_threshold
+        self.min_value = min_value
+        self.alerts = alerts
+
+    def _fetch_new(self, sensor_id, end_time):
+        last_seen = self.last_seen[sensor_id]
+        if last_seen is None:
+            start_time = end_time - self.lookback
+        else:
+            start_time = last_seen.astype(dt) + timedelta(seconds=1)
+        return self.client.get_data(sensor_id, start_time, end_time, self.token)
+
+    def _ingest(self, sensor_id, readings):
+        # Apply new readings in time order and return one update per new sample
+        if not isinstance(readings, list) or not readings:
+            return []
+        # Unparseable entries come back as NaT/NaN and are dropped with the other bad samples
+        timestamps, values = _parse_readings_lenient(readings)
+        order = np.argsort(timestamps, kind='stable')
+        timestamps, values = timestamps[order], values[order]
+        last_seen = self.last_seen[sensor_id]
+        if last_seen is not None:
+            newer = timestamps > last_seen
+            timestamps, values = timestamps[newer], values[newer]
+
+        bad = np.isnan(values)
+        if self.min_value is not None:
+            bad |= values < self.min_value
+        if self.outlier_window and (~bad).any():
+            # Causal check: each new sample against the buffered ones and the new ones before it
+            context = self.buffers[sensor_id].tail(self.outlier_window - 1)
+            good = np.flatnonzero(~bad)
+            spikes = flag_outliers(np.concatenate((context, values[good])), self.outlier_window,
+                                   self.outlier_threshold, centered=False)[len(context):]
+            bad[good[spikes]] = True
+        values[bad] = np.nan
+
+        updates = []
+        for timestamp, value in zip(timestamps, values.tolist()):
+            if np.isnan(value):
+                continue
+            self.buffers[sensor_id].append(timestamp, value)
+            self.avg_8h[sensor_id].push(timestamp, value)
+            self.max_1h[sensor_id].push(timestamp, value)
+            self.forecasters[sensor_id].update(value)
+            self.last_seen[sensor_id] = timestamp
+            update = {
+                'sensor_id': sensor_id,
+                'TimeStamp': str(timestamp),
+                'Data': value,
+                'avg_8h': self.avg_8h[sensor_id].mean,
+                'max_1h': self.max_1h[sensor_id].max
+            }
+            if self.forecast_horizon:
+                update['forecast'] = self.forecasters[sensor_id].forecast(self.forecast_horizon).tolist()
+            updates.append(update)
+        return updates
+
+    def poll(self):
+        """
+        Fetch and apply the samples that arrived since the previous poll.
+
+        Returns:
+            list: Update dicts ('sensor_id', 'TimeStamp', 'Data', 'avg_8h', 'max_1h'[, 'forecast']) in
+                time order per sensor, plus {'sensor_id', 'error', 'details'} for sensors that failed.
+        """
+        end_time = local_now(self.timezone_offset_hours).replace(microsecond=0)
+        updates = []
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(self.sensor_ids)))) as executor:
+            futures = {sensor_id: executor.submit(self._fetch_new, sensor_id, end_time)
+                       for sensor_id in self.sensor_ids}
+            for sensor_id, future in futures.items():
+                try:
+                    updates.extend(self._ingest(sensor_id, future.result()))
+                except Exception as e:
+                    updates.append({'sensor_id': sensor_id, **fetch_error(e)})
+        if self.alerts is not None:
+            self.alerts.process(updates, now=end_time)
+        return updates
+
+    def run(self, interval=60, callback=None):
+        """
+        Poll forever, yielding every update as it is produced.
+
+        Parameters:
+            interval (float): Seconds between the start of consecutive polls.
+            callback (callable): Optional function called with each update as well.
+        """
+        while True:
+            started = time.monotonic()
+            for update in self.poll():
+                if callback is not None:
+                    callback(update)
+                yield update
+            time.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+
+# Real-time monitoring function
+def real_time_monitoring(sensor_id, token, interval=60, callback=None, client=None, **monitor_options):
+    """
+    Stream real-time updates for one or more sensors.
+
+    Parameters:
+        sensor_id (str or iterable): Sensor ID or IDs to monitor.
+        token (str): API token for authentication.
+        interval (float): Polling interval in seconds.
+        callback (callable): Optional function called with each update.
+        client (SmabilityClient): Client to fetch through (default: shared client).
+        **monitor_options: Extra RealTimeMonitor options (buffer_size, lookback, ...).
+
+    Yields:
+        dict: One update per new sample, see RealTimeMonitor.poll.
+    """
+    monitor = RealTimeMonitor(sensor_id, token, client=client, **monitor_options)
+    yield from monitor.run(interval, callback)
+
+
+ALERT_KINDS = ('threshold', 'rolling_mean', 'rate', 'no_data')
+
+
+class AlertRule:
+    """
+    One alert condition, applied to some or all sensors.
+
+    Kinds:
+        'threshold': the reading itself crosses `threshold`.
+        'rolling_mean': the mean of the last `window` crosses `threshold`.
+        'rate': the change per minute since the previous reading crosses `threshold`
+            (use direction='below' with a negative threshold for drops).
+        'no_data': no reading for `threshold` minutes.
+
+    A rule fires when its metric crosses `threshold` in `direction` and only
+    resolves once it is back past `clear` (hysteresis), so a value hovering
+    around the limit does not flap.
+
+    Parameters:
+        name (str): Rule name, reported with every alert.
+        kind (str): One of ALERT_KINDS.
+        threshold (float): Firing level (minutes for 'no_data').
+        clear (float): Resolving level (default: threshold, i.e. no hysteresis band).
+        direction (str): 'above' or 'below'.
+        window (timedelta): Averaging window of 'rolling_mean' rules.
+        sensors (iterable): Sensor IDs the rule applies to (default: every sensor).
+        severity (str): Free-form severity passed to sinks.
+        renotify (float): Seconds after which a still-firing alert is sent again (None: only on change).
+    """
+
+    def __init__(self, name, kind, threshold, clear=None, direction='above', window=timedelta(hours=1),
+                 sensors=None, severity='warning', renotify=None):
+        if kind not in ALERT_KINDS:
+            raise ValueError(f"Unknown rule kind: {kind!r}")
+        if direction not in ('above', 'below'):
+            raise ValueError(f"Unknown direction: {direction!r}")
+        self.name = name
+        self.kind = kind
+        self.threshold = float(threshold)
+        self.clear = float(threshold if clear is None else clear)
+        self.sign = 1.0 if direction == 'above' else -1.0
+        if self.sign * (self.threshold - self.clear) < 0:
+            raise ValueError("clear must be on the resolved side of threshold")
+        self.window = window
+        self.sensors = None if sensors is None else {str(sensor_id) for sensor_id in sensors}
+        self.severity = severity
+        self.renotify = renotify
+
+    def __repr__(self):
+        return f"AlertRule({self.name!r}, {self.kind!r}, threshold={self.threshold})"
+
+
+def log_alert_sink(alert):
+    """Sink that writes alerts to the module logger."""
+    level = logging.INFO if alert['state'] == 'resolved' else logging.WARNING
+    logger.log(level, "%s", alert['message'])
+
+
+class WebhookSink:
     """
-    Fetch air quality data and compute hourly averages.
+    Sink that POSTs each alert as JSON from a background thread.
+
+    Delivery never blocks rule evaluation; when the queue is full the alert
+    is dropped and counted.
 
     Parameters:
-        sensor_id (int): ID of the sensor.
-        token (str): API token for authentication.
-        hours (int): Number of past complete hours to average.
-        timezone_offset_hours (int): Offset for local time zone (default -6).
+        url (str): Endpoint receiving the alerts.
+        timeout (float): Seconds per POST.
+        max_queue (int): Alerts buffered while the endpoint is slow.
+    """
 
-    Returns:
-        dict: A dictionary with hour intervals and their respective average values.
+    def __init__(self, url, timeout=5.0, max_queue=10000):
+        self.url = url
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.dropped = 0
+        self._queue = queue.Queue(max_queue)
+        threading.Thread(target=self._deliver, daemon=True).start()
+
+    def __call__(self, alert):
+        try:
+            self._queue.put_nowait(alert)
+        except queue.Full:
+            self.dropped += 1
+
+    def _deliver(self):
+        while True:
+            alert = self._queue.get()
+            try:
+                self.session.post(self.url, data=json.dumps(alert, default=str),
+                                  headers={'Content-Type': 'application/json'}, timeout=self.timeout)
+            except requests.exceptions.RequestException as e:
+                logger.warning("Alert webhook %s failed: %s", self.url, e)
+
+
+class AlertEngine:
     """
-    # Get the current UTC time adjusted for the local time zone
-    current_time = dt.utcnow() + timedelta(hours=timezone_offset_hours)
-    end_time = current_time.replace(minute=0, second=0, microsecond=0)  # Round to the start of the current hour
-    start_time = end_time - timedelta(hours=hours)  # Start time for the interval
+    Streaming rule evaluation over batches of new readings.
 
-    # URL encode the start and end times
-    dtEnd_encoded = end_time.strftime('%Y-%m-%d %H:%M:%S').replace(' ', '%20')
-    dtStart_encoded = start_time.strftime('%Y-%m-%d %H:%M:%S').replace(' ', '%20')
+    Rules are indexed by sensor, so each new reading only touches the rules
+    that apply to its sensor and the cost of a batch grows with the number of
+    readings in it, not with sensors x rules. Per (rule, sensor) state holds
+    the firing flag and what the rule needs (previous reading, rolling
+    window). No-data rules are kept in a deadline heap, so checking for
+    silent sensors only looks at deadlines that have passed.
 
-    # Construct the API URL with HTTPS
-    api_url = (f'https://smability.sidtecmx.com/SmabilityAPI/GetData?token={token}'
-               f'&idSensor={sensor_id}&dtStart={dtStart_encoded}&dtEnd={dtEnd_encoded}')
+    Alerts are emitted on state changes only ('firing', 'resolved'), plus
+    optional reminders while firing, and are handed to every sink; a failing
+    sink is logged and does not stop the others.
 
-    print(f"Hourly API URL: {api_url}")  # Debug: Print the URL being used
+    Parameters:
+        rules (iterable): AlertRule instances.
+        sinks (iterable): Callables receiving each alert dict (default: log_alert_sink).
+    """
 
-    # Create a session with custom headers (Approach 1)
-    session = requests.Session()
-    session.headers.update({
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-        'Accept': 'application/json, text/plain, */*',
-        'Accept-Language': 'en-US,en;q=0.9',
-        'Accept-Encoding': 'gzip, deflate, br',
-        'Connection': 'keep-alive',
-        'Cache-Control': 'no-cache'
-    })
+    def __init__(self, rules=(), sinks=None):
+        self.sinks = list(sinks) if sinks is not None else [log_alert_sink]
+        self._global_rules = []
+        self._sensor_rules = collections.defaultdict(list)
+        self._state = {}  # (rule name, sensor_id) -> state dict
+        self._last_seen = {}  # sensor_id -> datetime64 of the newest reading
+        self._deadlines = []  # Heap of (deadline, sensor_id, rule name)
+        self._rules = {}
+        for rule in rules:
+            self.add_rule(rule)
 
-    try:
-        print("Using Hourly Approach 1: HTTPS with SSL verification")
-        
-        response = session.get(
-            url=api_url, 
-            timeout=30,
-            verify=True  # SSL verification enabled
-        )
-        
-        print(f"Hourly status code: {response.status_code}")
-        
-        if response.status_code == 200:
-            try:
-                data = response.json()
-            except json.JSONDecodeError as e:
-                return {"error": "Invalid JSON format from API", "details": str(e)}
+    def add_rule(self, rule):
+        if rule.name in self._rules:
+            raise ValueError(f"Duplicate rule name: {rule.name!r}")
+        self._rules[rule.name] = rule
+        if rule.sensors is None:
+            self._global_rules.append(rule)
         else:
-            return {"error": f"Unable to fetch data (status code {response.status_code})"}
-            
-    except requests.exceptions.SSLError as e:
-        return {"error": "SSL Error", "details": str(e)}
-    except requests.exceptions.ConnectionError as e:
-        return {"error": "Connection Error", "details": str(e)}
-    except requests.exceptions.Timeout as e:
-        return {"error": "Timeout Error", "details": str(e)}
-    except Exception as e:
-        return {"error": "Unexpected Error", "details": str(e)}
+            for sensor_id in rule.sensors:
+                self._sensor_rules[sensor_id].append(rule)
+                if rule.kind == 'no_data':
+                    # Watched sensors that never report still go silent
+                    self._last_seen.setdefault(sensor_id, None)
 
-    # Debug: Check the data structure
-    print("Hourly API Response length:", len(data) if data else 0)
-    
-    # Ensure data is a list and contains expected fields
-    if not data or not isinstance(data, list):
-        return {"error": "No data available for the specified time range"}
+    def add_sink(self, sink):
+        self.sinks.append(sink)
 
-    # Process and group data by hour
-    hourly_data = {}
-    for entry in data:
-        # Parse the timestamp and extract the value
-        try:
-            timestamp = dt.strptime(entry['TimeStamp'], '%Y-%m-%dT%H:%M:%S')
-            value = float(entry['Data'])
-        except (ValueError, KeyError) as e:
-            return {"error": "Invalid data format", "details": str(e)}
-
-        # Round down to the start of the hour
-        hour_start = timestamp.replace(minute=0, second=0, microsecond=0)
-        if hour_start not in hourly_data:
-            hourly_data[hour_start] = []
-        hourly_data[hour_start].append(value)
-
-    # Compute averages for each hour
-    hourly_averages = {}
-    for hour, values in hourly_data.items():
-        if len(values) > 0:  # Avoid division by zero
-            hourly_averages[hour.strftime('%Y-%m-%d %H:%M:%S')] = round(sum(values) / len(values), 2)
-
-    # Fill missing hours with None
-    result = {}
-    for i in range(hours):
-        target_hour = end_time - timedelta(hours=i + 1)
-        result[target_hour.strftime('%Y-%m-%d %H:%M:%S')] = hourly_averages.get(
-            target_hour.strftime('%Y-%m-%d %H:%M:%S'), None)
+    def active(self):
+        """Return the (rule name, sensor_id) pairs currently firing."""
+        return [key for key, state in self._state.items() if state['firing']]
 
-    return result
+    def _rules_for(self, sensor_id):
+        rules = self._sensor_rules.get(sensor_id)
+        return self._global_rules + rules if rules else self._global_rules
 
+    def _evaluate(self, rule, sensor_id, metric, timestamp, value, alerts):
+        # Hysteresis and deduplication for one rule/sensor metric
+        key = (rule.name, sensor_id)
+        state = self._state.get(key)
+        if state is None:
+            state = self._state[key] = {'firing': False, 'notified': None}
+        if metric is None:
+            return
+        signed = rule.sign * metric
+        now = time.monotonic()
+        if not state['firing'] and signed > rule.sign * rule.threshold:
+            state['firing'] = True
+            state['notified'] = now
+            alerts.append(self._alert(rule, sensor_id, 'firing', metric, timestamp, value))
+        elif state['firing'] and signed < rule.sign * rule.clear:
+            state['firing'] = False
+            alerts.append(self._alert(rule, sensor_id, 'resolved', metric, timestamp, value))
+        elif state['firing'] and rule.renotify is not None and now - state['notified'] >= rule.renotify:
+            state['notified'] = now
+            alerts.append(self._alert(rule, sensor_id, 'firing', metric, timestamp, value))
 
-# Plot air quality data
-def plot_air_quality_data(air_quality_data):
-    # Validate input data
-    if not isinstance(air_quality_data, list):
-        print(f"Error: Expected list, got {type(air_quality_data)}")
-        return
-    
-    if len(air_quality_data) == 0:
-        print("Error: No data to plot")
-        return
-    
-    # Check if first item has expected structure
-    if not isinstance(air_quality_data[0], dict) or 'Data' not in air_quality_data[0]:
-        print("Error: Invalid data structure")
-        print("Expected dict with 'Data' key, got:", air_quality_data[0])
-        return
-    
-    try:
-        o3_values = [float(d['Data']) for d in air_quality_data]  
-        timestamps = [datetime.datetime.strptime(d['TimeStamp'], '%Y-%m-%dT%H:%M:%S') for d in air_quality_data]    
-        
-        plt.figure(figsize=(12, 6))
-        plt.plot(timestamps, o3_values, label='O3')
-        plt.grid()
-        plt.xlabel('Time')
-        plt.ylabel('O3 Concentration (ppb)')
-        plt.title('O3 Levels Over Time')
-        plt.legend()
-        plt.tight_layout()
-        plt.show()
-        
-    except Exception as e:
-        print(f"Error plotting data: {e}")
-        print("Sample data structure:", air_quality_data[0] if air_quality_data else "No data")
+    def _alert(self, rule, sensor_id, state, metric, timestamp, value):
+        verb = 'resolved' if state == 'resolved' else 'firing'
+        return {
+            'rule': rule.name, 'kind': rule.kind, 'sensor_id': sensor_id, 'state': state,
+            'severity': rule.severity, 'metric': float(metric), 'threshold': rule.threshold,
+            'TimeStamp': str(timestamp), 'Data': value,
+            'message': f"[{rule.severity}] {rule.name} {verb} for sensor {sensor_id}: "
+                       f"{metric:.2f} vs {rule.threshold:g} at {timestamp}",
+        }
 
+    def _metric(self, rule, sensor_id, timestamp, value):
+        # Update the rule's per-sensor state with one reading and return its metric
+        if rule.kind == 'threshold':
+            return value
+        key = (rule.name, sensor_id)
+        state = self._state.setdefault(key, {'firing': False, 'notified': None})
+        if rule.kind == 'rolling_mean':
+            window = state.get('window')
+            if window is None:
+                window = state['window'] = RollingWindow(rule.window)
+            window.push(timestamp, value)
+            return window.mean
+        if rule.kind == 'rate':
+            previous = state.get('previous')
+            state['previous'] = (timestamp, value)
+            if previous is None:
+                return None
+            minutes = (timestamp - previous[0]) / np.timedelta64(60, 's')
+            return (value - previous[1]) / minutes if minutes > 0 else None
+        return None
 
-# Real-time monitoring function
-def real_time_monitoring(sensor_id, interval=60):
-    while True:
-        air_quality_data = get_air_quality_data(sensor_id)
-        print(f"Real-time Air Quality Data: {air_quality_data}")
-        time.sleep(interval)
+    @timed('alerts')
+    def process(self, updates, now=None):
+        """
+        Evaluate a batch of new readings and dispatch the resulting alerts.
+
+        Parameters:
+            updates (iterable): Dicts with 'sensor_id', 'TimeStamp' and 'Data' (RealTimeMonitor.poll
+                output); error updates and readings not newer than the last one of their sensor are skipped.
+            now (datetime or datetime64): Current time for no-data rules (default: skip that check).
+
+        Returns:
+            list: Alert dicts emitted by this batch.
+        """
+        alerts = []
+        for update in updates:
+            value = update.get('Data')
+            if value is None or 'error' in update:
+                continue
+            sensor_id = str(update['sensor_id'])
+            timestamp = np.datetime64(update['TimeStamp'], 's')
+            last_seen = self._last_seen.get(sensor_id)
+            if last_seen is not None and timestamp <= last_seen:
+                continue  # Duplicate or out-of-order reading
+            value = float(value)
+            self._last_seen[sensor_id] = timestamp
+
+            for rule in self._rules_for(sensor_id):
+                if rule.kind == 'no_data':
+                    if self._state.get((rule.name, sensor_id), {}).get('firing'):
+                        self._evaluate(rule, sensor_id, 0.0, timestamp, value, alerts)
+                    deadline = timestamp + np.timedelta64(int(rule.threshold * 60), 's')
+                    heapq.heappush(self._deadlines, (deadline, sensor_id, rule.name))
+                    continue
+                self._evaluate(rule, sensor_id, self._metric(rule, sensor_id, timestamp, value),
+                               timestamp, value, alerts)
+
+        if now is not None:
+            alerts.extend(self._check_silence(np.datetime64(now, 's')))
+        self._dispatch(alerts)
+        return alerts
+
+    def _check_silence(self, now):
+        alerts = []
+        # Sensors watched by no-data rules that have never reported get a first deadline now
+        for sensor_id in [sensor_id for sensor_id, seen in self._last_seen.items() if seen is None]:
+            self._last_seen[sensor_id] = now
+            for rule in self._rules_for(sensor_id):
+                if rule.kind == 'no_data':
+                    deadline = now + np.timedelta64(int(rule.threshold * 60), 's')
+                    heapq.heappush(self._deadlines, (deadline, sensor_id, rule.name))
+
+        while self._deadlines and self._deadlines[0][0] <= now:
+            deadline, sensor_id, name = heapq.heappop(self._deadlines)
+            rule = self._rules[name]
+            last_seen = self._last_seen[sensor_id]
+            if last_seen + np.timedelta64(int(rule.threshold * 60), 's') > now:
+                continue  # The sensor reported since; its newer deadline is still queued
+            silent_minutes = (now - last_seen) / np.timedelta64(60, 's')
+            self._evaluate(rule, sensor_id, silent_minutes + 1e-9, now, None, alerts)
+            if rule.renotify is not None:
+                heapq.heappush(self._deadlines, (now + np.timedelta64(int(rule.renotify), 's'), sensor_id, name))
+        return alerts
+
+    def check_silence(self, now):
+        """Fire no-data alerts for sensors silent past their rule's limit at `now` and dispatch them."""
+        alerts = self._check_silence(np.datetime64(now, 's'))
+        self._dispatch(alerts)
+        return alerts
+
+    def _dispatch(self, alerts):
+        for alert in alerts:
+            METRICS.inc('smability_alerts_total', rule=alert['rule'], state=alert['state'])
+            for sink in self.sinks:
+                try:
+                    sink(alert)
+                except Exception as e:
+                    logger.warning("Alert sink %r failed: %s", sink, e)
+
+
+class OnlineTrendForecaster:
+    """
+    Exponentially weighted linear trend with O(1) updates per sample.
+
+    Keeps the weighted sufficient statistics of a least-squares line fitted
+    over the sample index, with time measured relative to the newest sample.
+    Each update shifts the time origin, decays the old statistics and adds
+    the new sample; no history is stored or refitted. This is the same fit
+    recursive least squares with a forgetting factor converges to.
+
+    Parameters:
+        forgetting (float): Per-sample weight decay in (0, 1]; 1.0 gives an
+            ordinary least-squares fit over all samples seen.
+    """
+
+    def __init__(self, forgetting=0.98):
+        if not 0 < forgetting <= 1:
+            raise ValueError("forgetting must be in (0, 1]")
+        self.forgetting = forgetting
+        self.n = 0
+        # Weighted sums of 1, t, t^2, y and t*y, with t = 0 at the newest sample
+        self._s0 = self._st = self._stt = self._sy = self._sty = 0.0
+
+    def update(self, value):
+        value = float(value)
+        if np.isnan(value):
+            return
+        lam = self.forgetting
+        # Shift existing samples one step into the past (t -> t - 1), then decay
+        s0, st, stt, sy, sty = self._s0, self._st, self._stt, self._sy, self._sty
+        self._stt = lam * (stt - 2 * st + s0)
+        self._st = lam * (st - s0)
+        self._sty = lam * (sty - sy)
+        self._s0 = lam * s0 + 1.0
+        self._sy = lam * sy + value
+        self.n += 1
+
+    def coefficients(self):
+        """Return (level, slope): the fitted value at the newest sample and the change per sample."""
+        if self.n == 0:
+            return None, None
+        denominator = self._s0 * self._stt - self._st ** 2
+        if self.n < 2 or abs(denominator) < 1e-12:
+            return self._sy / self._s0, 0.0
+        slope = (self._s0 * self._sty - self._st * self._sy) / denominator
+        level = (self._sy - slope * self._st) / self._s0
+        return level, slope
+
+    def forecast(self, horizon=5):
+        """
+        Forecast the next `horizon` samples.
+
+        Returns:
+            numpy.ndarray: Predicted values, or an empty array before the first sample.
+        """
+        level, slope = self.coefficients()
+        if level is None:
+            return np.array([])
+        return level + slope * np.arange(1, horizon + 1)
+
+
+def forecast_fleet(air_quality_data, horizon=5, forgetting=1.0, window=None):
+    """
+    Forecast every sensor of a fleet with one vectorized least-squares solve.
+
+    Each sensor gets a (optionally exponentially weighted) linear trend over its
+    sample index, computed from masked weighted sums across a sensors x samples
+    matrix instead of one model fit per sensor.
+
+    Parameters:
+        air_quality_data (dict or numpy.ndarray): sensor_id -> ReadingSeries/records,
+            or a 2-D array (sensors x samples, NaN for missing) aligned on the newest sample.
+        horizon (int): Number of future samples to forecast.
+        forgetting (float): Per-sample weight decay in (0, 1]; 1.0 is ordinary least squares.
+        window (int): Only use the newest `window` samples of each sensor (default: all).
+
+    Returns:
+        dict or numpy.ndarray: sensor_id -> predictions, or a sensors x horizon array for array input.
+    """
+    if isinstance(air_quality_data, dict):
+        sensor_ids = list(air_quality_data)
+        columns = [_as_series(air_quality_data[sensor_id]).values for sensor_id in sensor_ids]
+        if window is not None:
+            columns = [column[-window:] for column in columns]
+        width = max((len(column) for column in columns), default=0)
+        matrix = np.full((len(columns), width), np.nan)
+        for row, column in enumerate(columns):
+            if len(column):
+                matrix[row, width - len(column):] = column  # Right-align on the newest sample
+        predictions = forecast_fleet(matrix, horizon, forgetting)
+        return dict(zip(sensor_ids, predictions))
+
+    matrix = np.atleast_2d(np.asarray(air_quality_data, dtype=np.float64))
+    if window is not None:
+        matrix = matrix[:, -window:]
+    n_samples = matrix.shape[1]
+
+    # Time relative to the newest sample, so the fitted level is the current value
+    t = np.arange(n_samples, dtype=np.float64) - (n_samples - 1)
+    weights = np.where(np.isnan(matrix), 0.0, forgetting ** -t)
+    y = np.nan_to_num(matrix)
+
+    s0 = weights.sum(axis=1)
+    st = weights @ t
+    stt = weights @ (t * t)
+    sy = (weights * y).sum(axis=1)
+    sty = (weights * y) @ t
+
+    denominator = s0 * stt - st ** 2
+    with np.errstate(invalid='ignore', divide='ignore'):
+        slope = np.where(np.abs(denominator) > 1e-12, (s0 * sty - st * sy) / denominator, 0.0)
+        level = (sy - slope * st) / s0  # NaN for sensors without any sample
+
+    steps = np.arange(1, horizon + 1, dtype=np.float64)
+    return level[:, None] + slope[:, None] * steps[None, :]
 
 
 # Forecast air quality
-def forecast_o3(air_quality_data):
-    timestamps = np.array([i for i in range(len(air_quality_data))]).reshape(-1, 1)
-    o3_values = np.array([d['Data'] for d in air_quality_data]).reshape(-1, 1)
-    model = LinearRegression()
-    model.fit(timestamps, o3_values)
-    future_timestamps = np.array([len(air_quality_data) + i for i in range(5)]).reshape(-1, 1)
-    predicted_values = model.predict(future_timestamps)
-    print("O3 Forecast for the next 5 minutes:", predicted_values)
+def forecast_o3(air_quality_data, horizon=5):
+    """
+    Forecast the next `horizon` O3 samples from a linear trend over the history.
+
+    Parameters:
+        air_quality_data (list or ReadingSeries): Readings to fit.
+        horizon (int): Number of future samples to forecast (default 5).
+
+    Returns:
+        numpy.ndarray: The predicted values.
+    """
+    series = _as_series(air_quality_data)
+    predicted_values = forecast_fleet(series.values[None, :], horizon)[0]
+    print(f"O3 Forecast for the next {horizon} samples:", predicted_values)
+    return predicted_values
 
 
-def plot_hourly_ozone_data(hourly_data):
+@timed('plot')
+def plot_hourly_ozone_data(hourly_data, output_path=None, pollutant='o3'):
     """
     Plot hourly ozone concentration data with hover functionality for x and y values.
 
+    Builds a new figure per call; for a continuously refreshing display use LiveDashboard.
+
     Args:
         hourly_data (dict): A dictionary where keys are timestamps (str) and values are ozone concentrations (float).
+        output_path (str): When given, render headless to this file on a datetime axis
+            instead of opening an interactive window.
+        pollutant (str): Pollutant code from POLLUTANTS for the labels (default 'o3').
     """
+    _, name, units = POLLUTANTS[pollutant]
+    if output_path:
+        hours_sorted = sorted(hourly_data.items())
+        series = ReadingSeries([np.datetime64(hour.replace(' ', 'T'), 's') for hour, _ in hours_sorted],
+                               [np.nan if value is None else value for _, value in hours_sorted])
+        return render_chart(series, output_path, title=f'Hourly {name} Concentration',
+                            ylabel=f'{name} Concentration ({units})', marker='.')
+
+    import matplotlib.pyplot as plt
+    import mplcursors  # Import mplcursors for hover functionality
+
     # Sort the data by timestamp
     sorted_hourly_data = dict(sorted(hourly_data.items()))
     
@@ -250,7 +3267,7 @@ def plot_hourly_ozone_data(hourly_data):
     
     # Create the plot
     plt.figure(figsize=(12, 6))
-    line, = plt.plot(timestamps, ozone_values, marker='.', linestyle='-', color='blue', label='Ozone Concentration')
+    line, = plt.plot(timestamps, ozone_values, marker='.', linestyle='-', color='blue', label=f'{name} Concentration')
     
     # X-axis formatting
     plt.xticks(
@@ -262,29 +3279,711 @@ def plot_hourly_ozone_data(hourly_data):
     
     # Labels and title
     plt.xlabel('Time (Hours)', fontsize=12)
-    plt.ylabel('Ozone Concentration (ppb)', fontsize=12)
-    plt.title('Hourly Ozone Concentration', fontsize=14)
+    plt.ylabel(f'{name} Concentration ({units})', fontsize=12)
+    plt.title(f'Hourly {name} Concentration', fontsize=14)
     plt.grid(True, linestyle='--', alpha=0.7)
     plt.legend()
     
     # Add hover functionality
     cursor = mplcursors.cursor(line, hover=True)
     cursor.connect("add", lambda sel: sel.annotation.set_text(
-        f"Time: {timestamps[int(sel.index)]}\nOzone: {ozone_values[int(sel.index)]:.2f} ppb"))
+        f"Time: {timestamps[int(sel.index)]}\n{name}: {ozone_values[int(sel.index)]:.2f} {units}"))
     
     # Show the plot
     plt.tight_layout()  # Adjust layout to prevent clipping
     plt.show()
 
 
+def lttb_indices(x, y, n_out):
+    """
+    Select points with Largest-Triangle-Three-Buckets downsampling.
+
+    Keeps the first and last points and, for every bucket in between, the point
+    forming the largest triangle with the previous pick and the next bucket's
+    mean, so peaks and troughs survive heavy downsampling.
+
+    Parameters:
+        x (array-like): Monotonic x values (e.g. epoch seconds).
+        y (array-like): y values, without NaN.
+        n_out (int): Number of points to keep.
+
+    Returns:
+        numpy.ndarray: Indices of the selected points, ascending.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # Bucket edges for the n_out - 2 inner buckets; the last point closes the range
+    edges = (np.arange(n_out - 1) * ((n - 2) / (n_out - 2))).astype(np.int64) + 1
+    edges[-1] = n - 1
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_lo, next_hi = hi, (edges[i + 2] if i + 2 < len(edges) else n)
+        next_x = x[next_lo:next_hi].mean()
+        next_y = y[next_lo:next_hi].mean()
+        area = np.abs((x[previous] - next_x) * (y[lo:hi] - y[previous])
+                      - (x[previous] - x[lo:hi]) * (next_y - y[previous]))
+        previous = lo + int(np.argmax(area))
+        selected[i + 1] = previous
+    return selected
+
+
+def downsample_series(air_quality_data, max_points):
+    """Return at most `max_points` readings chosen with LTTB, dropping NaN values."""
+    series = _as_series(air_quality_data)
+    valid = ~np.isnan(series.values)
+    timestamps, values = series.timestamps[valid], series.values[valid]
+    keep = lttb_indices(timestamps.astype(np.int64), values, max_points)
+    return ReadingSeries(timestamps[keep], values[keep], series.sensor_id, series.metadata)
+
+
+class ChartTemplate:
+    """
+    Reusable headless figure with one datetime axis and one line.
+
+    Rendering a chart only swaps the line data, limits and labels before
+    saving, instead of building a new figure per chart. Uses the Agg canvas
+    directly, so no display or pyplot state is involved.
+
+    Parameters:
+        figsize (tuple): Figure size in inches.
+        dpi (int): Resolution of raster output.
+    """
+
+    def __init__(self, figsize=(12, 6), dpi=100):
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        import matplotlib.dates as mdates
+
+        self._date2num = mdates.date2num
+        self.figsize = tuple(figsize)
+        self.dpi = dpi
+        self.figure = Figure(figsize=figsize, dpi=dpi)
+        FigureCanvasAgg(self.figure)
+        self.axes = self.figure.add_subplot()
+        self.line, = self.axes.plot([], [], linestyle='-', color='blue')
+        locator = mdates.AutoDateLocator()
+        self.axes.xaxis.set_major_locator(locator)
+        self.axes.xaxis.set_major_formatter(mdates.ConciseDateFormatter(locator))
+        self.axes.grid(True, linestyle='--', alpha=0.7)
+        self.axes.set_xlabel('Time')
+        # Fixed margins instead of tight_layout on every save
+        self.figure.subplots_adjust(left=0.08, right=0.98, top=0.93, bottom=0.1)
+
+    @timed('plot')
+    def render(self, series, output_path, title='', ylabel='', marker=None):
+        """Draw a ReadingSeries into the template and save it to output_path."""
+        self.line.set_data(self._date2num(series.timestamps), series.values)
+        self.line.set_marker(marker or '')
+        self.axes.relim()
+        self.axes.autoscale_view()
+        self.axes.set_title(title)
+        self.axes.set_ylabel(ylabel)
+        self.figure.savefig(output_path)
+        return output_path
+
+
+_chart_template = None
+
+
+def _init_chart_template(figsize=(12, 6), dpi=100):
+    # One template per process; ChartTemplate draws on its own Agg canvas, so the
+    # pyplot backend of the calling process is left alone
+    global _chart_template
+    _chart_template = ChartTemplate(figsize, dpi)
+
+
+def _init_chart_worker(figsize=(12, 6), dpi=100):
+    # Runs once per pool worker process: headless backend, then the template
+    import matplotlib
+    matplotlib.use('Agg')
+    _init_chart_template(figsize, dpi)
+
+
+def render_chart(series, output_path, title='', ylabel='', marker=None):
+    """Render one series to a file with this process's shared ChartTemplate."""
+    if _chart_template is None:
+        _init_chart_template()
+    return _chart_template.render(series, output_path, title, ylabel, marker)
+
+
+def render_charts(series_by_sensor, output_dir, fmt='png', max_points=2000, processes=None,
+                  title=None, ylabel=None, figsize=(12, 6), dpi=100, pollutant=None):
+    """
+    Render one chart per sensor to files, in parallel across a process pool.
+
+    Series are downsampled with LTTB in the parent before being shipped to the
+    workers; each worker renders into its own reusable ChartTemplate with the
+    non-interactive Agg backend.
+
+    Parameters:
+        series_by_sensor (dict): sensor_id -> ReadingSeries or GetData records.
+        output_dir (str): Directory the charts are written to (created if needed).
+        fmt (str): Output format / file extension ('png', 'svg', 'pdf').
+        max_points (int): Maximum points drawn per chart (None to plot everything).
+        processes (int): Worker processes (default: CPU count; 1 renders in-process).
+        title (str): Chart title; '{sensor_id}' is substituted (default: '<pollutant> Levels Over Time').
+        ylabel (str): y-axis label (default: '<pollutant> Concentration (<units>)').
+        figsize (tuple): Figure size in inches.
+        dpi (int): Resolution of raster output.
+        pollutant (str): Pollutant code from POLLUTANTS for the default labels (default: each
+            series' metadata 'pollutant', else 'o3').
+
+    Returns:
+        dict: sensor_id -> output path, or an {"error", "details"} dict for that sensor.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    tasks = {}
+    for sensor_id, air_quality_data in series_by_sensor.items():
+        series = _as_series(air_quality_data, sensor_id)
+        name, _, units = POLLUTANTS[pollutant or series.metadata.get('pollutant', 'o3')]
+        if max_points:
+            series = downsample_series(series, max_points)
+        filename = re.sub(r'[^A-Za-z0-9_.-]', '_', str(sensor_id)) + '.' + fmt
+        tasks[sensor_id] = (series, os.path.join(output_dir, filename),
+                            (title or f'{name} Levels Over Time').format(sensor_id=sensor_id),
+                            ylabel or f'{name} Concentration ({units})')
+
+    results = {}
+    if processes == 1 or len(tasks) <= 1:
+        if _chart_template is None or (_chart_template.figsize, _chart_template.dpi) != (tuple(figsize), dpi):
+            _init_chart_template(figsize, dpi)
+        for sensor_id, task in tasks.items():
+            try:
+                results[sensor_id] = _chart_template.render(*task)
+            except Exception as e:
+                results[sensor_id] = {"error": "Rendering Error", "details": str(e)}
+        return results
+
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_chart_worker,
+                             initargs=(figsize, dpi)) as executor:
+        futures = {sensor_id: executor.submit(render_chart, *task) for sensor_id, task in tasks.items()}
+        for sensor_id, future in futures.items():
+            try:
+                results[sensor_id] = future.result()
+            except Exception as e:
+                results[sensor_id] = {"error": "Rendering Error", "details": str(e)}
+    return results
+
+
+class _LevelOfDetail:
+    # Bounded-size view of a growing series: recent samples at full resolution
+    # plus an LTTB summary of the older ones. Every append costs at most
+    # O(max_points), however long the history gets.
+
+    def __init__(self, max_points):
+        self.block = max(8, max_points // 4)
+        self.max_coarse = max(2 * self.block, max_points // 2)
+        self.ratio = 4  # Raw samples per summary point; doubles whenever the summary is halved
+        self.coarse_x = self.raw_x = np.empty(0, dtype=np.float64)
+        self.coarse_y = self.raw_y = np.empty(0, dtype=np.float64)
+
+    def __len__(self):
+        return len(self.coarse_x) + len(self.raw_x)
+
+    def last_x(self):
+        if len(self.raw_x):
+            return self.raw_x[-1]
+        return self.coarse_x[-1] if len(self.coarse_x) else -np.inf
+
+    def append(self, x, y):
+        newer = x > self.last_x()
+        self.raw_x = np.concatenate((self.raw_x, x[newer]))
+        self.raw_y = np.concatenate((self.raw_y, y[newer]))
+        # Fold full blocks of raw samples into the summary at its current ratio, so the
+        # summary keeps an even density and halving it does not wipe out older history
+        while len(self.raw_x) >= 2 * self.block:
+            keep = lttb_indices(self.raw_x[:self.block], self.raw_y[:self.block],
+                                max(3, self.block // self.ratio))
+            self.coarse_x = np.concatenate((self.coarse_x, self.raw_x[keep]))
+            self.coarse_y = np.concatenate((self.coarse_y, self.raw_y[keep]))
+            self.raw_x, self.raw_y = self.raw_x[self.block:], self.raw_y[self.block:]
+            if len(self.coarse_x) > self.max_coarse:
+                keep = lttb_indices(self.coarse_x, self.coarse_y, len(self.coarse_x) // 2)
+                self.coarse_x, self.coarse_y = self.coarse_x[keep], self.coarse_y[keep]
+                self.ratio *= 2
+
+    def trim(self, cutoff):
+        # Drop points left of the visible window
+        first = np.searchsorted(self.coarse_x, cutoff)
+        self.coarse_x, self.coarse_y = self.coarse_x[first:], self.coarse_y[first:]
+        first = np.searchsorted(self.raw_x, cutoff)
+        self.raw_x, self.raw_y = self.raw_x[first:], self.raw_y[first:]
+
+    def data(self):
+        return np.concatenate((self.coarse_x, self.raw_x)), np.concatenate((self.coarse_y, self.raw_y))
+
+
+class LiveDashboard:
+    """
+    Live multi-sensor dashboard that redraws only what changed.
+
+    One panel per sensor on a shared datetime axis. Line artists are created
+    once; new samples are appended to them and drawn with blitting over a
+    cached background, so a refresh costs one restore, one line draw and one
+    blit per changed panel. Each line is kept at most `max_points` long by
+    level-of-detail decimation (recent samples at full resolution, older ones
+    as an LTTB summary), so frame time stays flat as the history grows. The
+    x-range slides in steps of `headroom` and the y-range only grows between
+    slides, so the full redraw needed for new tick labels is rare.
+
+    Parameters:
+        sensor_ids (iterable): Sensor IDs, one panel each.
+        window (timedelta): History visible per panel.
+        max_points (int): Maximum points drawn per line.
+        headroom (timedelta): Space kept right of the newest sample (default: window / 12).
+        pollutant (str): Pollutant code from POLLUTANTS for the labels (default 'o3').
+        ncols (int): Panel columns (default: a roughly square grid).
+        figsize (tuple): Figure size in inches (default: scaled to the grid).
+        dpi (int): Resolution.
+        interactive (bool): Draw in a pyplot window; False renders headless on the
+            Agg canvas, use save() to write frames.
+    """
+
+    def __init__(self, sensor_ids, window=timedelta(hours=24), max_points=1000, headroom=None, pollutant='o3',
+                 ncols=None, figsize=None, dpi=100, interactive=True):
+        import matplotlib.dates as mdates
+
+        self.sensor_ids = [str(sensor_id) for sensor_id in dict.fromkeys(sensor_ids)]
+        self.window = window.total_seconds() / 86400.0  # In matplotlib date units (days)
+        self.headroom = (headroom or window / 12).total_seconds() / 86400.0
+        self.max_points = max_points
+        self.interactive = interactive
+        self.units = POLLUTANTS[pollutant][2]
+        self._date2num = mdates.date2num
+        self.full_redraws = 0
+        self.last_frame_seconds = None
+
+        ncols = ncols or int(np.ceil(np.sqrt(len(self.sensor_ids))))
+        nrows = int(np.ceil(len(self.sensor_ids) / ncols))
+        figsize = figsize or (4.5 * ncols, 2.5 * nrows)
+        if interactive:
+            import matplotlib.pyplot as plt
+            self.figure = plt.figure(figsize=figsize, dpi=dpi)
+        else:
+            from matplotlib.figure import Figure
+            from matplotlib.backends.backend_agg import FigureCanvasAgg
+            self.figure = Figure(figsize=figsize, dpi=dpi)
+            FigureCanvasAgg(self.figure)
+        self.canvas = self.figure.canvas
+
+        locator = mdates.AutoDateLocator()
+        formatter = mdates.ConciseDateFormatter(locator)
+        grid = self.figure.subplots(nrows, ncols, sharex=True, squeeze=False).ravel()
+        for axes in grid[len(self.sensor_ids):]:
+            axes.set_visible(False)
+        self.axes, self.lines, self.labels, self.history = {}, {}, {}, {}
+        for sensor_id, axes in zip(self.sensor_ids, grid):
+            axes.set_title(f'Sensor {sensor_id}', fontsize=10)
+            axes.grid(True, linestyle='--', alpha=0.7)
+            axes.xaxis.set_major_locator(locator)
+            axes.xaxis.set_major_formatter(formatter)
+            axes.set_ylim(0, 1)
+            # Animated artists are left out of normal draws and only ever blitted
+            self.lines[sensor_id], = axes.plot([], [], linestyle='-', color='blue', animated=True)
+            self.labels[sensor_id] = axes.text(0.98, 0.95, '', transform=axes.transAxes, ha='right', va='top',
+                                               fontsize=9, animated=True)
+            self.axes[sensor_id] = axes
+            self.history[sensor_id] = _LevelOfDetail(max_points)
+        self.figure.supylabel(f'{POLLUTANTS[pollutant][1]} ({self.units})')
+        self.figure.subplots_adjust(left=0.08, right=0.98, top=0.93, bottom=0.08, hspace=0.4, wspace=0.2)
+
+        self._backgrounds = {}
+        self.canvas.mpl_connect('draw_event', self._on_draw)
+        if interactive:
+            plt.show(block=False)
+        self._redraw()
+
+    def _on_draw(self, event):
+        # Every full draw (ours, a resize, a GUI expose) refreshes the cached backgrounds
+        self._backgrounds = {sensor_id: self.canvas.copy_from_bbox(axes.bbox)
+                             for sensor_id, axes in self.axes.items()}
+        for sensor_id in self.sensor_ids:
+            self._draw_panel(sensor_id)
+
+    def _draw_panel(self, sensor_id):
+        axes = self.axes[sensor_id]
+        axes.draw_artist(self.lines[sensor_id])
+        axes.draw_artist(self.labels[sensor_id])
+
+    def _redraw(self):
+        self.full_redraws += 1
+        self.canvas.draw()
+        if self.interactive:
+            self.canvas.flush_events()
+
+    def _y_limits(self, sensor_id):
+        _, values = self.history[sensor_id].data()
+        if not len(values):
+            return 0.0, 1.0
+        lo, hi = min(0.0, float(values.min())), float(values.max())
+        return lo, hi + max(0.15 * (hi - lo), 1.0)
+
+    def extend(self, sensor_id, air_quality_data):
+        """Add a batch of readings (GetData records or a ReadingSeries) to a panel and redraw it."""
+        series = _as_series(air_quality_data, sensor_id)
+        valid = ~np.isnan(series.values)
+        self._apply({str(sensor_id): (series.timestamps[valid], series.values[valid])}, {})
+
+    @timed('dashboard')
+    def update(self, updates):
+        """
+        Append RealTimeMonitor.poll() updates and redraw the panels that changed.
+
+        Error updates are shown on their sensor's panel until data arrives again.
+
+        Returns:
+            float: Seconds taken by the frame.
+        """
+        batches, labels = collections.defaultdict(lambda: ([], [])), {}
+        for update in updates:
+            sensor_id = str(update.get('sensor_id'))
+            if sensor_id not in self.axes:
+                continue
+            if 'error' in update:
+                labels[sensor_id] = (update['error'], 'red')
+                continue
+            timestamps, values = batches[sensor_id]
+            timestamps.append(np.datetime64(update['TimeStamp'], 's'))
+            values.append(update['Data'])
+            average = update.get('avg_8h')
+            labels[sensor_id] = (f"{update['Data']:.1f} {self.units}"
+                                 + (f"  (8h {average:.1f})" if average is not None else ''), 'black')
+        batches = {sensor_id: (np.array(timestamps, dtype='datetime64[s]'), np.array(values, dtype=np.float64))
+                   for sensor_id, (timestamps, values) in batches.items()}
+        return self._apply(batches, labels)
+
+    def _apply(self, batches, labels):
+        started = time.perf_counter()
+        changed = set(labels)
+        for sensor_id, (timestamps, values) in batches.items():
+            if len(timestamps):
+                self.history[sensor_id].append(self._date2num(timestamps), values)
+                changed.add(sensor_id)
+        for sensor_id, (text, color) in labels.items():
+            self.labels[sensor_id].set_text(text)
+            self.labels[sensor_id].set_color(color)
+
+        full = False
+        newest = max((history.last_x() for history in self.history.values()), default=-np.inf)
+        _, right = next(iter(self.axes.values())).get_xlim()
+        if np.isfinite(newest) and (newest > right or newest < right - 2 * self.headroom):
+            # Slide the shared x-range; ticks change, so every panel is redrawn and rescaled
+            right = newest + self.headroom
+            next(iter(self.axes.values())).set_xlim(right - self.headroom - self.window, right)
+            for sensor_id, history in self.history.items():
+                history.trim(right - self.headroom - self.window)
+                self.axes[sensor_id].set_ylim(*self._y_limits(sensor_id))
+            changed.update(self.history)
+            full = True
+        for sensor_id in changed:
+            x, y = self.history[sensor_id].data()
+            self.lines[sensor_id].set_data(x, y)
+            if not full and len(y):
+                bottom, top = self.axes[sensor_id].get_ylim()
+                if y.min() < bottom or y.max() > top:
+                    self.axes[sensor_id].set_ylim(*self._y_limits(sensor_id))
+                    full = True
+
+        if full or not self._backgrounds or not self.canvas.supports_blit:
+            self._redraw()
+        elif changed:
+            for sensor_id in changed:
+                self.canvas.restore_region(self._backgrounds[sensor_id])
+                self._draw_panel(sensor_id)
+                self.canvas.blit(self.axes[sensor_id].bbox)
+            if self.interactive:
+                self.canvas.flush_events()
+        self.last_frame_seconds = time.perf_counter() - started
+        return self.last_frame_seconds
+
+    def save(self, output_path):
+        """Write the current frame, as last drawn, to a raster image file (PNG, JPEG, ...)."""
+        import matplotlib.image as mimage
+        mimage.imsave(output_path, np.asarray(self.canvas.buffer_rgba()))
+        return output_path
+
+    def run(self, monitor, interval=60, frame_path=None):
+        """
+        Poll a RealTimeMonitor forever and draw every batch of updates.
+
+        Parameters:
+            monitor (RealTimeMonitor): Source of the updates.
+            interval (float): Seconds between the start of consecutive polls.
+            frame_path (str): When given, write each frame to this file as well.
+        """
+        while True:
+            started = time.monotonic()
+            self.update(monitor.poll())
+            if frame_path:
+                self.save(frame_path)
+            remaining = max(0.0, interval - (time.monotonic() - started))
+            if self.interactive:
+                self.canvas.start_event_loop(remaining)  # Keeps the window responsive while waiting
+            else:
+                time.sleep(remaining)
+
+
+def live_dashboard(sensor_ids, token, interval=60, frame_path=None, client=None, dashboard_options=None,
+                   **monitor_options):
+    """
+    Run a LiveDashboard fed by a RealTimeMonitor for the given sensors.
+
+    Parameters:
+        sensor_ids (iterable): Sensor IDs to display.
+        token (str): API token for authentication.
+        interval (float): Refresh interval in seconds.
+        frame_path (str): When given, also write each frame to this file.
+        client (SmabilityClient): Client to fetch through (default: shared client).
+        dashboard_options (dict): Extra LiveDashboard options (window, max_points, interactive, ...).
+        **monitor_options: Extra RealTimeMonitor options (lookback, ...).
+    """
+    monitor = RealTimeMonitor(sensor_ids, token, client=client, **monitor_options)
+    dashboard = LiveDashboard(monitor.sensor_ids, **(dashboard_options or {}))
+    dashboard.run(monitor, interval, frame_path)
+
+
+class SpatialInterpolator:
+    """
+    Linear interpolation of station readings onto a fixed lat/lon grid.
+
+    The Delaunay triangulation of the stations and the barycentric weight of
+    every grid cell are computed once, as a sparse (cells x stations) matrix.
+    Interpolating a time step, or a whole stack of them, is then one sparse
+    matrix product, the same surface griddata(method='linear') gives without
+    re-triangulating per frame. Stations missing in a frame (NaN) are handled
+    by renormalizing the weights of the remaining triangle corners.
+
+    Parameters:
+        stations (dict): sensor_id -> (latitude, longitude).
+        resolution (tuple): Grid size as (rows, columns).
+        bounds (tuple): (lat_min, lat_max, lon_min, lon_max); default: station extent plus padding.
+        padding (float): Fraction of the station extent added around it when bounds is not given.
+    """
+
+    def __init__(self, stations, resolution=(200, 200), bounds=None, padding=0.05):
+        from scipy.spatial import Delaunay
+        from scipy import sparse
+
+        self.station_ids = list(stations)
+        coordinates = np.array([stations[sensor_id] for sensor_id in self.station_ids], dtype=np.float64)
+        if len(coordinates) < 3:
+            raise ValueError("At least 3 stations are needed for a triangulation")
+        self.latitudes, self.longitudes = coordinates[:, 0], coordinates[:, 1]
+
+        if bounds is None:
+            lat_pad = (self.latitudes.max() - self.latitudes.min()) * padding
+            lon_pad = (self.longitudes.max() - self.longitudes.min()) * padding
+            bounds = (self.latitudes.min() - lat_pad, self.latitudes.max() + lat_pad,
+                      self.longitudes.min() - lon_pad, self.longitudes.max() + lon_pad)
+        self.bounds = bounds
+        self.resolution = resolution
+
+        rows, columns = resolution
+        grid_lat, grid_lon = np.meshgrid(np.linspace(bounds[0], bounds[1], rows),
+                                         np.linspace(bounds[2], bounds[3], columns), indexing='ij')
+        cells = np.column_stack((grid_lon.ravel(), grid_lat.ravel()))
+
+        # Triangulate once and locate every grid cell in it
+        triangulation = Delaunay(np.column_stack((self.longitudes, self.latitudes)))
+        simplex = triangulation.find_simplex(cells)
+        self.inside = simplex >= 0
+        inside_cells = np.flatnonzero(self.inside)
+
+        # Barycentric coordinates of each covered cell in its triangle
+        transform = triangulation.transform[simplex[self.inside]]
+        partial = np.einsum('ijk,ik->ij', transform[:, :2, :], cells[self.inside] - transform[:, 2, :])
+        barycentric = np.column_stack((partial, 1 - partial.sum(axis=1)))
+
+        self.weights = sparse.csr_matrix(
+            (barycentric.ravel(), (np.repeat(inside_cells, 3), triangulation.simplices[simplex[self.inside]].ravel())),
+            shape=(rows * columns, len(self.station_ids)))
+
+    @timed('interpolate')
+    def interpolate(self, values):
+        """
+        Interpolate one or many time steps.
+
+        Parameters:
+            values (array-like): Station values in station_ids order, shape (stations,)
+                or (frames, stations); NaN marks a missing station.
+
+        Returns:
+            numpy.ndarray: Grid of shape (rows, columns) or (frames, rows, columns), NaN outside the stations' hull.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        frames = np.atleast_2d(values)
+        present = ~np.isnan(frames)
+
+        numerator = self.weights @ np.where(present, frames, 0.0).T
+        denominator = self.weights @ present.T.astype(np.float64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            grid = np.where(denominator > 1e-12, numerator / denominator, np.nan)
+        grid[~self.inside] = np.nan
+
+        grid = grid.T.reshape((len(frames),) + tuple(self.resolution))
+        return grid[0] if values.ndim == 1 else grid
+
+
+_interpolator_cache = {}
+
+
+def get_spatial_interpolator(stations, resolution=(200, 200), bounds=None):
+    """Return the SpatialInterpolator for a station layout, building it only the first time."""
+    key = (tuple((str(sensor_id), tuple(location)) for sensor_id, location in stations.items()),
+           tuple(resolution), tuple(bounds) if bounds else None)
+    if key not in _interpolator_cache:
+        _interpolator_cache[key] = SpatialInterpolator(stations, resolution, bounds)
+    return _interpolator_cache[key]
+
+
+def station_matrix(series_by_sensor, station_ids, start_time, end_time, bucket='5min'):
+    """
+    Align many sensors on a common time axis for spatial interpolation.
+
+    Returns:
+        tuple: (datetime64 bucket starts, frames x stations array of bucket means, NaN where missing).
+    """
+    columns = []
+    times = None
+    for sensor_id in station_ids:
+        air_quality_data = series_by_sensor.get(sensor_id)
+        if air_quality_data is None or isinstance(air_quality_data, (dict, str)):
+            air_quality_data = []  # Missing or failed sensor
+        aggregated = aggregate_readings(air_quality_data, bucket, ('mean',), start_time, end_time)
+        times = aggregated['time']
+        columns.append(aggregated['mean'])
+    return times, np.column_stack(columns) if columns else np.empty((0, 0))
+
+
+def _heatmap_colors(grid, vmin, vmax, cmap, opacity=1.0):
+    # Map a grid to RGBA with NaN cells fully transparent
+    from matplotlib import colormaps
+    from matplotlib.colors import Normalize
+
+    rgba = colormaps[cmap](Normalize(vmin=vmin, vmax=vmax, clip=True)(np.ma.masked_invalid(grid)))
+    rgba[..., 3] = np.where(np.isnan(grid), 0.0, opacity)
+    return rgba
+
+
+def heatmap_folium(interpolator, values, vmin=0, vmax=150, cmap='RdYlGn_r', opacity=0.6, zoom_start=11,
+                   pollutant='o3'):
+    """
+    Build a folium map with the interpolated surface and the stations.
+
+    Parameters:
+        interpolator (SpatialInterpolator): Interpolator for the station layout.
+        values (array-like): One value per station, in interpolator.station_ids order.
+        vmin, vmax (float): Color scale limits, in the pollutant's units.
+        cmap (str): Matplotlib colormap name.
+        opacity (float): Overlay opacity.
+        zoom_start (int): Initial map zoom.
+        pollutant (str): Pollutant code from POLLUTANTS for the popup units (default 'o3').
+
+    Returns:
+        folium.Map: Call .save('map.html') to write it.
+    """
+    import folium
+
+    units = POLLUTANTS[pollutant][2]
+    grid = interpolator.interpolate(values)
+    lat_min, lat_max, lon_min, lon_max = interpolator.bounds
+    fmap = folium.Map(location=[(lat_min + lat_max) / 2, (lon_min + lon_max) / 2], zoom_start=zoom_start)
+    folium.raster_layers.ImageOverlay(
+        image=_heatmap_colors(grid, vmin, vmax, cmap, opacity),
+        bounds=[[lat_min, lon_min], [lat_max, lon_max]],
+        origin='lower'
+    ).add_to(fmap)
+    for sensor_id, lat, lon, value in zip(interpolator.station_ids, interpolator.latitudes,
+                                          interpolator.longitudes, np.asarray(values, dtype=np.float64)):
+        label = 'no data' if np.isnan(value) else f"{value:.1f} {units}"
+        folium.CircleMarker(location=[lat, lon], radius=5, color='black', fill=True,
+                            popup=f"Sensor {sensor_id}: {label}").add_to(fmap)
+    return fmap
+
+
+class HeatmapRenderer:
+    """
+    Reusable headless figure for heatmap frames.
+
+    The image artist, colorbar and station markers are created once; each
+    frame only replaces the image data and the title before saving. The
+    colorbar is labelled for `pollutant`, a code from POLLUTANTS.
+    """
+
+    def __init__(self, interpolator, vmin=0, vmax=150, cmap='RdYlGn_r', figsize=(8, 8), dpi=100, pollutant='o3'):
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+        self.name, _, units = POLLUTANTS[pollutant]
+        self.figure = Figure(figsize=figsize, dpi=dpi)
+        FigureCanvasAgg(self.figure)
+        axes = self.figure.add_subplot()
+        lat_min, lat_max, lon_min, lon_max = interpolator.bounds
+        self.image = axes.imshow(np.full(interpolator.resolution, np.nan), origin='lower', cmap=cmap,
+                                 vmin=vmin, vmax=vmax, extent=(lon_min, lon_max, lat_min, lat_max), aspect='auto')
+        axes.scatter(interpolator.longitudes, interpolator.latitudes, c='black', s=12)
+        axes.set_xlabel('Longitude')
+        axes.set_ylabel('Latitude')
+        self.figure.colorbar(self.image, ax=axes, label=f'{self.name} Concentration ({units})')
+        self.axes = axes
+
+    @timed('plot')
+    def render(self, grid, output_path, title=''):
+        self.image.set_data(np.ma.masked_invalid(grid))
+        self.axes.set_title(title)
+        self.figure.savefig(output_path)
+        return output_path
+
+
+def render_heatmap_png(interpolator, values, output_path, title=None, **renderer_options):
+    """Interpolate one time step and save it as an image (default title: '<pollutant> Heatmap')."""
+    renderer = HeatmapRenderer(interpolator, **renderer_options)
+    return renderer.render(interpolator.interpolate(values), output_path, title or f'{renderer.name} Heatmap')
+
+
+def render_heatmap_frames(interpolator, times, frames, output_dir, fmt='png', **renderer_options):
+    """
+    Render animation frames for a time range.
+
+    All frames are interpolated in one sparse product and drawn into a single
+    reused figure.
+
+    Parameters:
+        interpolator (SpatialInterpolator): Interpolator for the station layout.
+        times (array-like): datetime64 time of each frame (see station_matrix).
+        frames (array-like): frames x stations values.
+        output_dir (str): Directory the frames are written to (created if needed).
+        fmt (str): Image format / file extension.
+        **renderer_options: HeatmapRenderer options (vmin, vmax, cmap, figsize, dpi, pollutant).
+
+    Returns:
+        list: Paths of the written frames, in time order.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    renderer = HeatmapRenderer(interpolator, **renderer_options)
+    grids = interpolator.interpolate(np.atleast_2d(frames))
+    paths = []
+    for index, (timestamp, grid) in enumerate(zip(np.asarray(times, dtype='datetime64[s]'), grids)):
+        label = str(timestamp).replace('T', ' ')
+        paths.append(renderer.render(grid, os.path.join(output_dir, f"frame_{index:05d}.{fmt}"),
+                                     f"{renderer.name} {label}"))
+    return paths
+
+
 # Function parameter initialization
 sensor_id = '7'  # O3 sensor, device Hipodromo
 token = ''  # Your working token
+cache_path = 'smability_cache.sqlite3'  # Local reading store, only new samples are fetched
 hours = 48  # Fetch the last 48 complete hours
 
-# Fetch air quality data and compute hourly averages.
-averages = get_hourly_air_quality(sensor_id, token, hours)
-
 sensor_id = '7'  # O3 sensor, device Hipodromo
 timeDeltaArgKey = "minutes"
 timeDeltaArgValue = 2880  # change this number to 60, at 5min sample rate, will result in a list of 12 values
@@ -295,7 +3994,8 @@ kwargs = {timeDeltaArgKey: timeDeltaArgValue}
 
 def main():
     # Print air quality data every 5 minute (sampling rate)
-    o3_rawdata = get_air_quality_data(sensor_id, token, timeDeltaArgKey, timeDeltaArgValue)
+    o3_rawdata = get_cached_air_quality_data(sensor_id, token, timeDeltaArgKey, timeDeltaArgValue,
+                                             cache=ReadingCache(cache_path))
     
     # Debug: Check what we actually received
     print("Type of o3_rawdata:", type(o3_rawdata))
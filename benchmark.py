@@ -0,0 +1,215 @@
+"""
+Benchmark suite for air_quality_monitoring_v2 against the local GetData stand-in.
+
+Reports latency percentiles and throughput for fetching, hourly averaging,
+aggregation, forecasting and plotting across window sizes and sensor counts,
+so regressions show up before they ship. No production API calls are made
+unless --base-url points somewhere else.
+
+Usage:
+    python benchmark.py [--quick] [--repeat 5] [--latency 0.02] [--error-rate 0.0] [--json results.json]
+"""
+import argparse
+import json
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+import air_quality_monitoring_v2 as aqm
+from mock_smability_server import start_mock_server
+
+FULL_MATRIX = {
+    'fetch_hours': (1, 24, 168),
+    'batch_sensors': (1, 10, 100),
+    'hourly_hours': (24, 168, 720),
+    'aggregate_rows': (1_000, 100_000, 1_000_000),
+    'forecast_sensors': (10, 100, 1000),
+    'plot_points': (1_000, 100_000),
+}
+
+QUICK_MATRIX = {
+    'fetch_hours': (1, 24),
+    'batch_sensors': (1, 10),
+    'hourly_hours': (24, 168),
+    'aggregate_rows': (1_000, 100_000),
+    'forecast_sensors': (10, 100),
+    'plot_points': (1_000,),
+}
+
+
+def measure(fn, repeat, warmup=1):
+    """
+    Time `fn` `repeat` times after `warmup` untimed calls.
+
+    Returns:
+        tuple: (latencies in seconds as an array, result of the last call).
+    """
+    result = None
+    for _ in range(warmup):
+        result = fn()
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        latencies.append(time.perf_counter() - start)
+    return np.array(latencies), result
+
+
+def summarize(name, params, latencies, items=None, unit='rows'):
+    """Build one result row: latency percentiles (ms), calls/s and optionally items/s."""
+    row = {
+        'benchmark': name,
+        'params': params,
+        'runs': len(latencies),
+        'p50_ms': float(np.percentile(latencies, 50) * 1000),
+        'p90_ms': float(np.percentile(latencies, 90) * 1000),
+        'p99_ms': float(np.percentile(latencies, 99) * 1000),
+        'calls_per_s': float(len(latencies) / latencies.sum()) if latencies.sum() else float('inf'),
+    }
+    if items is not None:
+        row[f'{unit}_per_s'] = float(items * len(latencies) / latencies.sum()) if latencies.sum() else float('inf')
+    return row
+
+
+def synthetic_series(n, sensor_id='bench', step_seconds=60):
+    rng = np.random.default_rng(0)
+    timestamps = np.datetime64('2024-01-01T00:00:00') + np.arange(n) * np.timedelta64(step_seconds, 's')
+    values = 35 + 20 * np.sin(np.arange(n) / 240) + rng.normal(0, 3, n)
+    return aqm.ReadingSeries(timestamps, values, sensor_id)
+
+
+def bench_fetch(client, matrix, repeat):
+    for hours in matrix['fetch_hours']:
+        latencies, data = measure(lambda: aqm.get_air_quality_data('7', 'bench', 'hours', hours, client=client),
+                                  repeat)
+        yield summarize('get_air_quality_data', {'hours': hours}, latencies,
+                        len(data) if isinstance(data, list) else 0)
+
+
+def bench_batch(client, matrix, repeat):
+    for sensors in matrix['batch_sensors']:
+        sensor_ids = [str(i) for i in range(sensors)]
+        latencies, data = measure(lambda: aqm.get_air_quality_data_batch(sensor_ids, 'bench', 'hours', 24,
+                                                                         client=client), repeat)
+        rows = sum(len(value) for value in data.values() if isinstance(value, list))
+        yield summarize('get_air_quality_data_batch', {'sensors': sensors, 'hours': 24}, latencies, rows)
+
+
+def bench_hourly(client, matrix, repeat):
+    for hours in matrix['hourly_hours']:
+        latencies, _ = measure(lambda: aqm.get_hourly_air_quality('7', 'bench', hours, client=client), repeat)
+        yield summarize('get_hourly_air_quality', {'hours': hours}, latencies, hours, unit='hours')
+
+
+def bench_aggregate(matrix, repeat):
+    for rows in matrix['aggregate_rows']:
+        series = synthetic_series(rows)
+        latencies, _ = measure(lambda: aqm.aggregate_readings(series, '1h', ('mean', 'min', 'max', 'count', 'p95')),
+                               repeat)
+        yield summarize('aggregate_readings[series]', {'rows': rows}, latencies, rows)
+        if rows <= 100_000:
+            records = series.to_records()
+            latencies, _ = measure(lambda: aqm.aggregate_readings(records, '1h', ('mean',)), repeat)
+            yield summarize('aggregate_readings[records]', {'rows': rows}, latencies, rows)
+
+
+def bench_forecast(matrix, repeat):
+    rng = np.random.default_rng(1)
+    for sensors in matrix['forecast_sensors']:
+        values = 35 + rng.normal(0, 3, (sensors, 576))
+        latencies, _ = measure(lambda: aqm.forecast_fleet(values, horizon=12), repeat)
+        yield summarize('forecast_fleet', {'sensors': sensors, 'samples': 576}, latencies, sensors, unit='sensors')
+
+    samples = rng.normal(35, 3, 10_000)
+
+    def online():
+        forecaster = aqm.OnlineTrendForecaster()
+        for value in samples:
+            forecaster.update(value)
+        return forecaster.forecast(12)
+
+    latencies, _ = measure(online, repeat)
+    yield summarize('OnlineTrendForecaster.update', {'samples': len(samples)}, latencies, len(samples),
+                    unit='samples')
+
+
+def bench_plot(matrix, repeat):
+    with tempfile.TemporaryDirectory() as output_dir:
+        for points in matrix['plot_points']:
+            series = synthetic_series(points)
+            path = f"{output_dir}/chart.png"
+            latencies, _ = measure(lambda: aqm.render_chart(aqm.downsample_series(series, 2000), path,
+                                                            'bench', 'ppb'), repeat)
+            yield summarize('render_chart[lttb 2000]', {'points': points}, latencies, points, unit='points')
+
+
+def print_table(rows):
+    print(f"{'benchmark':34} {'params':32} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'calls/s':>9} {'throughput':>18}")
+    for row in rows:
+        throughput = next(((key[:-6], value) for key, value in row.items() if key.endswith('_per_s')
+                           and key != 'calls_per_s'), None)
+        throughput = f"{throughput[1]:,.0f} {throughput[0]}/s" if throughput else ''
+        params = ', '.join(f"{key}={value}" for key, value in row['params'].items())
+        print(f"{row['benchmark']:34} {params:32} {row['p50_ms']:9.2f} {row['p90_ms']:9.2f} {row['p99_ms']:9.2f} "
+              f"{row['calls_per_s']:9.1f} {throughput:>18}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the air quality module against a local GetData mock.')
+    parser.add_argument('--quick', action='store_true', help='Smaller matrix for a fast smoke run')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed runs per case (default %(default)s)')
+    parser.add_argument('--latency', type=float, default=0.0, help='Mock server latency in seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Mock server error rate')
+    parser.add_argument('--cadence', type=int, default=300, help='Mock sample interval in seconds')
+    parser.add_argument('--base-url', help='Benchmark an already running server instead of starting the mock')
+    parser.add_argument('--only', nargs='*', choices=('fetch', 'batch', 'hourly', 'aggregate', 'forecast', 'plot'),
+                        help='Run only these benchmark groups')
+    parser.add_argument('--json', help='Also write the results to this JSON file')
+    parser.add_argument('--metrics', action='store_true',
+                        help='Enable request/stage instrumentation and print the Prometheus dump')
+    args = parser.parse_args()
+    aqm.enable_instrumentation(args.metrics)
+
+    server = None
+    base_url = args.base_url
+    if base_url is None:
+        server, base_url = start_mock_server(cadence_seconds=args.cadence, latency=args.latency,
+                                             error_rate=args.error_rate)
+    # No rate limit or retries: measure the module, not the scheduler's pacing
+    client = aqm.SmabilityClient(base_url=base_url, pool_maxsize=128,
+                                 scheduler=aqm.RequestScheduler(rate=None, max_concurrency=128, max_retries=0))
+    matrix = QUICK_MATRIX if args.quick else FULL_MATRIX
+
+    groups = {
+        'fetch': lambda: bench_fetch(client, matrix, args.repeat),
+        'batch': lambda: bench_batch(client, matrix, args.repeat),
+        'hourly': lambda: bench_hourly(client, matrix, args.repeat),
+        'aggregate': lambda: bench_aggregate(matrix, args.repeat),
+        'forecast': lambda: bench_forecast(matrix, args.repeat),
+        'plot': lambda: bench_plot(matrix, args.repeat),
+    }
+    rows = []
+    try:
+        for name, group in groups.items():
+            if args.only and name not in args.only:
+                continue
+            rows.extend(group())
+    finally:
+        client.close()
+        if server is not None:
+            server.shutdown()
+
+    print_table(rows)
+    if args.metrics:
+        print()
+        print(aqm.METRICS.render_prometheus(), end='')
+    if args.json:
+        with open(args.json, 'w') as handle:
+            json.dump({'args': vars(args), 'results': rows}, handle, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,75 @@
+"""
+Check that the fetch/aggregate core of air_quality_monitoring_v2 imports fast
+and without pulling in plotting, mapping or ML dependencies.
+
+Each measurement runs in a fresh interpreter so nothing is already cached in
+sys.modules. Exits with status 1 when the budget is exceeded.
+
+Usage:
+    python import_time_budget.py [--budget SECONDS] [--runs N]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+MODULE = 'air_quality_monitoring_v2'
+
+# Best-of-N wall time allowed for `import air_quality_monitoring_v2`
+CORE_IMPORT_BUDGET_SECONDS = 0.5
+
+# Modules that must only be loaded when their features are used
+LAZY_MODULES = ('matplotlib', 'mplcursors', 'folium', 'scipy', 'sklearn', 'pandas')
+
+PROBE = f'''
+import json, sys, time
+start = time.perf_counter()
+import {MODULE}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed,
+                  "loaded": [name for name in {LAZY_MODULES!r} if name in sys.modules]}}))
+'''
+
+
+def measure(runs=5):
+    """
+    Import the module in `runs` fresh interpreters.
+
+    Returns:
+        dict: 'seconds' (best run) and 'loaded' (lazy modules found in sys.modules).
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    results = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', PROBE], cwd=here, check=True,
+                                capture_output=True, text=True).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    return {'seconds': min(result['seconds'] for result in results),
+            'loaded': sorted({name for result in results for name in result['loaded']})}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--budget', type=float, default=CORE_IMPORT_BUDGET_SECONDS,
+                        help='Maximum import time in seconds (default %(default)s)')
+    parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters to measure (default %(default)s)')
+    args = parser.parse_args()
+
+    result = measure(args.runs)
+    print(f"import {MODULE}: {result['seconds'] * 1000:.1f} ms (budget {args.budget * 1000:.0f} ms)")
+
+    failed = False
+    if result['loaded']:
+        print(f"FAIL: heavy modules loaded at import: {', '.join(result['loaded'])}")
+        failed = True
+    if result['seconds'] > args.budget:
+        print("FAIL: import time over budget")
+        failed = True
+    if not failed:
+        print("OK")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,142 @@
+"""
+Local stand-in for the Smability /SmabilityAPI/GetData endpoint.
+
+Serves realistic TimeStamp/Data payloads (a diurnal O3 curve with per-sensor
+noise) so fetch code can be exercised and benchmarked without touching the
+production API. Readings are deterministic per sensor and timestamp, so
+overlapping windows return identical samples.
+
+Usage:
+    python mock_smability_server.py [--port 8080] [--cadence 300] [--latency 0.05] [--error-rate 0.01]
+
+Then point a client at it:
+    SmabilityClient(base_url='http://127.0.0.1:8080/SmabilityAPI')
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import zlib
+from datetime import datetime as dt
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+API_TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def generate_readings(sensor_id, start_time, end_time, cadence_seconds=300):
+    """
+    Build GetData records for every cadence tick in [start_time, end_time].
+
+    Returns:
+        list: [{'TimeStamp': str, 'Data': str}, ...] in time order.
+    """
+    start = int(np.datetime64(start_time, 's').astype(np.int64))
+    end = int(np.datetime64(end_time, 's').astype(np.int64))
+    first = -(-start // cadence_seconds) * cadence_seconds  # First tick at or after start
+    epochs = np.arange(first, end + 1, cadence_seconds, dtype=np.int64)
+
+    # Diurnal curve peaking mid-afternoon, plus deterministic per-sensor noise
+    seed = zlib.crc32(str(sensor_id).encode())
+    hours = (epochs % 86400) / 3600.0
+    noise = ((epochs // cadence_seconds * 2654435761 + seed) % 10007) / 10007.0 - 0.5
+    values = np.clip(35 + 30 * np.sin(2 * np.pi * (hours - 9) / 24) + 8 * noise + seed % 7, 0, None)
+
+    labels = np.datetime_as_string(epochs.astype('datetime64[s]'), unit='s')
+    return [{'TimeStamp': label, 'Data': f"{value:.2f}"} for label, value in zip(labels.tolist(), values.tolist())]
+
+
+class MockGetDataHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive, like the real API
+    disable_nagle_algorithm = True  # Headers and body are written separately
+
+    def do_GET(self):
+        server = self.server
+        url = urlparse(self.path)
+        if not url.path.rstrip('/').endswith('/GetData'):
+            return self._send(404, {'error': 'Not found'})
+
+        server.request_count += 1
+        if server.latency:
+            time.sleep(max(0.0, random.gauss(server.latency, server.latency * server.jitter)))
+        if server.error_rate and random.random() < server.error_rate:
+            return self._send(500, {'error': 'Injected failure'})
+
+        query = parse_qs(url.query)
+        try:
+            sensor_id = query['idSensor'][0]
+            start_time = dt.strptime(query['dtStart'][0], API_TIME_FORMAT)
+            end_time = dt.strptime(query['dtEnd'][0], API_TIME_FORMAT)
+        except (KeyError, ValueError) as e:
+            return self._send(400, {'error': f'Bad request: {e}'})
+
+        self._send(200, generate_readings(sensor_id, start_time, end_time, server.cadence_seconds))
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def start_mock_server(host='127.0.0.1', port=0, cadence_seconds=300, latency=0.0, jitter=0.2, error_rate=0.0,
+                      verbose=False):
+    """
+    Start the mock server on a background thread.
+
+    Parameters:
+        host (str): Interface to bind.
+        port (int): Port to bind (0 picks a free one).
+        cadence_seconds (int): Sample interval of the generated readings (payload size per window).
+        latency (float): Mean added response latency in seconds.
+        jitter (float): Standard deviation of the latency as a fraction of its mean.
+        error_rate (float): Fraction of requests answered with HTTP 500.
+        verbose (bool): Log every request to stderr.
+
+    Returns:
+        tuple: (server, base_url); call server.shutdown() to stop it.
+    """
+    server = ThreadingHTTPServer((host, port), MockGetDataHandler)
+    server.daemon_threads = True
+    server.cadence_seconds = cadence_seconds
+    server.latency = latency
+    server.jitter = jitter
+    server.error_rate = error_rate
+    server.verbose = verbose
+    server.request_count = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://{host}:{server.server_address[1]}/SmabilityAPI'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local stand-in for the Smability GetData endpoint.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--cadence', type=int, default=300, help='Seconds between generated samples')
+    parser.add_argument('--latency', type=float, default=0.0, help='Mean added latency in seconds')
+    parser.add_argument('--jitter', type=float, default=0.2, help='Latency std-dev as a fraction of the mean')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests failing with 500')
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    server, base_url = start_mock_server(args.host, args.port, args.cadence, args.latency, args.jitter,
+                                         args.error_rate, args.verbose)
+    print(f"Mock GetData serving at {base_url}/GetData (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,330 @@
+"""
+Parallel, resumable historical backfill for many sensors.
+
+The sensor x time range is split into work units (one GetData request each,
+a day by default) that run in parallel through the client's rate-limited
+scheduler. Every finished unit is appended to a checkpoint file, so an
+interrupted or partly failed run is simply started again with the same
+arguments and only does the remaining units. A request budget on the
+scheduler caps how many GetData requests one run may send, retries included.
+
+Readings go into a ReadingCache (SQLite) or a ReadingArchive (append-only
+binary files); for the archive, the units of one sensor run in time order.
+Units reaching into the last `settle_minutes` (or the future) are stored
+but not checkpointed, so a later run fetches them again once settled.
+
+Usage:
+    python smability_backfill.py --sensors @sensors.txt --start 2022-01-01 --end 2025-01-01 \\
+        --cache smability_cache.sqlite3 [--workers 16] [--rate 20] [--max-requests 50000]
+    python smability_backfill.py --sensors 7 8 --start 2024-01-01 --end 2024-07-01 --archive smability_archive
+"""
+import argparse
+import collections
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import timedelta
+
+import numpy as np
+
+import air_quality_monitoring_v2 as aqm
+
+
+class Checkpoint:
+    """
+    Append-only JSON-lines record of finished work units.
+
+    Each line is written and flushed as soon as its unit is stored, so at
+    most the units in flight are redone after a crash; a torn last line is
+    ignored on load.
+
+    Parameters:
+        path (str): Checkpoint file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.done = set()
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path) as handle:
+                for line in handle:
+                    try:
+                        entry = json.loads(line)
+                        self.done.add((entry['sensor_id'], entry['start'], entry['end']))
+                    except (ValueError, KeyError, TypeError):
+                        continue
+        self._handle = open(path, 'a')
+
+    def record(self, key, rows):
+        sensor_id, start, end = key
+        with self._lock:
+            self._handle.write(json.dumps({'sensor_id': sensor_id, 'start': start, 'end': end, 'rows': rows}) + '\n')
+            self._handle.flush()
+            self.done.add(key)
+
+    def close(self):
+        self._handle.close()
+
+
+def cache_store(cache):
+    """Store function writing units into a ReadingCache (order independent)."""
+    def store(sensor_id, series, start_time, end_time, fetched_at):
+        # Only what has already happened is covered, and only settled ranges are final
+        cache.store(sensor_id, series.to_records(), start_time, min(end_time, fetched_at),
+                    complete=end_time < fetched_at - cache.settle)
+        return len(series)
+    return store
+
+
+def archive_store(archive, settle_minutes=15):
+    """
+    Store function appending units to a ReadingArchive (units of a sensor must arrive in time order).
+
+    Raises RuntimeError for a unit with readings older than the sensor's last
+    archived one that are not archived yet: the append-only archive would
+    drop them, so the unit fails instead of being checkpointed without data.
+    """
+    settle = timedelta(minutes=settle_minutes)
+
+    def store(sensor_id, series, start_time, end_time, fetched_at):
+        # Append-only: readings still settling would hide late arrivals before them for good
+        settled = series.timestamps < np.datetime64(fetched_at - settle, 's')
+        timestamps, values = series.timestamps[settled], series.values[settled]
+        last = archive.last_timestamp(sensor_id)
+        if last is not None and len(timestamps) and timestamps[0] <= last:
+            # Readings archived before (a unit redone after a crash) are fine, missing older ones are not
+            older = timestamps[timestamps <= last]
+            archived = archive.read(sensor_id, older[0], last + np.timedelta64(1, 's')).timestamps
+            if not np.isin(older, archived).all():
+                raise RuntimeError(f"Readings of sensor {sensor_id} from {start_time} are older than its last "
+                                 f"archived reading {last}; the append-only archive cannot take them")
+        archive.append(sensor_id, aqm.ReadingSeries(timestamps, values, sensor_id))
+        return len(timestamps)
+    return store
+
+
+class BackfillJob:
+    """
+    Sensor x time backfill split into checkpointed work units.
+
+    Parameters:
+        sensor_ids (list): IDs of the sensors to backfill.
+        token (str): API token for authentication.
+        start_time (datetime): Backfill start (local time).
+        end_time (datetime): Backfill end (local time).
+        store (callable): store(sensor_id, series, start, end, fetched_at) saving one finished unit and
+            returning the number of readings stored (raising if it cannot store them); fetched_at is
+            the API's local time when the fetch started.
+        checkpoint (Checkpoint): Record of finished units.
+        chunk (timedelta): Length of one work unit (one GetData request).
+        max_workers (int): Units fetched at once.
+        ordered (bool): Run the units of each sensor one at a time in time order (needed by append-only stores).
+        client (SmabilityClient): Client to fetch through (default: shared client). A RequestBudget
+            on its scheduler caps the requests of the run; units it stops are left for the next run.
+        progress (callable): Called with a progress dict after every unit.
+        settle_minutes (int): Age after which readings are considered final; younger units are not checkpointed.
+        timezone_offset_hours (int): Offset of the API's local time from UTC.
+    """
+
+    def __init__(self, sensor_ids, token, start_time, end_time, store, checkpoint, chunk=timedelta(days=1),
+                 max_workers=8, ordered=False, client=None, progress=None, settle_minutes=15,
+                 timezone_offset_hours=-6):
+        self.sensor_ids = [str(sensor_id) for sensor_id in dict.fromkeys(sensor_ids)]
+        self.token = token
+        self.start_time = start_time
+        self.end_time = end_time
+        self.store = store
+        self.checkpoint = checkpoint
+        self.chunk = chunk
+        self.max_workers = max_workers
+        self.ordered = ordered
+        self.client = client or aqm.get_default_client()
+        self.progress = progress
+        self.settle = timedelta(minutes=settle_minutes)
+        self.timezone_offset_hours = timezone_offset_hours
+
+    def units(self):
+        """Return every work unit as (sensor_id, start, end) in sensor, then time order."""
+        windows = aqm.split_window(self.start_time, self.end_time, self.chunk)
+        return [(sensor_id, start, end) for sensor_id in self.sensor_ids for start, end in windows]
+
+    @staticmethod
+    def _key(unit):
+        sensor_id, start, end = unit
+        return sensor_id, start.strftime(aqm.API_TIME_FORMAT), end.strftime(aqm.API_TIME_FORMAT)
+
+    def _run_unit(self, unit):
+        sensor_id, start, end = unit
+        fetched_at = aqm.local_now(self.timezone_offset_hours).replace(microsecond=0)
+        series = aqm.get_air_quality_series(sensor_id, self.token, start, end, chunk=end - start, max_workers=1,
+                                            client=self.client)
+        rows = self.store(sensor_id, series, start, end, fetched_at)
+        return rows, end < fetched_at - self.settle
+
+    def run(self):
+        """
+        Run the remaining units until done, out of budget or interrupted.
+
+        Returns:
+            dict: 'units', 'skipped' (already checkpointed), 'done', 'failed' ({'<sensor>/<start>': error}),
+                'abandoned' (units not run because an earlier unit of an ordered sensor failed), 'remaining',
+                'unsettled' (done but not checkpointed, still settling), 'rows', 'requests' (GetData requests
+                sent, retries included), 'budget_exhausted', 'interrupted' and 'seconds'.
+        """
+        units = self.units()
+        todo = [unit for unit in units if self._key(unit) not in self.checkpoint.done]
+        summary = {'units': len(units), 'skipped': len(units) - len(todo), 'done': 0, 'failed': {},
+                   'abandoned': 0, 'unsettled': 0, 'remaining': len(todo), 'rows': 0, 'requests': 0,
+                   'budget_exhausted': False, 'interrupted': False, 'seconds': 0.0}
+
+        lanes = collections.OrderedDict()
+        for unit in todo:
+            lanes.setdefault(unit[0] if self.ordered else None, collections.deque()).append(unit)
+        ready = collections.deque(lanes)  # Lanes with no unit in flight
+
+        def take():
+            while ready:
+                lane = ready[0]
+                if not lanes[lane]:
+                    ready.popleft()
+                    continue
+                if self.ordered:
+                    ready.popleft()  # Back in once its unit is finished
+                return lane, lanes[lane].popleft()
+            return None
+
+        scheduler = self.client.scheduler
+        budget = scheduler.budget
+        requests_before = scheduler.requests
+        started = time.monotonic()
+        pending = {}
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            while True:
+                while len(pending) < self.max_workers and not summary['budget_exhausted']:
+                    if budget is not None and budget.remaining == 0:
+                        summary['budget_exhausted'] = any(lanes.values())
+                        break
+                    taken = take()
+                    if taken is None:
+                        break
+                    pending[executor.submit(self._run_unit, taken[1])] = taken
+                if not pending:
+                    break
+
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    lane, unit = pending.pop(future)
+                    summary['remaining'] -= 1
+                    try:
+                        rows, settled = future.result()
+                    except aqm.RequestBudgetExceeded:
+                        # Not a failure: the unit is simply left for the next run
+                        summary['remaining'] += 1
+                        summary['budget_exhausted'] = True
+                    except Exception as e:
+                        key = f'{unit[0]}/{unit[1].strftime(aqm.API_TIME_FORMAT)}'
+                        error = aqm.fetch_error(e)
+                        summary['failed'][key] = ': '.join(filter(None, (error['error'], error.get('details'))))
+                        if self.ordered:
+                            # Later units would land before the gap in an append-only store
+                            summary['abandoned'] += len(lanes[lane])
+                            summary['remaining'] -= len(lanes[lane])
+                            lanes[lane].clear()
+                    else:
+                        if settled:
+                            self.checkpoint.record(self._key(unit), rows)
+                        else:
+                            summary['unsettled'] += 1
+                        summary['done'] += 1
+                        summary['rows'] += rows
+                        if self.ordered and lanes[lane]:
+                            ready.append(lane)
+                    if self.progress is not None:
+                        self.progress(self._progress(summary, started))
+        except KeyboardInterrupt:
+            summary['interrupted'] = True
+        finally:
+            executor.shutdown(wait=not summary['interrupted'], cancel_futures=True)
+            summary['requests'] = scheduler.requests - requests_before
+            summary['seconds'] = time.monotonic() - started
+        return summary
+
+    def _progress(self, summary, started):
+        elapsed = time.monotonic() - started
+        finished = summary['done'] + len(summary['failed'])
+        rate = finished / elapsed if elapsed > 0 else 0.0
+        return {'done': summary['done'] + summary['skipped'], 'failed': len(summary['failed']),
+                'total': summary['units'], 'rows': summary['rows'], 'elapsed': elapsed,
+                'units_per_s': rate, 'eta': summary['remaining'] / rate if rate else None}
+
+
+def _format_seconds(seconds):
+    if seconds is None:
+        return '?'
+    seconds = int(seconds)
+    return f"{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Resumable parallel backfill of Smability history.')
+    parser.add_argument('--sensors', nargs='+', required=True, help='Sensor IDs, comma separated or @file')
+    parser.add_argument('--start', type=aqm.parse_time_argument, required=True, help='Start, YYYY-MM-DD[ HH:MM:SS]')
+    parser.add_argument('--end', type=aqm.parse_time_argument, required=True, help='End, YYYY-MM-DD[ HH:MM:SS]')
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument('--cache', default='smability_cache.sqlite3', help='ReadingCache file (default %(default)s)')
+    target.add_argument('--archive', help='ReadingArchive directory instead of the cache')
+    parser.add_argument('--checkpoint', help='Checkpoint file (default: <target>.backfill.jsonl)')
+    parser.add_argument('--chunk-hours', type=float, default=24, help='Hours per work unit (default %(default)s)')
+    parser.add_argument('--workers', type=int, default=8, help='Units fetched at once (default %(default)s)')
+    parser.add_argument('--rate', type=float, default=10.0, help='Maximum requests per second (default %(default)s)')
+    parser.add_argument('--max-requests', type=int, help='GetData requests allowed in this run, retries included')
+    parser.add_argument('--token', default=os.environ.get('SMABILITY_TOKEN', ''),
+                        help='API token (default: $SMABILITY_TOKEN)')
+    parser.add_argument('--base-url', default=aqm.API_BASE_URL)
+    parser.add_argument('--quiet', action='store_true')
+    args = parser.parse_args()
+
+    if args.archive:
+        target, store, ordered = args.archive, archive_store(aqm.ReadingArchive(args.archive)), True
+    else:
+        target, store, ordered = args.cache, cache_store(aqm.ReadingCache(args.cache)), False
+    checkpoint = Checkpoint(args.checkpoint or target.rstrip('/') + '.backfill.jsonl')
+    last_report = [0.0]
+
+    def progress(state):
+        now = time.monotonic()
+        if args.quiet or (now - last_report[0] < 1.0 and state['done'] + state['failed'] < state['total']):
+            return
+        last_report[0] = now
+        print(f"{state['done']}/{state['total']} units ({state['failed']} failed), {state['rows']} rows, "
+              f"{state['units_per_s']:.1f} units/s, elapsed {_format_seconds(state['elapsed'])}, "
+              f"ETA {_format_seconds(state['eta'])}", file=sys.stderr)
+
+    budget = aqm.RequestBudget(args.max_requests) if args.max_requests is not None else None
+    scheduler = aqm.RequestScheduler(rate=args.rate, max_concurrency=args.workers, budget=budget)
+    with aqm.SmabilityClient(args.token, args.base_url, pool_maxsize=args.workers, scheduler=scheduler) as client:
+        job = BackfillJob(aqm.read_sensor_ids(args.sensors), args.token, args.start, args.end, store, checkpoint,
+                          timedelta(hours=args.chunk_hours), args.workers, ordered, client, progress)
+        summary = job.run()
+    checkpoint.close()
+
+    print(f"Backfilled {summary['done']} of {summary['units']} units ({summary['skipped']} already done, "
+          f"{len(summary['failed'])} failed, {summary['abandoned']} abandoned, {summary['unsettled']} still "
+          f"settling), {summary['rows']} rows, {summary['requests']} requests in "
+          f"{_format_seconds(summary['seconds'])}")
+    if summary['budget_exhausted']:
+        print("Request budget exhausted; rerun to continue.")
+    if summary['interrupted']:
+        print("Interrupted; rerun with the same arguments to resume.")
+    for key, error in sorted(summary['failed'].items()):
+        print(f"  {key}: {error}", file=sys.stderr)
+    return 0 if not summary['failed'] and summary['done'] + summary['skipped'] == summary['units'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,323 @@
+"""
+Bulk export of Smability readings for many sensors and long date ranges.
+
+Every (sensor, day) pair is fetched as its own streamed GetData request and
+written straight to a compressed file partitioned by sensor and day:
+
+    <output>/sensor_id=<id>/<YYYY-MM-DD>.<ext>
+
+Rows go to disk in batches as the response body is decoded, so memory stays
+bounded by the number of concurrent requests, not by the size of the export.
+Finished partitions are written atomically and skipped on the next run, so an
+interrupted export can simply be restarted. Days without readings get an
+empty partition. Days that are cut short by --start/--end or still within
+the settle window (today) are written as `<partition>.partial` instead and
+exported again by the next run.
+
+Usage:
+    python smability_export.py --sensors 7 8 9 --start 2024-01-01 --end 2025-01-01 \\
+        --format parquet --output export/ [--token TOKEN] [--workers 16]
+    python smability_export.py --sensors @sensors.txt --start 2024-01-01 --end 2024-02-01 --format csv
+"""
+import argparse
+import bz2
+import csv
+import gzip
+import json
+import lzma
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import timedelta
+
+import numpy as np
+
+import air_quality_monitoring_v2 as aqm
+
+FORMATS = ('parquet', 'csv', 'ndjson')
+
+# Compression codecs per format; the first one is the default
+COMPRESSIONS = {
+    'parquet': ('zstd', 'snappy', 'gzip', 'none'),
+    'csv': ('gzip', 'bz2', 'xz', 'none'),
+    'ndjson': ('gzip', 'bz2', 'xz', 'none'),
+}
+
+_TEXT_OPENERS = {'gzip': (gzip.open, '.gz'), 'bz2': (bz2.open, '.bz2'), 'xz': (lzma.open, '.xz')}
+
+BATCH_ROWS = 10_000
+
+PARTIAL_SUFFIX = '.partial'  # Days not final yet, re-exported on every run
+
+
+class CsvPartitionWriter:
+    """Write readings as `sensor_id,TimeStamp,Data` rows, optionally compressed."""
+
+    extension = '.csv'
+
+    def __init__(self, path, sensor_id, compression='gzip'):
+        self.sensor_id = sensor_id
+        opener = _TEXT_OPENERS.get(compression)
+        self.handle = opener[0](path, 'wt', newline='') if opener else open(path, 'w', newline='')
+        self.writer = csv.writer(self.handle)
+        self.writer.writerow(('sensor_id', 'TimeStamp', 'Data'))
+
+    def write(self, timestamps, values):
+        self.writer.writerows(zip([self.sensor_id] * len(timestamps), timestamps, values))
+
+    def close(self):
+        self.handle.close()
+
+
+class NdjsonPartitionWriter:
+    """Write readings as one JSON object per line, optionally compressed."""
+
+    extension = '.ndjson'
+
+    def __init__(self, path, sensor_id, compression='gzip'):
+        self.sensor_id = sensor_id
+        opener = _TEXT_OPENERS.get(compression)
+        self.handle = opener[0](path, 'wt') if opener else open(path, 'w')
+
+    def write(self, timestamps, values):
+        self.handle.writelines(json.dumps({'sensor_id': self.sensor_id, 'TimeStamp': timestamp, 'Data': value}) + '\n'
+                               for timestamp, value in zip(timestamps, values))
+
+    def close(self):
+        self.handle.close()
+
+
+class ParquetPartitionWriter:
+    """Write readings as Parquet row groups (sensor_id, timestamp, value float32)."""
+
+    extension = '.parquet'
+
+    def __init__(self, path, sensor_id, compression='zstd'):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.pa = pa
+        self.sensor_id = sensor_id
+        self.schema = pa.schema([('sensor_id', pa.string()), ('timestamp', pa.timestamp('s')),
+                                 ('value', pa.float32())])
+        self.writer = pq.ParquetWriter(path, self.schema, compression=None if compression == 'none' else compression)
+
+    def write(self, timestamps, values):
+        pa = self.pa
+        table = pa.table({
+            'sensor_id': pa.array([self.sensor_id] * len(timestamps), pa.string()),
+            'timestamp': pa.array(np.array(timestamps, dtype='datetime64[s]'), pa.timestamp('s')),
+            'value': pa.array(np.array(values, dtype=np.float32)),
+        }, schema=self.schema)
+        self.writer.write_table(table)
+
+    def close(self):
+        self.writer.close()
+
+
+WRITERS = {'parquet': ParquetPartitionWriter, 'csv': CsvPartitionWriter, 'ndjson': NdjsonPartitionWriter}
+
+
+def partition_path(output_dir, sensor_id, day, fmt, compression):
+    """Final path of the (sensor, day) partition."""
+    extension = WRITERS[fmt].extension
+    if fmt != 'parquet' and compression in _TEXT_OPENERS:
+        extension += _TEXT_OPENERS[compression][1]
+    return os.path.join(output_dir, f'sensor_id={sensor_id}', f'{day:%Y-%m-%d}{extension}')
+
+
+def day_windows(start_time, end_time):
+    """
+    Split [start_time, end_time] into per-day windows.
+
+    Returns:
+        list: (day, window_start, window_end) tuples, day being the midnight the window belongs to.
+    """
+    windows = []
+    day = start_time.replace(hour=0, minute=0, second=0, microsecond=0)
+    while day < end_time:
+        windows.append((day, max(day, start_time), min(day + timedelta(days=1), end_time)))
+        day += timedelta(days=1)
+    return windows
+
+
+def export_partition(client, sensor_id, token, day, start_time, end_time, path, fmt='parquet', compression=None,
+                     batch_rows=BATCH_ROWS):
+    """
+    Stream one sensor-day into `path`.
+
+    The file is written under a temporary name and renamed once complete, so a
+    partition on disk is always whole. Days without readings produce an empty
+    partition, so a resumed export does not fetch them again.
+
+    Returns:
+        int: Number of rows written.
+    """
+    compression = compression or COMPRESSIONS[fmt][0]
+    # GetData windows are inclusive; the next midnight belongs to the next partition
+    prefix = f'{day:%Y-%m-%d}'
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary = path + '.part'
+
+    writer = WRITERS[fmt](temporary, str(sensor_id), compression)
+    rows = 0
+    timestamps, values = [], []
+    try:
+        for entry in client.iter_data(sensor_id, start_time, end_time, token):
+            timestamp = entry.get('TimeStamp')
+            value = entry.get('Data')
+            if not isinstance(timestamp, str) or not timestamp.startswith(prefix) or value is None:
+                continue
+            timestamps.append(timestamp)
+            values.append(value)
+            if len(timestamps) >= batch_rows:
+                writer.write(timestamps, values)
+                rows += len(timestamps)
+                timestamps, values = [], []
+        if timestamps:
+            writer.write(timestamps, values)
+            rows += len(timestamps)
+    except BaseException:
+        writer.close()
+        os.remove(temporary)
+        raise
+
+    writer.close()
+    os.replace(temporary, path)
+    return rows
+
+
+def export_readings(sensor_ids, token, start_time, end_time, output_dir, fmt='parquet', compression=None,
+                    max_workers=16, client=None, overwrite=False, progress=None, settle_minutes=15,
+                    timezone_offset_hours=-6):
+    """
+    Export readings of many sensors over [start_time, end_time] into day partitions.
+
+    At most `max_workers` partitions are in flight at any time; tasks are
+    submitted as earlier ones finish, so a year of data for hundreds of sensors
+    never queues tens of thousands of futures at once.
+
+    Only whole days that ended `settle_minutes` ago become final partitions.
+    Other days (today, a future --end, a day cut by start_time or end_time) are
+    written to `<partition>.partial` and exported again on every run, since
+    final partitions are never re-fetched.
+
+    Parameters:
+        sensor_ids (list): IDs of the sensors to export.
+        token (str): API token for authentication.
+        start_time (datetime): Export start (local time).
+        end_time (datetime): Export end (local time).
+        output_dir (str): Root directory of the partitioned export.
+        fmt (str): 'parquet', 'csv' or 'ndjson'.
+        compression (str): Codec from COMPRESSIONS[fmt] (default: the first one).
+        max_workers (int): Maximum number of partitions fetched at once.
+        client (SmabilityClient): Client to fetch through (default: shared client).
+        overwrite (bool): Re-export partitions that already exist.
+        progress (callable): Called as progress(sensor_id, day, rows, error) after each partition.
+        settle_minutes (int): Age after which readings are considered final.
+        timezone_offset_hours (int): Offset of the API's local time from UTC.
+
+    Returns:
+        dict: 'partitions' (final ones written), 'partial', 'skipped', 'rows' and 'errors'
+            ({'<sensor_id>/<day>': message}).
+    """
+    if fmt not in WRITERS:
+        raise ValueError(f"Unsupported format '{fmt}', expected one of {', '.join(FORMATS)}")
+    compression = compression or COMPRESSIONS[fmt][0]
+    if compression not in COMPRESSIONS[fmt]:
+        raise ValueError(f"Unsupported compression '{compression}' for {fmt}")
+    client = client or aqm.get_default_client()
+    settled_until = aqm.local_now(timezone_offset_hours) - timedelta(minutes=settle_minutes)
+
+    def tasks():
+        for sensor_id in sensor_ids:
+            for day, window_start, window_end in day_windows(start_time, end_time):
+                path = partition_path(output_dir, sensor_id, day, fmt, compression)
+                final = window_start == day and window_end == day + timedelta(days=1) and window_end < settled_until
+                yield sensor_id, day, window_start, window_end, path, final
+
+    summary = {'partitions': 0, 'partial': 0, 'skipped': 0, 'rows': 0, 'errors': {}}
+    pending = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for sensor_id, day, window_start, window_end, path, final in tasks():
+            if not overwrite and os.path.exists(path):
+                summary['skipped'] += 1
+                continue
+            if not final:
+                path += PARTIAL_SUFFIX
+            elif os.path.exists(path + PARTIAL_SUFFIX):
+                os.remove(path + PARTIAL_SUFFIX)  # Superseded by the final partition
+            if len(pending) >= max_workers:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    _collect(future, pending.pop(future), summary, progress)
+            future = executor.submit(export_partition, client, sensor_id, token, day, window_start, window_end,
+                                     path, fmt, compression)
+            pending[future] = (sensor_id, day, final)
+        for future in list(pending):
+            _collect(future, pending.pop(future), summary, progress)
+    return summary
+
+
+def _collect(future, key, summary, progress):
+    # Fold one finished partition into the summary
+    sensor_id, day, final = key
+    try:
+        rows = future.result()
+        error = None
+        summary['partitions' if final else 'partial'] += 1
+        summary['rows'] += rows
+    except Exception as e:
+        rows = 0
+        error = aqm.fetch_error(e)['error']
+        summary['errors'][f'{sensor_id}/{day:%Y-%m-%d}'] = error
+    if progress is not None:
+        progress(sensor_id, day, rows, error)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export Smability readings into sensor/day partitioned files.')
+    parser.add_argument('--sensors', nargs='+', required=True, help='Sensor IDs, comma separated or @file')
+    parser.add_argument('--start', type=aqm.parse_time_argument, required=True, help='Start, YYYY-MM-DD[ HH:MM:SS]')
+    parser.add_argument('--end', type=aqm.parse_time_argument, required=True, help='End (exclusive for whole days)')
+    parser.add_argument('--format', choices=FORMATS, default='parquet')
+    parser.add_argument('--compression', help='Codec (parquet: zstd/snappy/gzip/none, text: gzip/bz2/xz/none)')
+    parser.add_argument('--output', default='export', help='Output directory (default %(default)s)')
+    parser.add_argument('--token', default=os.environ.get('SMABILITY_TOKEN', ''),
+                        help='API token (default: $SMABILITY_TOKEN)')
+    parser.add_argument('--base-url', default=aqm.API_BASE_URL)
+    parser.add_argument('--workers', type=int, default=16, help='Partitions fetched at once (default %(default)s)')
+    parser.add_argument('--rate', type=float, default=20.0, help='Maximum requests per second (default %(default)s)')
+    parser.add_argument('--overwrite', action='store_true', help='Re-export partitions that already exist')
+    parser.add_argument('--quiet', action='store_true')
+    args = parser.parse_args()
+
+    if args.compression and args.compression not in COMPRESSIONS[args.format]:
+        parser.error(f"--compression for {args.format} must be one of {', '.join(COMPRESSIONS[args.format])}")
+    sensor_ids = aqm.read_sensor_ids(args.sensors)
+    total = len(sensor_ids) * len(day_windows(args.start, args.end))
+    started = time.monotonic()
+    done = [0]
+
+    def progress(sensor_id, day, rows, error):
+        done[0] += 1
+        if not args.quiet:
+            status = f"error: {error}" if error else f"{rows} rows"
+            print(f"[{done[0]}/{total}] sensor {sensor_id} {day:%Y-%m-%d}: {status}", file=sys.stderr)
+
+    scheduler = aqm.RequestScheduler(rate=args.rate, max_concurrency=args.workers)
+    with aqm.SmabilityClient(args.token, args.base_url, pool_maxsize=args.workers, scheduler=scheduler) as client:
+        summary = export_readings(sensor_ids, args.token, args.start, args.end, args.output, args.format,
+                                  args.compression, args.workers, client, args.overwrite, progress)
+
+    print(f"Exported {summary['rows']} rows into {summary['partitions']} partitions "
+          f"({summary['partial']} partial, {summary['skipped']} already present, {len(summary['errors'])} failed) "
+          f"in {time.monotonic() - started:.1f} s")
+    for key, error in sorted(summary['errors'].items()):
+        print(f"  {key}: {error}", file=sys.stderr)
+    return 1 if summary['errors'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,375 @@
+"""
+Local caching proxy in front of the Smability GetData API for dashboards.
+
+Dashboards talk to this service instead of the upstream API. Readings are kept
+in a shared in-memory cache of fetched segments with TTL-based eviction;
+concurrent identical upstream fetches are coalesced into one call
+(singleflight), and a window overlapping cached segments only fetches the
+parts that are missing.
+
+Endpoints:
+    GET /SmabilityAPI/GetData?idSensor=7&dtStart=...&dtEnd=...
+        Same contract as the upstream API, so SmabilityClient(base_url='http://host:port/SmabilityAPI')
+        works unchanged.
+    GET /aggregate?sensor=7&start=...&end=...&bucket=1h&stats=mean,max
+        Bucketed statistics from aggregate_readings, as {'time': [...], '<stat>': [...]}.
+    GET /stats
+        Cache and upstream counters.
+
+Usage:
+    python smability_proxy.py [--port 8081] [--token TOKEN] [--ttl 60] [--historical-ttl 3600]
+"""
+import argparse
+import bisect
+import json
+import os
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+import air_quality_monitoring_v2 as aqm
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls with the same key into one execution.
+
+    The first caller runs the function; callers arriving while it runs wait
+    for it and get the same result (or the same exception).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.coalesced = 0
+
+    def do(self, key, function, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = {'event': threading.Event(), 'result': None, 'error': None}
+                leader = True
+            else:
+                self.coalesced += 1
+                leader = False
+
+        if not leader:
+            call['event'].wait()
+            if call['error'] is not None:
+                raise call['error']
+            return call['result']
+
+        try:
+            call['result'] = function(*args, **kwargs)
+            return call['result']
+        except Exception as e:
+            call['error'] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call['event'].set()
+
+
+class SegmentCache:
+    """
+    Per-sensor cache of fetched [start, end] segments with TTL eviction.
+
+    Segments whose end is still within `settle_minutes` of the API's current
+    time can receive late readings, so they expire after `ttl` seconds;
+    settled historical segments live for `historical_ttl` seconds.
+
+    Parameters:
+        token (str): Upstream API token.
+        client (SmabilityClient): Client for upstream fetches (default: shared client).
+        ttl (float): Lifetime in seconds of segments touching recent data.
+        historical_ttl (float): Lifetime in seconds of settled segments.
+        settle_minutes (int): Age after which readings are considered final.
+        timezone_offset_hours (int): Offset of the API's local time from UTC.
+    """
+
+    def __init__(self, token, client=None, ttl=60.0, historical_ttl=3600.0, settle_minutes=15,
+                 timezone_offset_hours=-6):
+        self.token = token
+        self.client = client or aqm.get_default_client()
+        self.ttl = ttl
+        self.historical_ttl = historical_ttl
+        self.settle = timedelta(minutes=settle_minutes)
+        self.timezone_offset_hours = timezone_offset_hours
+        self.flights = SingleFlight()
+        self._lock = threading.Lock()
+        self._segments = {}  # sensor_id -> sorted list of (start, end, expires_at, ReadingSeries)
+        self.hits = 0
+        self.partial_hits = 0
+        self.misses = 0
+        self.upstream_calls = 0
+
+    def _fresh_segments(self, sensor_id, now):
+        # Drop expired segments of a sensor and return the remaining ones
+        segments = [segment for segment in self._segments.get(sensor_id, ()) if segment[2] > now]
+        if segments:
+            self._segments[sensor_id] = segments
+        else:
+            self._segments.pop(sensor_id, None)
+        return segments
+
+    def evict_expired(self):
+        """Drop every expired segment; returns the number of segments removed."""
+        now = time.monotonic()
+        with self._lock:
+            before = sum(len(segments) for segments in self._segments.values())
+            for sensor_id in list(self._segments):
+                self._fresh_segments(sensor_id, now)
+            return before - sum(len(segments) for segments in self._segments.values())
+
+    def _missing(self, segments, start_time, end_time):
+        # Sub-ranges of [start_time, end_time] not covered by any segment
+        gaps = []
+        cursor = start_time
+        for start, end, _, _ in segments:
+            if end < cursor:
+                continue
+            if start > end_time:
+                break
+            if start > cursor:
+                gaps.append((cursor, start))
+            cursor = max(cursor, end)
+        if cursor < end_time:
+            gaps.append((cursor, end_time))
+        return gaps
+
+    def _fetch(self, sensor_id, start_time, end_time):
+        # One upstream fetch, stored as a new segment
+        with self._lock:
+            self.upstream_calls += 1
+        series = aqm.get_air_quality_series(sensor_id, self.token, start_time, end_time, client=self.client)
+        settled = end_time < aqm.local_now(self.timezone_offset_hours) - self.settle
+        expires_at = time.monotonic() + (self.historical_ttl if settled else self.ttl)
+        with self._lock:
+            segments = self._segments.setdefault(sensor_id, [])
+            bisect.insort(segments, (start_time, end_time, expires_at, series), key=lambda segment: segment[0])
+        return series
+
+    def series(self, sensor_id, start_time, end_time):
+        """
+        Readings of [start_time, end_time] from cache, fetching only uncovered parts upstream.
+
+        Returns:
+            ReadingSeries: Ordered, de-duplicated readings of the window.
+
+        Raises:
+            requests.exceptions.RequestException, ValueError: If an upstream fetch fails.
+        """
+        sensor_id = str(sensor_id)
+        with self._lock:
+            gaps = self._missing(self._fresh_segments(sensor_id, time.monotonic()), start_time, end_time)
+            if not gaps:
+                self.hits += 1
+            elif len(gaps) == 1 and gaps[0] == (start_time, end_time):
+                self.misses += 1
+            else:
+                self.partial_hits += 1
+
+        for gap_start, gap_end in gaps:
+            self.flights.do((sensor_id, gap_start, gap_end), self._fetch, sensor_id, gap_start, gap_end)
+
+        with self._lock:
+            parts = [segment[3].slice(start_time, end_time + timedelta(seconds=1))
+                     for segment in self._segments.get(sensor_id, ())
+                     if segment[0] <= end_time and segment[1] >= start_time]
+
+        timestamps = np.concatenate([part.timestamps for part in parts]) if parts else np.array([], 'datetime64[s]')
+        values = np.concatenate([part.values for part in parts]) if parts else np.array([], np.float32)
+        # Segments share boundary instants and may overlap after re-fetches: keep one reading per timestamp
+        order = np.argsort(timestamps, kind='stable')
+        timestamps, first = np.unique(timestamps[order], return_index=True)
+        return aqm.ReadingSeries(timestamps, values[order][first], sensor_id)
+
+    def stats(self):
+        with self._lock:
+            return {'sensors': len(self._segments),
+                    'segments': sum(len(segments) for segments in self._segments.values()),
+                    'bytes': sum(segment[3].nbytes for segments in self._segments.values() for segment in segments),
+                    'hits': self.hits, 'partial_hits': self.partial_hits, 'misses': self.misses,
+                    'upstream_calls': self.upstream_calls, 'coalesced': self.flights.coalesced}
+
+
+class ResponseCache:
+    """Serialized response bodies keyed by request, evicted after `ttl` seconds."""
+
+    def __init__(self, ttl=5.0, max_entries=10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._bodies = {}
+
+    def get(self, key):
+        with self._lock:
+            entry = self._bodies.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                self._bodies.pop(key, None)
+                return None
+            return entry[1]
+
+    def put(self, key, body):
+        now = time.monotonic()
+        with self._lock:
+            if len(self._bodies) >= self.max_entries:
+                self._bodies = {k: v for k, v in self._bodies.items() if v[0] > now}
+                if len(self._bodies) >= self.max_entries:
+                    self._bodies.clear()
+            self._bodies[key] = (now + self.ttl, body)
+
+
+def _jsonable(array):
+    # Aggregate arrays to JSON lists: times as strings, NaN as null
+    if np.issubdtype(array.dtype, np.datetime64):
+        return np.datetime_as_string(array, unit='s').tolist()
+    return [None if value != value else value for value in array.tolist()]
+
+
+class ProxyHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        path = url.path.rstrip('/')
+        if path == '/stats':
+            return self._send(200, json.dumps(self.server.cache.stats()).encode())
+        # Parameters are checked before anything is fetched: only they can make a request bad
+        try:
+            if path.endswith('/GetData'):
+                params = self._get_data_params(query)
+                build = lambda: self._get_data(*params)
+            elif path == '/aggregate':
+                params = self._aggregate_params(query)
+                build = lambda: self._aggregate(*params)
+            else:
+                return self._send(404, json.dumps({'error': 'Not found'}).encode())
+        except (KeyError, ValueError) as e:
+            return self._send(400, json.dumps({'error': 'Bad request', 'details': str(e)}).encode())
+        # Anything failing from here on is an upstream or decoding fault
+        try:
+            return self._cached(path, query, build)
+        except Exception as e:
+            return self._send(502, json.dumps(aqm.fetch_error(e)).encode())
+
+    def _cached(self, path, query, build):
+        # Upstream is always called with the proxy's token, so clients' tokens are not part of the key
+        key = (path, tuple(sorted((k, v) for k, v in query.items() if k != 'token')))
+        body = self.server.responses.get(key)
+        if body is None:
+            body = build()
+            self.server.responses.put(key, body)
+        self._send(200, body)
+
+    @staticmethod
+    def _get_data_params(query):
+        return query['idSensor'], aqm.parse_time(query['dtStart']), aqm.parse_time(query['dtEnd'])
+
+    @staticmethod
+    def _aggregate_params(query):
+        bucket = query.get('bucket', '1h')
+        stats = tuple(query.get('stats', 'mean').split(','))
+        aqm.aggregate_readings(aqm.ReadingSeries([], []), bucket, stats)  # Rejects unknown buckets and stats
+        return query['sensor'], aqm.parse_time(query['start']), aqm.parse_time(query['end']), bucket, stats
+
+    def _get_data(self, sensor_id, start_time, end_time):
+        series = self.server.cache.series(sensor_id, start_time, end_time)
+        return json.dumps(series.to_records()).encode()
+
+    def _aggregate(self, sensor_id, start_time, end_time, bucket, stats):
+        series = self.server.cache.series(sensor_id, start_time, end_time)
+        result = aqm.aggregate_readings(series, bucket, stats, start_time, end_time)
+        return json.dumps({key: _jsonable(value) for key, value in result.items()}).encode()
+
+    def _send(self, status, body):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def start_proxy(token, host='127.0.0.1', port=0, client=None, ttl=60.0, historical_ttl=3600.0, response_ttl=5.0,
+                settle_minutes=15, timezone_offset_hours=-6, sweep_interval=30.0, verbose=False):
+    """
+    Start the proxy on a background thread.
+
+    Parameters:
+        token (str): Upstream API token.
+        host (str): Interface to bind.
+        port (int): Port to bind (0 picks a free one).
+        client (SmabilityClient): Client for upstream fetches (default: shared client).
+        ttl (float): Lifetime in seconds of cached segments touching recent data.
+        historical_ttl (float): Lifetime in seconds of settled cached segments.
+        response_ttl (float): Lifetime in seconds of serialized responses.
+        settle_minutes (int): Age after which readings are considered final.
+        timezone_offset_hours (int): Offset of the API's local time from UTC.
+        sweep_interval (float): Seconds between background sweeps of expired segments.
+        verbose (bool): Log every request to stderr.
+
+    Returns:
+        tuple: (server, base_url); server.cache is the SegmentCache, call server.shutdown() to stop.
+    """
+    server = ThreadingHTTPServer((host, port), ProxyHandler)
+    server.daemon_threads = True
+    server.cache = SegmentCache(token, client, ttl, historical_ttl, settle_minutes, timezone_offset_hours)
+    server.responses = ResponseCache(min(response_ttl, ttl))
+    server.verbose = verbose
+    stopped = threading.Event()
+
+    def sweep():
+        while not stopped.wait(sweep_interval):
+            server.cache.evict_expired()
+
+    serve_shutdown = server.shutdown
+
+    def shutdown():
+        stopped.set()
+        serve_shutdown()
+
+    server.shutdown = shutdown
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    threading.Thread(target=sweep, daemon=True).start()
+    return server, f'http://{host}:{server.server_address[1]}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Caching, request-coalescing proxy for Smability GetData.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--token', default=os.environ.get('SMABILITY_TOKEN', ''),
+                        help='Upstream API token (default: $SMABILITY_TOKEN)')
+    parser.add_argument('--base-url', default=aqm.API_BASE_URL, help='Upstream API base URL')
+    parser.add_argument('--ttl', type=float, default=60.0, help='Seconds recent segments stay cached')
+    parser.add_argument('--historical-ttl', type=float, default=3600.0, help='Seconds settled segments stay cached')
+    parser.add_argument('--response-ttl', type=float, default=5.0, help='Seconds serialized responses are reused')
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    client = aqm.SmabilityClient(args.token, args.base_url)
+    server, base_url = start_proxy(args.token, args.host, args.port, client, args.ttl, args.historical_ttl,
+                                   args.response_ttl, verbose=args.verbose)
+    print(f"Proxy serving at {base_url} (GetData at {base_url}/SmabilityAPI/GetData, Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+    finally:
+        client.close()
+
+
+if __name__ == '__main__':
+    main()
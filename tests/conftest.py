@@ -0,0 +1,24 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import air_quality_monitoring_v2 as aqm  # noqa: E402
+from mock_smability_server import start_mock_server  # noqa: E402
+
+
+@pytest.fixture
+def mock_server():
+    server, base_url = start_mock_server()
+    yield server, base_url
+    server.shutdown()
+
+
+@pytest.fixture
+def client(mock_server):
+    # No rate limit and short backoff, so failure paths stay fast
+    scheduler = aqm.RequestScheduler(rate=None, base_delay=0.001)
+    with aqm.SmabilityClient(base_url=mock_server[1], scheduler=scheduler) as client:
+        yield client
@@ -0,0 +1,43 @@
+from datetime import datetime
+
+import numpy as np
+
+import air_quality_monitoring_v2 as aqm
+from mock_smability_server import generate_readings
+
+
+def test_hourly_mean_matches_numpy():
+    readings = generate_readings('7', datetime(2024, 1, 1), datetime(2024, 1, 2))
+    result = aqm.aggregate_readings(readings, '1h', ('mean', 'count', 'min', 'max', 'p50'))
+    assert len(result['time']) == 25 and result['time'][0] == np.datetime64('2024-01-01T00:00:00')
+
+    values = np.array([float(entry['Data']) for entry in readings[:12]])
+    assert result['count'][0] == 12
+    assert np.isclose(result['mean'][0], values.mean())
+    assert result['min'][0] == values.min() and result['max'][0] == values.max()
+    assert np.isclose(result['p50'][0], np.median(values))
+
+
+def test_window_fills_empty_buckets():
+    readings = generate_readings('7', datetime(2024, 1, 1, 2), datetime(2024, 1, 1, 3))
+    result = aqm.aggregate_readings(readings, '1h', ('mean', 'count'), datetime(2024, 1, 1), datetime(2024, 1, 1, 6))
+    assert list(result['count']) == [0, 0, 12, 1, 0, 0]
+    assert np.isnan(result['mean'][0]) and not np.isnan(result['mean'][2])
+
+
+def test_window_end_is_exclusive_inside_the_last_bucket():
+    readings = generate_readings('7', datetime(2024, 1, 1), datetime(2024, 1, 2))
+    result = aqm.aggregate_readings(readings, '1d', ('count',), datetime(2024, 1, 1), datetime(2024, 1, 1, 12, 30))
+    assert list(result['count']) == [150]
+
+
+def test_start_after_every_reading_is_empty():
+    readings = generate_readings('7', datetime(2024, 1, 1), datetime(2024, 1, 2))
+    result = aqm.aggregate_readings(readings, '1h', ('mean', 'count', 'p95'), start_time=datetime(2024, 2, 1))
+    assert len(result['time']) == 0
+    assert len(result['mean']) == 0 and len(result['count']) == 0 and len(result['p95']) == 0
+
+
+def test_no_readings():
+    result = aqm.aggregate_readings([], '15min', ('mean',))
+    assert len(result['time']) == 0 and len(result['mean']) == 0
@@ -0,0 +1,51 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+import air_quality_monitoring_v2 as aqm
+
+
+@pytest.mark.parametrize('name', sorted(aqm.AQI_TABLES))
+def test_breakpoints_map_to_their_index_bounds(name):
+    _, _, decimals, breakpoints = aqm.AQI_TABLES[name]
+    c_lo, c_hi, i_lo, i_hi = np.array(breakpoints, dtype=np.float64).T
+    assert np.array_equal(aqm.aqi_subindex(c_lo, breakpoints, decimals), i_lo)
+    assert np.array_equal(aqm.aqi_subindex(c_hi, breakpoints, decimals), i_hi)
+    # float32 storage of the same concentrations must not move them across a band edge
+    assert np.array_equal(aqm.aqi_subindex(c_hi.astype(np.float32), breakpoints, decimals), i_hi)
+
+
+def test_concentrations_are_truncated_before_the_lookup():
+    _, _, decimals, breakpoints = aqm.AQI_TABLES['pm25_24h']
+    index = aqm.aqi_subindex([9.09, 9.1, 35.49, 35.5, 8.4], breakpoints, decimals)
+    assert index.tolist() == [50, 51, 100, 101, 47]
+
+    _, _, decimals, breakpoints = aqm.AQI_TABLES['o3_8h']
+    assert aqm.aqi_subindex([54.9, 55.0, 70.99, 71.0], breakpoints, decimals).tolist() == [50, 51, 100, 101]
+
+
+def test_out_of_table_values():
+    _, _, decimals, breakpoints = aqm.AQI_TABLES['o3_1h']
+    index = aqm.aqi_subindex([np.nan, 124.9, 125, 604, 900], breakpoints, decimals)
+    assert np.isnan(index[:2]).all()
+    assert index[2:].tolist() == [101, 500, 500]
+
+
+def test_category_boundaries():
+    categories = aqm.aqi_category([0, 50, 51, 100, 101, 150, 151, 200, 201, 300, 301, 500, 600, np.nan])
+    assert categories.tolist() == ['Good', 'Good', 'Moderate', 'Moderate', 'Unhealthy for Sensitive Groups',
+                                   'Unhealthy for Sensitive Groups', 'Unhealthy', 'Unhealthy', 'Very Unhealthy',
+                                   'Very Unhealthy', 'Hazardous', 'Hazardous', 'Hazardous', None]
+
+
+def test_station_index_takes_the_worst_pollutant():
+    start = datetime(2024, 1, 1, 8)
+    hours = np.datetime64('2024-01-01T00:00') + np.arange(10) * np.timedelta64(1, 'h')
+    o3 = aqm.ReadingSeries(hours, np.full(10, 40.0), '7', {'station': 'A', 'pollutant': 'o3'})
+    pm25 = aqm.ReadingSeries(hours, np.full(10, 35.4), '8', {'station': 'A', 'pollutant': 'pm25'})
+    result = aqm.AQIEngine().compute({'7': o3, '8': pm25}, start, start + timedelta(hours=2))
+    assert result['stations'] == ['A']
+    # 24 h PM2.5 needs 18 hours of data, so only ozone (8 h, 6 hours needed) has an index
+    assert result['aqi'].tolist() == [[37, 37]]
+    assert result['dominant'].tolist() == [['o3', 'o3']]
@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+import air_quality_monitoring_v2 as aqm
+from mock_smability_server import generate_readings
+
+DAY = datetime(2024, 1, 1)
+
+
+def readings(start_hour, end_hour):
+    return generate_readings('7', DAY + timedelta(hours=start_hour), DAY + timedelta(hours=end_hour))
+
+
+@pytest.fixture
+def archive(tmp_path, monkeypatch):
+    # A small stride, so reads cross several index blocks
+    monkeypatch.setattr(aqm, 'ARCHIVE_INDEX_STRIDE', 8)
+    return aqm.ReadingArchive(str(tmp_path / 'archive'))
+
+
+def test_appends_stay_sorted_and_unique(archive):
+    assert archive.append('7', readings(0, 2)) == 25
+    # Overlapping and older readings are skipped, only the newer tail is written
+    assert archive.append('7', readings(1, 3)) == 12
+    assert archive.append('7', readings(0, 1)) == 0
+    assert archive.count('7') == 37
+    assert archive.last_timestamp('7') == np.datetime64('2024-01-01T03:00:00')
+
+    timestamps = archive.read('7').timestamps
+    assert np.all(timestamps[1:] > timestamps[:-1])
+
+
+def test_unsorted_input_with_duplicates(archive):
+    batch = readings(0, 1)
+    assert archive.append('7', batch[::-1] + batch[:3]) == 13
+    series = archive.read('7')
+    assert series.timestamps.tolist() == sorted(set(series.timestamps.tolist()))
+    assert np.allclose(series.values, [float(entry['Data']) for entry in batch])
+
+
+def test_range_reads_match_a_linear_scan(archive, tmp_path):
+    for hour in range(0, 24, 3):
+        archive.append('7', readings(hour, hour + 3))
+    everything = archive.read('7')
+    assert archive.count('7') == 24 * 12 + 1
+
+    for start, end in [(DAY, DAY + timedelta(hours=1)), (DAY + timedelta(minutes=7), DAY + timedelta(hours=13)),
+                       (DAY - timedelta(days=1), DAY), (DAY + timedelta(hours=23, minutes=58), None)]:
+        window = archive.read('7', start, end)
+        keep = everything.timestamps >= np.datetime64(start, 's')
+        if end is not None:
+            keep &= everything.timestamps < np.datetime64(end, 's')
+        assert np.array_equal(window.timestamps, everything.timestamps[keep])
+
+    # A fresh instance reads the same files
+    reopened = aqm.ReadingArchive(str(tmp_path / 'archive'))
+    assert np.array_equal(reopened.read('7', DAY, DAY + timedelta(hours=6)).values,
+                          archive.read('7', DAY, DAY + timedelta(hours=6)).values)
+
+
+def test_torn_record_is_dropped_on_the_next_append(archive):
+    archive.append('7', readings(0, 1))
+    with open(archive._path('7', '.rec'), 'ab') as handle:
+        handle.write(b'\x01\x02\x03')
+    assert archive.append('7', readings(1, 2)) == 12
+    assert archive.count('7') == 25
+    assert np.all(np.diff(archive.read('7').timestamps.astype(np.int64)) == 300)
@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta
+
+import air_quality_monitoring_v2 as aqm
+import smability_backfill as backfill
+
+
+def run_job(tmp_path, client, store, start, end, name='checkpoint.jsonl', **options):
+    checkpoint = backfill.Checkpoint(str(tmp_path / name))
+    try:
+        return backfill.BackfillJob(['7'], 'token', start, end, store, checkpoint, client=client, **options).run()
+    finally:
+        checkpoint.close()
+
+
+def test_resume_after_budget_runs_out(tmp_path, mock_server):
+    cache = aqm.ReadingCache(str(tmp_path / 'cache.sqlite3'))
+    start, end = datetime(2024, 1, 1), datetime(2024, 1, 11)
+
+    budgeted = aqm.RequestScheduler(rate=None, budget=aqm.RequestBudget(4))
+    with aqm.SmabilityClient(base_url=mock_server[1], scheduler=budgeted) as client:
+        first = run_job(tmp_path, client, backfill.cache_store(cache), start, end)
+    assert first['budget_exhausted']
+    assert first['requests'] == 4 and first['done'] == 4 and not first['failed']
+
+    with aqm.SmabilityClient(base_url=mock_server[1], scheduler=aqm.RequestScheduler(rate=None)) as client:
+        second = run_job(tmp_path, client, backfill.cache_store(cache), start, end)
+    assert second['skipped'] == 4 and second['done'] == 6 and second['requests'] == 6
+    assert cache.missing_ranges('7', start, end) == []
+
+
+def test_budget_counts_retries(tmp_path, mock_server):
+    server, base_url = mock_server
+    server.error_rate = 0.5
+    scheduler = aqm.RequestScheduler(rate=None, base_delay=0.001, budget=aqm.RequestBudget(10))
+    with aqm.SmabilityClient(base_url=base_url, scheduler=scheduler) as client:
+        summary = run_job(tmp_path, client, backfill.cache_store(aqm.ReadingCache(':memory:')),
+                          datetime(2024, 1, 1), datetime(2024, 2, 1))
+    assert summary['requests'] == server.request_count <= 10
+
+
+def test_unsettled_unit_is_not_checkpointed(tmp_path, client):
+    cache = aqm.ReadingCache(str(tmp_path / 'cache.sqlite3'))
+    today = aqm.local_now(-6).replace(hour=0, minute=0, second=0, microsecond=0)
+    tomorrow = today + timedelta(days=1)
+    summary = run_job(tmp_path, client, backfill.cache_store(cache), today - timedelta(days=1), tomorrow)
+    assert summary['done'] == 2 and summary['unsettled'] == 1
+    assert cache.missing_ranges('7', today, tomorrow)[-1][1] == tomorrow
+
+    checkpoint = backfill.Checkpoint(str(tmp_path / 'checkpoint.jsonl'))
+    assert len(checkpoint.done) == 1
+    checkpoint.close()
+
+
+def test_archive_refuses_units_older_than_its_tail(tmp_path, client):
+    archive = aqm.ReadingArchive(str(tmp_path / 'archive'))
+    store = backfill.archive_store(archive)
+    first = run_job(tmp_path, client, store, datetime(2024, 1, 10), datetime(2024, 1, 12), ordered=True)
+    assert first['done'] == 2
+    archived = archive.count('7')
+
+    # An earlier start cannot be appended: the unit fails, nothing is checkpointed for it
+    earlier = run_job(tmp_path, client, store, datetime(2024, 1, 1), datetime(2024, 1, 12), ordered=True)
+    assert list(earlier['failed']) == ['7/2024-01-01 00:00:00']
+    assert 'older than its last archived reading' in earlier['failed']['7/2024-01-01 00:00:00']
+    assert earlier['done'] == 0 and earlier['abandoned'] == 8
+    assert archive.count('7') == archived
+
+    rerun = run_job(tmp_path, client, store, datetime(2024, 1, 1), datetime(2024, 1, 12), ordered=True)
+    assert rerun['skipped'] == 2 and rerun['failed']
+
+
+def test_archive_accepts_a_unit_redone_after_a_crash(tmp_path, client):
+    archive = aqm.ReadingArchive(str(tmp_path / 'archive'))
+    store = backfill.archive_store(archive)
+    run_job(tmp_path, client, store, datetime(2024, 1, 1), datetime(2024, 1, 3), ordered=True)
+    archived = archive.count('7')
+
+    # Stored but not checkpointed (fresh checkpoint file): redoing it succeeds without duplicates
+    summary = run_job(tmp_path, client, store, datetime(2024, 1, 1), datetime(2024, 1, 3), name='other.jsonl',
+                      ordered=True)
+    assert summary['done'] == 2 and not summary['failed']
+    assert archive.count('7') == archived
@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta
+
+import air_quality_monitoring_v2 as aqm
+from mock_smability_server import generate_readings
+
+DAY = datetime(2024, 1, 1)
+
+
+def store(cache, start, end, complete=True):
+    cache.store('7', generate_readings('7', start, end), start, end, complete=complete)
+
+
+def test_missing_ranges_between_covered_windows():
+    cache = aqm.ReadingCache(':memory:')
+    assert cache.missing_ranges('7', DAY, DAY + timedelta(hours=6)) == [(DAY, DAY + timedelta(hours=6))]
+
+    store(cache, DAY + timedelta(hours=1), DAY + timedelta(hours=2))
+    store(cache, DAY + timedelta(hours=4), DAY + timedelta(hours=5))
+    assert cache.missing_ranges('7', DAY, DAY + timedelta(hours=6)) == [
+        (DAY, DAY + timedelta(hours=1)),
+        (DAY + timedelta(hours=2), DAY + timedelta(hours=4)),
+        (DAY + timedelta(hours=5), DAY + timedelta(hours=6)),
+    ]
+    assert cache.missing_ranges('8', DAY, DAY + timedelta(hours=1)) == [(DAY, DAY + timedelta(hours=1))]
+
+    # Filling the gap merges the three ranges into one
+    store(cache, DAY + timedelta(hours=2), DAY + timedelta(hours=4))
+    assert cache.missing_ranges('7', DAY + timedelta(hours=1), DAY + timedelta(hours=5)) == []
+
+
+def test_incomplete_range_keeps_its_settle_window_open():
+    cache = aqm.ReadingCache(':memory:', settle_minutes=15)
+    end = DAY + timedelta(hours=2)
+    cache.store('7', generate_readings('7', DAY, end - timedelta(minutes=30)), DAY, end)
+    assert cache.missing_ranges('7', DAY, end) == [(end - timedelta(minutes=15), end)]
+
+
+def test_cached_fetch_only_asks_for_gaps(monkeypatch, mock_server, client):
+    server = mock_server[0]
+    now = DAY + timedelta(hours=12)
+    monkeypatch.setattr(aqm, 'local_now', lambda timezone_offset_hours: now)
+    cache = aqm.ReadingCache(':memory:')
+    store(cache, now - timedelta(hours=4), now - timedelta(hours=2))
+
+    readings = aqm.get_cached_air_quality_data('7', 'token', 'hours', 6, cache=cache, client=client)
+    assert server.request_count == 2
+    assert readings == [{'TimeStamp': entry['TimeStamp'], 'Data': float(entry['Data'])}
+                        for entry in generate_readings('7', now - timedelta(hours=6), now)]
+
+    aqm.get_cached_air_quality_data('7', 'token', 'hours', 6, cache=cache, client=client)
+    assert server.request_count == 2
+
+
+def test_default_cache_is_shared(monkeypatch, tmp_path, client):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(aqm, '_default_cache', None)
+    aqm.get_cached_air_quality_data('7', 'token', 'hours', 1, client=client)
+    cache = aqm._default_cache
+    aqm.get_cached_air_quality_data('7', 'token', 'hours', 1, client=client)
+    assert aqm.get_default_cache() is cache
+    assert (tmp_path / 'smability_cache.sqlite3').exists()
+    cache.close()
@@ -0,0 +1,36 @@
+import struct
+from datetime import datetime
+
+import pytest
+
+import air_quality_monitoring_v2 as aqm
+from mock_smability_server import generate_readings
+
+pytest.importorskip('matplotlib')
+
+
+def png_size(path):
+    with open(path, 'rb') as handle:
+        return struct.unpack('>II', handle.read(24)[16:24])
+
+
+@pytest.fixture
+def readings():
+    return generate_readings('7', datetime(2024, 1, 1), datetime(2024, 1, 2))
+
+
+def test_in_process_render_follows_figsize_and_dpi(tmp_path, readings):
+    first = aqm.render_charts({'7': readings}, str(tmp_path / 'a'), processes=1, figsize=(4, 3), dpi=50)
+    assert png_size(first['7']) == (200, 150)
+    second = aqm.render_charts({'7': readings}, str(tmp_path / 'b'), processes=1, figsize=(6, 2), dpi=40)
+    assert png_size(second['7']) == (240, 80)
+
+
+def test_default_labels_follow_the_pollutant(tmp_path, readings):
+    aqm.render_charts({'7': readings}, str(tmp_path), processes=1, pollutant='pm25')
+    axes = aqm._chart_template.axes
+    assert axes.get_title() == 'PM2.5 Levels Over Time'
+    assert axes.get_ylabel() == 'PM2.5 Concentration (µg/m³)'
+
+    aqm.render_charts({'7': readings}, str(tmp_path), processes=1, title='Sensor {sensor_id}', ylabel='ppb')
+    assert axes.get_title() == 'Sensor 7' and axes.get_ylabel() == 'ppb'
@@ -0,0 +1,84 @@
+import csv
+import gzip
+import os
+from datetime import datetime, timedelta
+
+import air_quality_monitoring_v2 as aqm
+import smability_export as export
+
+
+class EmptyClient:
+    """Client whose sensors never report anything."""
+
+    def __init__(self):
+        self.requests = 0
+
+    def iter_data(self, sensor_id, start_time, end_time, token):
+        self.requests += 1
+        return iter(())
+
+
+def read_partition(path):
+    with gzip.open(path, 'rt', newline='') as handle:
+        return list(csv.reader(handle))
+
+
+def test_resume_skips_finished_partitions(tmp_path, mock_server, client):
+    server = mock_server[0]
+    start, end = datetime(2024, 1, 1), datetime(2024, 1, 4)
+    first = export.export_readings(['7', '8'], 'token', start, end, str(tmp_path), 'csv', client=client)
+    assert first['partitions'] == 6 and not first['partial'] and not first['errors']
+
+    path = export.partition_path(str(tmp_path), '7', datetime(2024, 1, 2), 'csv', 'gzip')
+    rows = read_partition(path)
+    assert rows[0] == ['sensor_id', 'TimeStamp', 'Data']
+    assert len(rows) - 1 == 288 and all(row[1].startswith('2024-01-02') for row in rows[1:])
+
+    os.remove(path)
+    requests = server.request_count
+    second = export.export_readings(['7', '8'], 'token', start, end, str(tmp_path), 'csv', client=client)
+    assert second['skipped'] == 5 and second['partitions'] == 1
+    assert server.request_count == requests + 1
+    assert len(read_partition(path)) - 1 == 288
+
+
+def test_unfinished_days_stay_partial(tmp_path, client):
+    today = aqm.local_now(-6).replace(hour=0, minute=0, second=0, microsecond=0)
+    yesterday = today - timedelta(days=1)
+    summary = export.export_readings(['7'], 'token', yesterday, today + timedelta(days=1), str(tmp_path), 'csv',
+                                     client=client, settle_minutes=0)
+    assert summary['partitions'] == 1 and summary['partial'] == 1
+
+    final = export.partition_path(str(tmp_path), '7', today, 'csv', 'gzip')
+    assert not os.path.exists(final) and os.path.exists(final + export.PARTIAL_SUFFIX)
+
+    # The partial day is exported again, the finished one is not
+    again = export.export_readings(['7'], 'token', yesterday, today + timedelta(days=1), str(tmp_path), 'csv',
+                                   client=client, settle_minutes=0)
+    assert again['skipped'] == 1 and again['partial'] == 1
+
+
+def test_day_cut_by_end_is_partial_until_exported_whole(tmp_path, client):
+    day = datetime(2024, 1, 1)
+    path = export.partition_path(str(tmp_path), '7', day, 'csv', 'gzip')
+    summary = export.export_readings(['7'], 'token', day, day + timedelta(hours=12), str(tmp_path), 'csv',
+                                     client=client)
+    assert summary['partial'] == 1 and not os.path.exists(path)
+
+    summary = export.export_readings(['7'], 'token', day, day + timedelta(days=1), str(tmp_path), 'csv',
+                                     client=client)
+    assert summary['partitions'] == 1
+    assert os.path.exists(path) and not os.path.exists(path + export.PARTIAL_SUFFIX)
+
+
+def test_empty_day_is_not_fetched_again(tmp_path):
+    client = EmptyClient()
+    start, end = datetime(2024, 1, 1), datetime(2024, 1, 3)
+    first = export.export_readings(['7'], 'token', start, end, str(tmp_path), 'csv', client=client)
+    assert first['partitions'] == 2 and first['rows'] == 0 and client.requests == 2
+
+    path = export.partition_path(str(tmp_path), '7', start, 'csv', 'gzip')
+    assert read_partition(path) == [['sensor_id', 'TimeStamp', 'Data']]
+
+    second = export.export_readings(['7'], 'token', start, end, str(tmp_path), 'csv', client=client)
+    assert second['skipped'] == 2 and client.requests == 2
@@ -0,0 +1,20 @@
+from datetime import datetime, timedelta
+
+import air_quality_monitoring_v2 as aqm
+
+
+def test_long_window_returns_the_raw_payload(monkeypatch, client):
+    now = datetime(2024, 1, 4, 10, 0, 0)
+    monkeypatch.setattr(aqm, 'local_now', lambda timezone_offset_hours: now)
+
+    chunked = aqm.get_air_quality_data('7', 'token', 'days', 3, client=client, chunk=timedelta(hours=7))
+    whole = aqm.get_air_quality_data('7', 'token', 'days', 3, client=client, chunk=None)
+    assert isinstance(chunked, list) and len(chunked) == 3 * 288 + 1
+    assert chunked == whole == client.get_data('7', now - timedelta(days=3), now, 'token')
+
+
+def test_merge_keeps_unparseable_records():
+    first = [{'TimeStamp': '2024-01-01T00:00:00', 'Data': 'n/a'}, {'TimeStamp': '2024-01-01T01:00:00', 'Data': '1'}]
+    second = [{'TimeStamp': '2024-01-01T01:00:00', 'Data': '1'}, {'TimeStamp': '2024-01-01T02:00:00', 'Data': '2',
+                                                                   'Extra': True}]
+    assert aqm._merge_payloads([first, [], second]) == first + second[1:]
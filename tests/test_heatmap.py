@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+import air_quality_monitoring_v2 as aqm
+
+pytest.importorskip('matplotlib')
+pytest.importorskip('scipy')
+
+STATIONS = {'7': (19.40, -99.20), '8': (19.45, -99.10), '9': (19.35, -99.05), '10': (19.50, -99.25)}
+
+
+@pytest.fixture
+def interpolator():
+    return aqm.SpatialInterpolator(STATIONS, resolution=(20, 20))
+
+
+def test_colorbar_label_follows_the_pollutant(interpolator):
+    renderer = aqm.HeatmapRenderer(interpolator, pollutant='pm10', figsize=(3, 3), dpi=40)
+    colorbar = renderer.figure.axes[-1]
+    assert colorbar.get_ylabel() == 'PM10 Concentration (µg/m³)'
+
+
+
+def test_frame_titles_follow_the_pollutant(tmp_path, interpolator, monkeypatch):
+    titles = []
+    render = aqm.HeatmapRenderer.render
+    monkeypatch.setattr(aqm.HeatmapRenderer, 'render',
+                        lambda self, grid, path, title='': titles.append(title) or render(self, grid, path, title))
+    aqm.render_heatmap_png(interpolator, [10, 20, 30, 40], str(tmp_path / 'one.png'), pollutant='co',
+                           figsize=(3, 3), dpi=40)
+    aqm.render_heatmap_frames(interpolator, np.array(['2024-01-01T00:00'], dtype='datetime64[s]'), [[1, 2, 3, 4]],
+                              str(tmp_path), pollutant='no2', figsize=(3, 3), dpi=40)
+    assert titles == ['CO Heatmap', 'NO2 2024-01-01 00:00:00']
+
+
+def test_folium_popups_use_the_pollutant_units(interpolator):
+    pytest.importorskip('folium')
+    html = aqm.heatmap_folium(interpolator, [10, np.nan, 30, 40], pollutant='pm25').get_root().render()
+    assert 'Sensor 7: 10.0 µg/m³' in html and 'Sensor 8: no data' in html and ' ppb' not in html
@@ -0,0 +1,33 @@
+import json
+
+import pytest
+
+import air_quality_monitoring_v2 as aqm
+
+
+def decode(document, size=3):
+    return list(aqm._iter_json_array(document[i:i + size] for i in range(0, len(document), size)))
+
+
+@pytest.mark.parametrize('size', [1, 2, 5, 1000])
+def test_matches_json_loads(size):
+    document = json.dumps([{'TimeStamp': '2024-01-01T00:00:00', 'Data': '12.50'}, 123, -4.5e3, 'a,]"b', None,
+                           True, [], {}, [1, [2]]], indent=1)
+    assert decode(document, size) == json.loads(document)
+
+
+@pytest.mark.parametrize('document', ['[]', ' [ ] ', '[]\n', '[\n1 ,\t2\n]\r\n'])
+def test_whitespace_and_empty(document):
+    assert decode(document, 1) == json.loads(document)
+
+
+@pytest.mark.parametrize('document', ['[1 2]', '[1,,2]', '[1,]', '[,1]', '[,]', '[1]x', '[1] [2]', '[1]]',
+                                      '{"a": 1}', '1', '[1', '[1,', '', '[tru]', '[1}'])
+@pytest.mark.parametrize('size', [1, 4, 1000])
+def test_rejects_malformed(document, size):
+    with pytest.raises(ValueError):
+        decode(document, size)
+
+
+def test_number_split_across_chunks():
+    assert list(aqm._iter_json_array(['[12', '34', '5,6', '7]'])) == [12345, 67]
@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+
+import air_quality_monitoring_v2 as aqm
+from mock_smability_server import generate_readings
+
+NOW = datetime(2024, 1, 2, 6, 30)
+
+
+class StaticClient:
+    """Client answering every GetData call with the same payload."""
+
+    def __init__(self, payload):
+        self.payload = payload
+
+    def build_url(self, sensor_id, start_time, end_time, token=None):
+        return 'static://GetData'
+
+    def get_data(self, sensor_id, start_time, end_time, token=None):
+        return self.payload
+
+
+def night_payload():
+    # Six hours of O3 clipped to 0 at night, then a real morning rise
+    readings = generate_readings('7', datetime(2024, 1, 1, 23), datetime(2024, 1, 2, 6, 29))
+    for entry in readings:
+        if entry['TimeStamp'] < '2024-01-02T05':
+            entry['Data'] = '0.00'
+    return readings
+
+
+def test_hourly_default_keeps_every_parseable_reading(monkeypatch):
+    monkeypatch.setattr(aqm, 'local_now', lambda timezone_offset_hours: NOW)
+    payload = night_payload()
+    payload[20]['Data'] = '-1.00'
+    payload.insert(5, {'TimeStamp': 'garbage', 'Data': '1'})
+
+    hourly = aqm.get_hourly_air_quality('7', 'token', 6, client=StaticClient(payload))
+    assert list(hourly) == [f'2024-01-02 0{hour}:00:00' for hour in range(5, -1, -1)]
+    assert hourly['2024-01-02 02:00:00'] == 0.0
+    expected = np.mean([float(entry['Data']) for entry in payload if entry['TimeStamp'].startswith('2024-01-02T05')])
+    assert hourly['2024-01-02 05:00:00'] == round(expected, 2)
+    assert hourly['2024-01-02 00:00:00'] == round(-1 / 12, 2)
+
+
+def test_hourly_clean_keeps_readings_at_the_floor(monkeypatch):
+    monkeypatch.setattr(aqm, 'local_now', lambda timezone_offset_hours: NOW)
+    hourly = aqm.get_hourly_air_quality('7', 'token', 6, client=StaticClient(night_payload()), clean=True)
+    assert all(hourly[f'2024-01-02 0{hour}:00:00'] == 0.0 for hour in range(5))
+
+
+def test_hourly_rejects_a_window_without_valid_rows(monkeypatch):
+    monkeypatch.setattr(aqm, 'local_now', lambda timezone_offset_hours: NOW)
+    hourly = aqm.get_hourly_air_quality('7', 'token', 6, client=StaticClient([{'TimeStamp': 'x', 'Data': 'y'}]))
+    assert hourly['error'] == 'Invalid data format'
+
+
+def test_stuck_run_is_flagged_above_the_floor():
+    timestamps = np.datetime64('2024-01-01T00:00') + np.arange(40) * np.timedelta64(5, 'm')
+    values = np.concatenate([np.zeros(15), np.full(15, 30.0), np.linspace(31, 40, 10)])
+    flags = aqm.quality_flags(timestamps, values, outlier_window=None)
+    assert not flags[:15].any()
+    assert (flags[15:30] == aqm.QUALITY_STUCK).all() and not flags[30:].any()
@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+import air_quality_monitoring_v2 as aqm
+from mock_smability_server import generate_readings
+
+START, MIDDLE, END = datetime(2024, 1, 1), datetime(2024, 1, 20, 13, 7), datetime(2024, 2, 10)
+
+
+@pytest.fixture(scope='module')
+def series():
+    values = aqm.ReadingSeries.from_records(generate_readings('7', START, END), '7')
+    # A hole of a few hours, so some buckets are empty
+    hole = ((values.timestamps >= np.datetime64('2024-01-05T02:00'))
+            & (values.timestamps < np.datetime64('2024-01-05T09:00')))
+    return aqm.ReadingSeries(values.timestamps[~hole], values.values[~hole], '7')
+
+
+@pytest.fixture
+def rollups(series):
+    store = aqm.RollupStore(':memory:')
+    # Two adjacent ingests, the second one overlapping the first
+    store.ingest('7', series, START, MIDDLE)
+    store.ingest('7', series, MIDDLE - timedelta(hours=5), END)
+    yield store
+    store.close()
+
+
+@pytest.mark.parametrize('bucket, start, end', [
+    ('1h', START, END),
+    ('3h', datetime(2024, 1, 4, 22, 30), datetime(2024, 1, 6)),
+    ('8h', START, END),
+    ('1d', datetime(2024, 1, 3, 12), datetime(2024, 1, 25)),
+    ('7d', START, END),
+])
+def test_rollup_query_matches_raw_aggregation(rollups, series, bucket, start, end):
+    merged = rollups.query('7', start, end, bucket=bucket)
+    raw = aqm.aggregate_readings(series, bucket, ('count', 'sum', 'mean', 'min', 'max'), start, end)
+    assert np.array_equal(merged['time'], raw['time'])
+    assert np.array_equal(merged['count'], raw['count'])
+    # Empty buckets are NaN in both, except the raw sum which is 0
+    filled = raw['count'] > 0
+    assert np.isnan(merged['sum'][~filled]).all()
+    for stat in ('sum', 'mean', 'min', 'max'):
+        assert np.allclose(merged[stat][filled], raw[stat][filled]), stat
+        assert np.isnan(merged[stat][~filled]).all()
+
+
+def test_monthly_rollup_matches_calendar_months(rollups, series):
+    monthly = rollups.query('7', START, END, bucket='1mo')
+    assert monthly['time'].tolist() == [datetime(2024, 1, 1), datetime(2024, 2, 1)]
+    months = series.timestamps.astype('datetime64[M]')
+    for index, month in enumerate(np.unique(months)):
+        values = series.values[months == month].astype(np.float64)
+        assert monthly['count'][index] == len(values)
+        assert np.isclose(monthly['mean'][index], values.mean())
+        assert np.isclose(monthly['std'][index], values.std())
+
+
+def test_tail_is_merged_without_being_stored(series):
+    store = aqm.RollupStore(':memory:')
+    store.ingest('7', series, START, MIDDLE)
+    tail = series.slice(MIDDLE + timedelta(seconds=1), None)
+    merged = store.query('7', START, END, bucket='1d', tail=tail)
+    raw = aqm.aggregate_readings(series, '1d', ('count', 'mean'), START, END)
+    assert np.array_equal(merged['count'], raw['count'])
+    assert np.allclose(merged['mean'], raw['mean'], equal_nan=True)
+    assert store.query('7', START, END, bucket='1d')['count'].sum() < raw['count'].sum()
+
+
+def test_ingest_refuses_a_gap(series):
+    store = aqm.RollupStore(':memory:')
+    store.ingest('7', series, START, datetime(2024, 1, 10))
+    with pytest.raises(ValueError):
+        store.ingest('7', series, datetime(2024, 1, 12), END)
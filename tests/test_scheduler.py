@@ -0,0 +1,93 @@
+from datetime import datetime
+
+import pytest
+import requests
+
+import air_quality_monitoring_v2 as aqm
+from mock_smability_server import generate_readings
+
+
+class Flaky:
+    """Generator factory yielding `items`, failing after `fail_after` items on the first `failures` calls."""
+
+    def __init__(self, items, fail_after, failures, error=requests.exceptions.ChunkedEncodingError):
+        self.items = items
+        self.fail_after = fail_after
+        self.failures = failures
+        self.error = error
+        self.calls = 0
+        self.closed = 0
+
+    def __call__(self):
+        self.calls += 1
+        failing = self.calls <= self.failures
+        try:
+            for index, item in enumerate(self.items):
+                if failing and index == self.fail_after:
+                    raise self.error('connection dropped mid-body')
+                yield item
+        finally:
+            self.closed += 1
+
+
+def scheduler(**options):
+    return aqm.RequestScheduler(rate=None, base_delay=0.001, **options)
+
+
+def test_retry_skips_items_already_yielded():
+    source = Flaky(list(range(10)), fail_after=4, failures=2)
+    runner = scheduler()
+    assert list(runner.stream(source)) == list(range(10))
+    assert source.calls == 3 and source.closed == 3
+    assert runner.retries == 2 and runner.requests == 3 and runner.in_flight == 0
+
+
+def test_failure_before_any_item_is_retried():
+    source = Flaky([1, 2], fail_after=0, failures=1, error=requests.exceptions.ConnectionError)
+    assert list(scheduler().stream(source)) == [1, 2]
+
+
+def test_retries_exhausted_raise_the_last_error():
+    source = Flaky(list(range(5)), fail_after=2, failures=10)
+    runner = scheduler(max_retries=2)
+    received = []
+    with pytest.raises(requests.exceptions.ChunkedEncodingError):
+        for item in runner.stream(source):
+            received.append(item)
+    assert received == [0, 1] and source.calls == 3 and runner.in_flight == 0
+
+
+def test_non_transient_error_is_not_retried():
+    source = Flaky(list(range(5)), fail_after=1, failures=1, error=ValueError)
+    runner = scheduler()
+    with pytest.raises(ValueError):
+        list(runner.stream(source))
+    assert source.calls == 1 and runner.retries == 0
+
+
+def test_budget_covers_stream_retries():
+    source = Flaky(list(range(5)), fail_after=2, failures=10)
+    runner = scheduler(budget=aqm.RequestBudget(2))
+    with pytest.raises(aqm.RequestBudgetExceeded):
+        list(runner.stream(source))
+    assert source.calls == 2 and runner.budget.used == 2 and runner.in_flight == 0
+
+
+def test_closing_the_stream_releases_the_slot():
+    source = Flaky(list(range(5)), fail_after=None, failures=0)
+    runner = scheduler(max_concurrency=1)
+    stream = runner.stream(source)
+    assert next(stream) == 0 and runner.in_flight == 1
+    stream.close()
+    assert runner.in_flight == 0 and source.closed == 1
+
+
+def test_client_stream_survives_server_errors(mock_server):
+    server, base_url = mock_server
+    server.error_rate = 0.3
+    start, end = datetime(2024, 1, 1), datetime(2024, 1, 2)
+    runner = aqm.RequestScheduler(rate=None, base_delay=0.001, max_retries=20)
+    with aqm.SmabilityClient(base_url=base_url, scheduler=runner) as client:
+        for _ in range(5):
+            assert list(client.iter_data('7', start, end, 'token')) == generate_readings('7', start, end)
+    assert runner.requests == server.request_count